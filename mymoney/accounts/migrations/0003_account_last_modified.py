@@ -0,0 +1,17 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_account_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='last_modified',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='Last time the bank account data changed.'),
+        ),
+    ]
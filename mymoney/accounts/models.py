@@ -1,9 +1,60 @@
-from django.db import models
+from django.db import connections, models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+from mymoney.core.utils import clear_default_account, expire_default_account
 from mymoney.core.utils.currencies import get_currencies
 
 
+class AccountManager(models.Manager):
+
+    def bump_version(self, account=None):
+        """
+        Alter the data version of the given bank account, or of all of them.
+        """
+        qs = self.all() if account is None else self.filter(pk=account.pk)
+        qs.update(version=models.F('version') + 1, last_modified=timezone.now())
+        expire_default_account(account)
+
+    def lock(self, pks):
+        """
+        Lock the rows of the bank accounts given until the end of the current
+        transaction, in pk order so that concurrent writers of their bank
+        transactions wait for each other without deadlocking.
+        """
+        list(self.select_for_update().filter(pk__in=pks).order_by('pk').values_list('pk', flat=True))
+
+    def adjust_balance(self, account, amount):
+        """
+        Add the amount to the balance of the bank account, which alters its
+        data version too. The instance given is updated with the new values,
+        read back by the same statement where supported.
+        """
+        connection = connections[self.db]
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE {table} SET balance = balance + %s, version = version + 1, last_modified = %s "
+                    "WHERE id = %s RETURNING balance, version, last_modified".format(
+                        table=connection.ops.quote_name(self.model._meta.db_table),
+                    ),
+                    [amount, timezone.now(), account.pk],
+                )
+                account.balance, account.version, account.last_modified = cursor.fetchone()
+        else:
+            self.filter(pk=account.pk).update(
+                balance=models.F('balance') + amount,
+                version=models.F('version') + 1,
+                last_modified=timezone.now(),
+            )
+            account.refresh_from_db(fields=['balance', 'version', 'last_modified'])
+
+        expire_default_account(account)
+
+
 class Account(models.Model):
     """
     For the moment, a bank account is a singleton.
@@ -20,9 +71,41 @@ class Account(models.Model):
         choices=get_currencies(),
         verbose_name=_('Currency'),
     )
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text=_('Incremented whenever the bank account data change.'),
+    )
+    last_modified = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        help_text=_('Last time the bank account data changed.'),
+    )
+
+    objects = AccountManager()
 
     class Meta:
         db_table = 'accounts'
 
     def __str__(self):
         return self.label
+
+    def save(self, *args, **kwargs):
+        # Any update alters the data version, which must never be overridden
+        # by a stale instance.
+        if not self._state.adding:
+            self.version = models.F('version') + 1
+            self.last_modified = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'version', 'last_modified'}
+        super().save(*args, **kwargs)
+
+        # Not an expression anymore for any later read.
+        if isinstance(self.version, models.Expression):
+            self.refresh_from_db(fields=['version', 'last_modified'])
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def clear_default_account_cache(sender, **kwargs):
+    clear_default_account()
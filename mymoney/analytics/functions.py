@@ -0,0 +1,37 @@
+from django.db.models import DateField, Func
+
+
+class SumOver(Func):
+    """
+    Sum of an aggregate over the groups, i.e. SUM(SUM(amount)) OVER ().
+    """
+    function = 'SUM'
+    window_compatible = True
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # A CAST of the decimal sum would come before the OVER clause.
+        return self.as_sql(compiler, connection, **extra_context)
+
+
+class TruncWeekday(Func):
+    """
+    Truncate a date to the start of its week, the first day of the week
+    being the ISO weekday given (Monday as 0), unlike TruncWeek.
+    """
+    output_field = DateField()
+
+    def __init__(self, expression, weekday, **extra):
+        super().__init__(expression, **extra)
+        self.weekday = int(weekday)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # Shifted so that the first day of the week is a Monday.
+        offset = (7 - self.weekday) % 7
+        template = "(DATE_TRUNC('week', (%(expressions)s + {offset})::timestamp) - INTERVAL '{offset} days')::date"
+        return super().as_sql(compiler, connection, template=template.format(offset=offset), **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite weekdays start on Sunday as 0.
+        template = "date(%(expressions)s, '-6 days', 'weekday {weekday}')"
+        return super().as_sql(
+            compiler, connection, template=template.format(weekday=(self.weekday + 1) % 7), **extra_context)
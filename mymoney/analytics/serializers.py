@@ -2,6 +2,7 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from mymoney.core.utils.dates import GRANULARITY_MONTH, GRANULARITY_WEEK
 from mymoney.core.validators import MinMaxValidator
 from mymoney.tags.models import Tag
 from mymoney.tags.serializers import TagSerializer
@@ -58,6 +59,16 @@ class RatioInputSerializer(BaseRatioSerializer):
         ]
 
 
+class RatioSeriesInputSerializer(RatioInputSerializer):
+    granularity = serializers.ChoiceField(
+        choices=(
+            (GRANULARITY_MONTH, _('Month')),
+            (GRANULARITY_WEEK, _('Week')),
+        ),
+        default=GRANULARITY_MONTH,
+    )
+
+
 class RatioListSerializer(serializers.ListSerializer):
 
     def to_representation(self, data):
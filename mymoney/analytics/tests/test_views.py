@@ -1,4 +1,11 @@
 import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework.reverse import reverse
 from rest_framework.test import APITestCase
@@ -6,10 +13,12 @@ from rest_framework.test import APITestCase
 from mymoney.accounts.factories import AccountFactory
 from mymoney.core.factories import UserFactory
 from mymoney.tags.factories import TagFactory
+from mymoney.tags.models import Tag
 from mymoney.transactions.factories import TransactionFactory
 from mymoney.transactions.models import Transaction
 
 from ..serializers import RatioInputSerializer
+from ..views import RatioAnalyticsViewSet
 
 
 class RatioListViewTestCase(APITestCase):
@@ -23,6 +32,29 @@ class RatioListViewTestCase(APITestCase):
     def tearDown(self):
         Transaction.objects.all().delete()
 
+    def test_etag(self):
+        data = {
+            'type': RatioInputSerializer.SUM_DEBIT,
+            'date_start': datetime.date(2015, 11, 1),
+            'date_end': datetime.date(2015, 11, 30),
+        }
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(self.url, data=data)['ETag']
+
+        response = self.client.get(self.url, data=data, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        TransactionFactory(account=self.account, date=datetime.date(2015, 11, 2))
+        response = self.client.get(self.url, data=data, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_invalid(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('ETag', response)
+
     def test_access_anonymous(self):
         self.client.force_authenticate(None)
         response = self.client.get(self.url)
@@ -906,6 +938,19 @@ class RatioSummaryViewTestCase(APITestCase):
     def tearDown(self):
         Transaction.objects.all().delete()
 
+    def test_etag(self):
+        data = {
+            'type': RatioInputSerializer.SUM_DEBIT,
+            'date_start': datetime.date(2015, 11, 1),
+            'date_end': datetime.date(2015, 11, 30),
+            'tag': '',
+        }
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(self.url, data=data)['ETag']
+
+        response = self.client.get(self.url, data=data, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
     def test_access_anonymous(self):
         self.client.force_authenticate(None)
         response = self.client.get(self.url)
@@ -1363,3 +1408,389 @@ class RatioSummaryViewTestCase(APITestCase):
         })
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data['total'], -70)
+
+    def test_pagination(self):
+        bts = TransactionFactory.create_batch(
+            25,
+            account=self.account,
+            date=datetime.date(2015, 11, 2),
+            amount=-10,
+            tag=self.tag,
+        )
+        data = {
+            'type': RatioInputSerializer.SUM_DEBIT,
+            'date_start': datetime.date(2015, 11, 1),
+            'date_end': datetime.date(2015, 11, 30),
+            'tag': self.tag.pk,
+        }
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(self.url, data=data)
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([bt['id'] for bt in response.data['results']], [bt.pk for bt in bts[:20]])
+        self.assertEqual(response.data['total'], Decimal('-250'))
+        self.assertIsNone(response.data['previous'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([bt['id'] for bt in response.data['results']], [bt.pk for bt in bts[20:]])
+        self.assertEqual(response.data['total'], Decimal('-250'))
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_pagination_invalid(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={
+            'type': RatioInputSerializer.SUM_DEBIT,
+            'date_start': datetime.date(2015, 11, 1),
+            'date_end': datetime.date(2015, 11, 30),
+            'tag': self.tag.pk,
+            'cursor': 'foo',
+        })
+        self.assertEqual(response.status_code, 404)
+
+    @mock.patch.object(RatioAnalyticsViewSet, 'result_cache', None)
+    def test_total_rollups(self):
+        TransactionFactory(account=self.account, date=datetime.date(2015, 11, 2), amount=-50, tag=self.tag)
+        TransactionFactory(account=self.account, date=datetime.date(2015, 11, 3), amount=-20, tag=self.tag)
+        TransactionFactory(account=self.account, date=datetime.date(2015, 11, 3), amount=10)
+        data = {
+            'type': RatioInputSerializer.SUM_DEBIT,
+            'date_start': datetime.date(2015, 11, 1),
+            'date_end': datetime.date(2015, 11, 30),
+            'tag': self.tag.pk,
+        }
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(self.url, data=data)
+        with mock.patch.object(RatioAnalyticsViewSet, 'use_rollups', False):
+            expected = self.client.get(self.url, data=data)
+        self.assertEqual(response.data['total'], Decimal('-70'))
+        self.assertEqual(response.data, expected.data)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-analytics',
+    },
+})
+class RatioCacheViewTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.tag = TagFactory()
+        cls.account = AccountFactory()
+        cls.data = {
+            'type': RatioInputSerializer.SUM_DEBIT,
+            'date_start': datetime.date(2015, 11, 1),
+            'date_end': datetime.date(2015, 11, 30),
+        }
+
+    def setUp(self):
+        cache.clear()
+        RatioAnalyticsViewSet.result_cache.clear()
+        self.addCleanup(RatioAnalyticsViewSet.result_cache.clear)
+        self.client.force_authenticate(self.user)
+
+    def test_list(self):
+        url = reverse('analytics-ratio-list')
+        TransactionFactory(account=self.account, amount=-10, tag=self.tag, date=datetime.date(2015, 11, 2))
+
+        with mock.patch.object(RatioAnalyticsViewSet, 'get_ratio',
+                               autospec=True, side_effect=RatioAnalyticsViewSet.get_ratio) as get_ratio:
+            first = self.client.get(url, data=self.data)
+            second = self.client.get(url, data=self.data)
+        self.assertEqual(get_ratio.call_count, 1)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(second.data['total'], Decimal('-10'))
+        self.assertEqual(second.data['results'][0]['tag']['id'], self.tag.pk)
+        self.assertDictEqual(
+            RatioAnalyticsViewSet.result_cache.stats(),
+            {'hits': 1, 'misses': 1, 'entries': 1},
+        )
+
+        # Other filters are not served by the same entry.
+        response = self.client.get(url, data=dict(self.data, type=RatioInputSerializer.SINGLE_DEBIT))
+        self.assertEqual(response.data['results'][0]['sum'], '-10.00')
+        self.assertEqual(RatioAnalyticsViewSet.result_cache.stats()['misses'], 2)
+
+    def test_list_invalidation(self):
+        url = reverse('analytics-ratio-list')
+        TransactionFactory(account=self.account, amount=-10, tag=self.tag, date=datetime.date(2015, 11, 2))
+        self.client.get(url, data=self.data)
+
+        TransactionFactory(account=self.account, amount=-5, tag=self.tag, date=datetime.date(2015, 11, 3))
+        response = self.client.get(url, data=self.data)
+        self.assertEqual(response.data['total'], Decimal('-15'))
+
+        self.tag.name = 'foo'
+        self.tag.save()
+        response = self.client.get(url, data=self.data)
+        self.assertEqual(response.data['results'][0]['tag']['name'], 'foo')
+
+    def test_summary(self):
+        url = reverse('analytics-ratio-summary')
+        data = dict(self.data, tag=self.tag.pk)
+        transaction = TransactionFactory(
+            account=self.account, amount=-10, tag=self.tag, date=datetime.date(2015, 11, 2))
+
+        with mock.patch.object(RatioAnalyticsViewSet, 'get_summary',
+                               autospec=True, side_effect=RatioAnalyticsViewSet.get_summary) as get_summary:
+            self.client.get(url, data=data)
+            response = self.client.get(url, data=data)
+        self.assertEqual(get_summary.call_count, 1)
+        self.assertEqual(response.data['results'][0]['id'], transaction.pk)
+
+        transaction.delete()
+        response = self.client.get(url, data=data)
+        self.assertListEqual(response.data['results'], [])
+
+    def test_disabled(self):
+        url = reverse('analytics-ratio-list')
+
+        with mock.patch.object(RatioAnalyticsViewSet, 'result_cache', None):
+            response = self.client.get(url, data=self.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(RatioAnalyticsViewSet.result_cache.stats()['misses'], 0)
+
+
+@mock.patch.object(RatioAnalyticsViewSet, 'result_cache', None)
+class RatioRollupViewTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.account = AccountFactory()
+        tag1 = TagFactory()
+        tag2 = TagFactory()
+
+        for day, amount, tag, reconciled in (
+            (2, -150, tag1, True),
+            (2, -50, tag1, False),
+            (3, 80, tag2, True),
+            (4, -30, None, False),
+            (5, 20, None, False),
+            (5, 90, tag1, False),
+            (6, -15, tag2, True),
+        ):
+            TransactionFactory(
+                account=cls.account,
+                date=datetime.date(2015, 11, day),
+                amount=amount,
+                tag=tag,
+                reconciled=reconciled,
+            )
+        TransactionFactory(
+            account=cls.account,
+            date=datetime.date(2015, 11, 2),
+            amount=-1000,
+            status=Transaction.STATUS_INACTIVE,
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_ratio(self):
+        url = reverse('analytics-ratio-list')
+        types = (
+            RatioInputSerializer.SUM_DEBIT,
+            RatioInputSerializer.SUM_CREDIT,
+            RatioInputSerializer.SINGLE_DEBIT,
+            RatioInputSerializer.SINGLE_CREDIT,
+        )
+        for ratio in types:
+            for reconciled in (None, True, False):
+                data = {
+                    'type': ratio,
+                    'date_start': datetime.date(2015, 11, 1),
+                    'date_end': datetime.date(2015, 11, 30),
+                }
+                if reconciled is not None:
+                    data['reconciled'] = reconciled
+                response = self.client.get(url, data=data)
+                with mock.patch.object(RatioAnalyticsViewSet, 'use_rollups', False):
+                    expected = self.client.get(url, data=data)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.data['results'])
+                self.assertEqual(response.data, expected.data)
+
+    def test_window_total(self):
+        url = reverse('analytics-ratio-list')
+        tag = Tag.objects.order_by('pk').first()
+        for ratio in (RatioInputSerializer.SUM_DEBIT, RatioInputSerializer.SINGLE_CREDIT):
+            for filters in ({}, {'tags': [tag.pk]}, {'sum_min': -100, 'sum_max': 100}):
+                data = dict(
+                    filters,
+                    type=ratio,
+                    date_start=datetime.date(2015, 11, 1),
+                    date_end=datetime.date(2015, 11, 30),
+                )
+                with mock.patch.object(connection.features, 'supports_over_clause', True):
+                    response = self.client.get(url, data=data)
+                with mock.patch.object(connection.features, 'supports_over_clause', False):
+                    expected = self.client.get(url, data=data)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data, expected.data)
+
+    def test_single_query(self):
+        url = reverse('analytics-ratio-list')
+        data = {
+            'type': RatioInputSerializer.SUM_DEBIT,
+            'date_start': datetime.date(2015, 11, 1),
+            'date_end': datetime.date(2015, 11, 30),
+            'sum_max': -100,
+        }
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, data=data)
+        self.assertEqual(len(response.data['results']), 1)
+        # The total is the one of all tags, not only those selected.
+        self.assertEqual(response.data['total'], Decimal('-120'))
+        queries = [query['sql'] for query in context.captured_queries if '"transaction_rollups"' in query['sql']]
+        self.assertEqual(len(queries), 1)
+
+
+@mock.patch.object(RatioAnalyticsViewSet, 'result_cache', None)
+class RatioSeriesViewTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.account = AccountFactory()
+        cls.tag1 = TagFactory()
+        cls.tag2 = TagFactory()
+        cls.url = reverse('analytics-ratio-series')
+
+        for date, amount, tag in (
+            (datetime.date(2015, 10, 15), -10, cls.tag1),
+            (datetime.date(2015, 11, 1), -20, cls.tag1),
+            (datetime.date(2015, 11, 7), -5, cls.tag2),
+            (datetime.date(2015, 11, 8), 100, cls.tag1),
+            (datetime.date(2015, 11, 8), -15, None),
+        ):
+            TransactionFactory(account=cls.account, date=date, amount=amount, tag=tag)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_periods(self, response):
+        return [
+            (period['date_start'], period['date_end'], period['total'],
+             [(row['tag']['id'] if row['tag'] else None, Decimal(row['sum'])) for row in period['results']])
+            for period in response.data['results']
+        ]
+
+    def test_access_anonymous(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_granularity_invalid(self):
+        response = self.client.get(self.url, data={
+            'date_start': datetime.date(2015, 10, 10),
+            'date_end': datetime.date(2015, 12, 5),
+            'granularity': 'foo',
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_month(self):
+        response = self.client.get(self.url, data={
+            'type': RatioInputSerializer.SUM_DEBIT,
+            'date_start': datetime.date(2015, 10, 10),
+            'date_end': datetime.date(2015, 12, 5),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual(self.get_periods(response), [
+            (datetime.date(2015, 10, 10), datetime.date(2015, 10, 31), Decimal('-10'), [(self.tag1.pk, Decimal('-10'))]),
+            (datetime.date(2015, 11, 1), datetime.date(2015, 11, 30), Decimal('-20'), [
+                (None, Decimal('-15')),
+                (self.tag2.pk, Decimal('-5')),
+            ]),
+            (datetime.date(2015, 12, 1), datetime.date(2015, 12, 5), None, []),
+        ])
+
+    def test_week(self):
+        # Weeks start on Sunday in english.
+        response = self.client.get(self.url, data={
+            'type': RatioInputSerializer.SINGLE_DEBIT,
+            'date_start': datetime.date(2015, 11, 1),
+            'date_end': datetime.date(2015, 11, 14),
+            'granularity': 'week',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual(self.get_periods(response), [
+            (datetime.date(2015, 11, 1), datetime.date(2015, 11, 7), Decimal('-25'), [
+                (self.tag1.pk, Decimal('-20')),
+                (self.tag2.pk, Decimal('-5')),
+            ]),
+            (datetime.date(2015, 11, 8), datetime.date(2015, 11, 14), Decimal('-15'), [(None, Decimal('-15'))]),
+        ])
+
+    @override_settings(LANGUAGE_CODE='fr')
+    def test_week_first_day(self):
+        response = self.client.get(self.url, data={
+            'type': RatioInputSerializer.SINGLE_DEBIT,
+            'date_start': datetime.date(2015, 11, 1),
+            'date_end': datetime.date(2015, 11, 14),
+            'granularity': 'week',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual(self.get_periods(response), [
+            (datetime.date(2015, 11, 1), datetime.date(2015, 11, 1), Decimal('-20'), [(self.tag1.pk, Decimal('-20'))]),
+            (datetime.date(2015, 11, 2), datetime.date(2015, 11, 8), Decimal('-20'), [
+                (None, Decimal('-15')),
+                (self.tag2.pk, Decimal('-5')),
+            ]),
+            (datetime.date(2015, 11, 9), datetime.date(2015, 11, 14), None, []),
+        ])
+
+    def test_same_as_ratio(self):
+        data = {
+            'type': RatioInputSerializer.SUM_CREDIT,
+            'date_start': datetime.date(2015, 10, 1),
+            'date_end': datetime.date(2015, 11, 30),
+            'tags': [self.tag1.pk],
+            'sum_min': 10,
+        }
+        response = self.client.get(self.url, data=data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+        for period in response.data['results']:
+            expected = self.client.get(reverse('analytics-ratio-list'), data=dict(
+                data,
+                date_start=period['date_start'],
+                date_end=period['date_end'],
+            ))
+            self.assertEqual(dict(period['results'][0]) if period['results'] else None,
+                             dict(expected.data['results'][0]) if expected.data['results'] else None)
+            self.assertEqual(period['subtotal'], expected.data['subtotal'])
+            self.assertEqual(period['total'], expected.data['total'])
+
+    def test_window_total(self):
+        for granularity in ('month', 'week'):
+            data = {
+                'type': RatioInputSerializer.SUM_DEBIT,
+                'date_start': datetime.date(2015, 10, 1),
+                'date_end': datetime.date(2015, 11, 30),
+                'granularity': granularity,
+            }
+            with mock.patch.object(connection.features, 'supports_over_clause', True):
+                response = self.client.get(self.url, data=data)
+            with mock.patch.object(connection.features, 'supports_over_clause', False):
+                expected = self.client.get(self.url, data=data)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, expected.data)
+
+    def test_single_query(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, data={
+                'date_start': datetime.date(2015, 1, 1),
+                'date_end': datetime.date(2015, 12, 31),
+            })
+        self.assertEqual(len(response.data['results']), 12)
+        queries = [query['sql'] for query in context.captured_queries if '"transaction_rollups"' in query['sql']]
+        self.assertEqual(len(queries), 1)
+        queries = [query['sql'] for query in context.captured_queries if '"tags"' in query['sql']]
+        self.assertEqual(len(queries), 1)
@@ -1,20 +1,37 @@
-from django.db.models import Count, Sum
+import datetime
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Count, F, Sum, Window
+from django.db.models.functions import TruncMonth
 from django.utils.functional import cached_property
 
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from mymoney.core.cache import ResultCache
+from mymoney.core.pagination import KeysetPagination
 from mymoney.core.utils import get_default_account
-from mymoney.transactions.models import Transaction
+from mymoney.core.utils.dates import (
+    GRANULARITY_MONTH, get_date_ranges, get_weekday,
+)
+from mymoney.core.views import ConditionalGetMixin
+from mymoney.transactions.models import Transaction, TransactionRollup
 from mymoney.transactions.serializers import TransactionTeaserSerializer
 
+from .functions import SumOver, TruncWeekday
 from .serializers import (
-    RatioInputSerializer, RatioOutputSerializer, RatioSummaryInputSerializer,
+    RatioInputSerializer, RatioOutputSerializer, RatioSeriesInputSerializer,
+    RatioSummaryInputSerializer,
 )
 
 
-class RatioAnalyticsViewSet(GenericViewSet):
+class RatioAnalyticsViewSet(ConditionalGetMixin, GenericViewSet):
+    conditional_actions = ('list', 'summary', 'series')
+    result_cache = ResultCache('analytics')
+    pagination_class = KeysetPagination
+    use_rollups = True
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -27,11 +44,26 @@ class RatioAnalyticsViewSet(GenericViewSet):
         serializer.is_valid(raise_exception=True)
         self.filters = serializer.validated_data
 
+        return Response(self.get_cached_result(self.get_ratio))
+
+    def get_ratio(self):
+        instances, subtotal, total = self.compute_ratio(list(self.tag_queryset))
+
+        return {
+            'results': RatioOutputSerializer(instances, many=True).data,
+            'subtotal': subtotal,
+            'total': total,
+        }
+
+    def compute_ratio(self, rows):
+        """
+        Returns a tuple (instances, subtotal, total) of the tags rows given.
+        """
         instances, subtotal = [], 0
-        total = self.total_queryset
+        total = self.get_total(rows)
 
         if total is not None:
-            for data in self.tag_queryset:
+            for data in self.filter_tags(rows):
                 instances.append({
                     'tag': data['tag'],
                     'sum': data['sum'],
@@ -40,51 +72,139 @@ class RatioAnalyticsViewSet(GenericViewSet):
                 })
                 subtotal += data['sum']
 
-        return Response({
-            'results': RatioOutputSerializer(instances, many=True).data,
-            'subtotal': subtotal,
-            'total': total,
-        })
+        return instances, subtotal, total
 
     @action(methods=['get'], detail=False)
-    def summary(self, request, *args, **kwargs):
-        serializer = RatioSummaryInputSerializer(
+    def series(self, request, *args, **kwargs):
+        serializer = RatioSeriesInputSerializer(
             data=request.query_params, context={'request': request})
         serializer.is_valid(raise_exception=True)
         self.filters = serializer.validated_data
 
-        qs = self.base_queryset
+        return Response(self.get_cached_result(self.get_series))
+
+    def get_series(self):
+        """
+        Returns the ratio of each week or month of the date range, computed
+        by a single query grouped by period and tag.
+        """
+        rows = OrderedDict((start, []) for start, end in self.get_periods())
+        for row in self.tag_queryset:
+            rows.setdefault(row['period'], []).append(row)
+
+        periods, instances = [], []
+        for start, period_rows in rows.items():
+            ratio, subtotal, total = self.compute_ratio(period_rows)
+            periods.append((start, slice(len(instances), len(instances) + len(ratio)), subtotal, total))
+            instances.extend(ratio)
+
+        # Serialized at once to fetch the tags once.
+        data = RatioOutputSerializer(instances, many=True).data
+
+        return {
+            'results': [
+                OrderedDict([
+                    ('date_start', max(start, self.filters['date_start'])),
+                    ('date_end', min(get_date_ranges(start, self.filters['granularity'])[1],
+                                     self.filters['date_end'])),
+                    ('results', data[results]),
+                    ('subtotal', subtotal),
+                    ('total', total),
+                ])
+                for start, results, subtotal, total in periods
+            ],
+        }
+
+    def get_periods(self):
+        """
+        Yields the date ranges of the periods overlapping the date range.
+        """
+        day = self.filters['date_start']
+        while day <= self.filters['date_end']:
+            start, end = get_date_ranges(day, self.filters['granularity'])
+            yield start, end
+            day = end + datetime.timedelta(days=1)
 
-        if serializer.data['tag'] is not None:
-            qs = qs.filter(tag__pk=serializer.data['tag'])
-        else:
-            qs = qs.filter(tag__isnull=True)
+    @property
+    def partition(self):
+        """
+        Fields grouping the tags rows, beyond the tag.
+        """
+        return ('period',) if 'granularity' in self.filters else ()
 
-        qs = qs.order_by('date', 'id')
+    def truncate_date(self):
+        if self.filters['granularity'] == GRANULARITY_MONTH:
+            return TruncMonth('date')
+        return TruncWeekday('date', get_weekday())
 
-        instances, total = [], 0
-        for transaction in qs:
-            instances.append(transaction)
-            total += transaction.amount
+    @action(methods=['get'], detail=False)
+    def summary(self, request, *args, **kwargs):
+        serializer = RatioSummaryInputSerializer(
+            data=request.query_params, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        self.filters = serializer.validated_data
 
-        return Response({
-            'results': TransactionTeaserSerializer(instances, many=True).data,
-            'total': total,
-        })
+        # Paginated, so links and cursor are part of the result.
+        return Response(self.get_cached_result(self.get_summary, url=request.build_absolute_uri()))
+
+    def get_summary(self):
+        qs = self.filter_tag(self.base_queryset)
+        qs = qs.order_by('date', 'id').values(*TransactionTeaserSerializer.Meta.fields)
+        page = self.paginate_queryset(qs)
+
+        return OrderedDict([
+            ('next', self.paginator.get_next_link()),
+            ('previous', self.paginator.get_previous_link()),
+            ('results', TransactionTeaserSerializer(page, many=True).data),
+            ('total', self.get_summary_total()),
+        ])
+
+    def get_summary_total(self):
+        qs = self.rollup_queryset if self.use_rollups else self.base_queryset
+        return self.filter_tag(qs).aggregate(total=Sum('amount'))['total'] or 0
+
+    def filter_tag(self, qs):
+        if self.filters['tag'] is not None:
+            return qs.filter(tag=self.filters['tag'])
+        return qs.filter(tag__isnull=True)
+
+    def get_cached_result(self, compute, **params):
+        """
+        Returns the result of the action for the validated filters and extra
+        parameters given, from the result cache if any.
+        """
+        if self.result_cache is None or self.account is None:
+            return compute()
+        params.update(self.filters, action=self.action)
+        return self.result_cache.get_or_set(self.account, params, compute)
 
     @property
     def base_queryset(self):
+        return self.get_base_queryset(Transaction.objects.all())
+
+    @property
+    def rollup_queryset(self):
+        return self.get_base_queryset(TransactionRollup.objects.all())
+
+    def get_base_queryset(self, qs):
+        """
+        Filter the bank transactions, or their daily rollups given.
+        """
+        rollup = qs.model is TransactionRollup
 
-        qs = Transaction.objects.filter(
+        qs = qs.filter(
             account=self.account,
             status=Transaction.STATUS_ACTIVE,
             date__range=(self.filters['date_start'], self.filters['date_end']),
         )
+        if rollup:
+            # Emptied ones are only dropped by a refresh.
+            qs = qs.filter(quantity__gt=0)
 
         if self.filters['type'] == RatioInputSerializer.SINGLE_DEBIT:
-            qs = qs.filter(amount__lt=0)
+            qs = qs.filter(sign=-1) if rollup else qs.filter(amount__lt=0)
         elif self.filters['type'] == RatioInputSerializer.SINGLE_CREDIT:
-            qs = qs.filter(amount__gt=0)
+            qs = qs.filter(sign=1) if rollup else qs.filter(amount__gt=0)
 
         if 'reconciled' in self.filters:
             qs = qs.filter(reconciled=self.filters['reconciled'])
@@ -93,10 +213,13 @@ class RatioAnalyticsViewSet(GenericViewSet):
 
     @cached_property
     def queryset(self):
-        qs = self.base_queryset
+        # Ratios only need sums and counts, much cheaper from the rollups.
+        qs = self.rollup_queryset if self.use_rollups else self.base_queryset
+        if self.partition:
+            qs = qs.annotate(period=self.truncate_date())
 
         if self.filters['type'] in (RatioInputSerializer.SUM_CREDIT, RatioInputSerializer.SUM_DEBIT):
-            qs = qs.values('tag')
+            qs = qs.values(*self.partition, 'tag')
             qs = qs.annotate(sum=Sum('amount'))
 
             if self.filters['type'] == RatioInputSerializer.SUM_CREDIT:
@@ -106,42 +229,59 @@ class RatioAnalyticsViewSet(GenericViewSet):
 
         return qs
 
-    @property
-    def total_queryset(self):
-
-        if self.filters['type'] in (RatioInputSerializer.SINGLE_CREDIT, RatioInputSerializer.SINGLE_DEBIT):
-            field = 'amount'
-        else:
-            field = 'sum'
-
-        return self.queryset.aggregate(total=Sum(field))['total']
-
     @property
     def tag_queryset(self):
+        """
+        Sums and counts by tag (and period), with the grand total of all of
+        them computed by the same query if the database supports window
+        functions.
+        """
         qs = self.queryset
 
-        if self.filters['tags']:
-            qs = qs.filter(tag__in=self.filters['tags'])
-
         if self.filters['type'] in (RatioInputSerializer.SINGLE_CREDIT, RatioInputSerializer.SINGLE_DEBIT):
-            qs = qs.values('tag')
+            qs = qs.values(*self.partition, 'tag')
             qs = qs.annotate(sum=Sum('amount'))
 
-        qs = qs.annotate(count=Count('id'))
+        qs = qs.annotate(count=Sum('quantity') if self.use_rollups else Count('id'))
 
-        if 'sum_min' in self.filters and 'sum_max' in self.filters:
-            qs = qs.filter(sum__range=(
-                self.filters['sum_min'],
-                self.filters['sum_max'],
+        if connections[qs.db].features.supports_over_clause:
+            qs = qs.annotate(total=Window(
+                expression=SumOver(Sum('amount')),
+                partition_by=[F(field) for field in self.partition] or None,
             ))
-        elif 'sum_min' in self.filters:
-            qs = qs.filter(sum__gte=self.filters['sum_min'])
-        elif 'sum_max' in self.filters:
-            qs = qs.filter(sum__lte=self.filters['sum_max'])
 
         if self.filters['type'] in (RatioInputSerializer.SINGLE_DEBIT, RatioInputSerializer.SUM_DEBIT):
-            qs = qs.order_by('sum')
+            qs = qs.order_by(*self.partition, 'sum')
         else:
-            qs = qs.order_by('-sum')
+            qs = qs.order_by(*self.partition, '-sum')
 
         return qs
+
+    def get_total(self, rows):
+        """
+        Returns the grand total of the tags rows given, of the same period if
+        any, None without any.
+        """
+        if not rows:
+            return None
+        if 'total' in rows[0]:
+            return rows[0]['total']
+        return sum(row['sum'] for row in rows)
+
+    def filter_tags(self, rows):
+        """
+        Yields the tags rows selected. Filtered once fetched, since they must
+        not alter the grand total.
+        """
+        tags = {tag.pk for tag in self.filters['tags']}
+        sum_min = self.filters.get('sum_min')
+        sum_max = self.filters.get('sum_max')
+
+        for row in rows:
+            if tags and row['tag'] not in tags:
+                continue
+            if sum_min is not None and row['sum'] < sum_min:
+                continue
+            if sum_max is not None and row['sum'] > sum_max:
+                continue
+            yield row
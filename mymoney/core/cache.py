@@ -0,0 +1,117 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils.translation import get_language
+
+
+class ResultCacheEncoder(DjangoJSONEncoder):
+
+    def default(self, o):
+        if isinstance(o, models.Model):
+            return o.pk
+        return super().default(o)
+
+
+class ResultCache:
+    """
+    Cache of computed results keyed by their parameters and the data version
+    of the bank account, so that any write invalidates them implicitly.
+
+    Results are stored in a Django cache backend, MYMONEY['RESULT_CACHE']
+    ('default' by default), thus local memory, file or anything else. Beyond
+    MYMONEY['RESULT_CACHE_MAX_ENTRIES'], the least recently used entries of
+    the process are evicted.
+    """
+    default_max_entries = 300
+    default_timeout = 60 * 60
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[settings.MYMONEY.get('RESULT_CACHE', 'default')]
+
+    @property
+    def max_entries(self):
+        return settings.MYMONEY.get('RESULT_CACHE_MAX_ENTRIES', self.default_max_entries)
+
+    @property
+    def timeout(self):
+        return settings.MYMONEY.get('RESULT_CACHE_TIMEOUT', self.default_timeout)
+
+    def make_key(self, account, params):
+        digest = hashlib.md5(
+            json.dumps(params, sort_keys=True, cls=ResultCacheEncoder).encode('utf-8')
+        ).hexdigest()
+        return 'mymoney:{prefix}:{account}:{version}:{language}:{params}'.format(
+            prefix=self.prefix,
+            account=account.pk,
+            version=account.version,
+            language=get_language(),
+            params=digest,
+        )
+
+    def get_or_set(self, account, params, compute):
+        """
+        Returns the result cached for the bank account data version and the
+        parameters given, otherwise computes it and caches it.
+
+        :param account: the bank account whose data are computed
+        :param params: JSON serializable parameters of the computation, model
+            instances included
+        :param compute: callable without argument returning the result
+        """
+        key = self.make_key(account, params)
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+                if key in self._keys:
+                    self._keys.move_to_end(key)
+            return entry[0]
+
+        value = compute()
+        # Wrapped so that None results are cached too.
+        self.cache.set(key, (value,), self.timeout)
+
+        with self._lock:
+            self.misses += 1
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            evicted = []
+            while len(self._keys) > self.max_entries:
+                evicted.append(self._keys.popitem(last=False)[0])
+        if evicted:
+            self.cache.delete_many(evicted)
+
+        return value
+
+    def clear(self):
+        """
+        Evict the entries of the process and reset the counters.
+        """
+        with self._lock:
+            keys = list(self._keys)
+            self._keys.clear()
+            self.hits = self.misses = 0
+        self.cache.delete_many(keys)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._keys),
+            }
@@ -0,0 +1,16 @@
+from django.db.models import QuerySet
+from django.views.debug import SafeExceptionReporterFilter
+
+
+class ExceptionReporterFilter(SafeExceptionReporterFilter):
+    """
+    Never evaluate the querysets found in the frames of an error report.
+    Their repr() would query again, and maybe wait for a row locked by
+    another thread which waits for the logging handler held meanwhile, e.g
+    a SELECT ... FOR UPDATE.
+    """
+
+    def cleanse_special_types(self, request, value):
+        if isinstance(value, QuerySet) and value._result_cache is None:
+            return '<unevaluated {} queryset>'.format(value.model.__name__)
+        return super().cleanse_special_types(request, value)
@@ -0,0 +1,14 @@
+from .utils import memoize_default_account
+
+
+class DefaultAccountMiddleware:
+    """
+    Resolve the default bank account once per request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with memoize_default_account():
+            return self.get_response(request)
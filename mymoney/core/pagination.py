@@ -0,0 +1,257 @@
+import hashlib
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict, namedtuple
+from functools import partial
+
+from django.core.cache import cache
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from django.utils import six
+from django.utils.six.moves.urllib import parse as urlparse
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .utils import get_default_account
+
+Cursor = namedtuple('Cursor', ['reverse', 'position'])
+
+
+class CountedPaginator(DjangoPaginator):
+    """
+    Django paginator given a count computed beforehand.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class CachedCountPagination(PageNumberPagination):
+    """
+    Page number pagination caching the count per bank account, filters and
+    data version, so that any write invalidates it implicitly. Unfiltered
+    large result sets could rely on the database planner estimate instead.
+    """
+    count_cache_timeout = 60 * 60
+    count_estimate_threshold = 100000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count, self.count_exact = self.get_count(queryset, request)
+        self.django_paginator_class = partial(CountedPaginator, count=self.count)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_exact', self.count_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_count(self, queryset, request):
+        """
+        Returns a tuple (count, exact).
+        """
+        filters = self.get_filters(request)
+        key = self.get_count_cache_key(queryset, filters)
+
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+        value = None
+        if not filters:
+            estimate = self.get_estimated_count(queryset)
+            if estimate is not None and estimate >= self.count_estimate_threshold:
+                value = (estimate, False)
+
+        if value is None:
+            value = (queryset.count(), True)
+
+        cache.set(key, value, self.count_cache_timeout)
+        return value
+
+    def get_filters(self, request):
+        """
+        Returns the normalized query parameters which could alter the count.
+        """
+        ignored = (
+            self.page_query_param,
+            self.page_size_query_param,
+            api_settings.ORDERING_PARAM,
+            api_settings.URL_FORMAT_OVERRIDE,
+        )
+        return sorted(
+            (key, sorted(values))
+            for key, values in request.query_params.lists()
+            if key not in ignored and any(values)
+        )
+
+    def get_count_cache_key(self, queryset, filters):
+        account = get_default_account()
+        digest = hashlib.md5(json.dumps(filters).encode('utf-8')).hexdigest()
+        return 'mymoney:count:{model}:{account}:{version}:{filters}'.format(
+            model=queryset.model._meta.label_lower,
+            account=account.pk if account else None,
+            version=account.version if account else None,
+            filters=digest,
+        )
+
+    def get_estimated_count(self, queryset):
+        """
+        Returns the planner rows estimate, if supported by the backend.
+        """
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']['Plan Rows']
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination seeking on every field of the queryset ordering, which
+    must end with a unique one (i.e: ('-date', '-id')). Unlike the default
+    cursor pagination, there is neither offset nor count, so deep pages cost
+    the same as the first one.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (reverse, current_position) = (False, None)
+        else:
+            (reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*[self._reverse_field(f) for f in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(self._get_seek_filter(current_position, reverse))
+
+        # Fetch one more to know if there is a next page.
+        results = list(queryset[:self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = len(results) > len(self.page)
+        else:
+            self.has_next = len(results) > len(self.page)
+            self.has_previous = current_position is not None
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(queryset.query.order_by)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        position = None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        elif self.cursor is not None:
+            position = self.cursor.position
+
+        return self.encode_cursor(Cursor(reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        position = None
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        elif self.cursor is not None:
+            position = self.cursor.position
+
+        return self.encode_cursor(Cursor(reverse=True, position=position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = urlparse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = tokens['p']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': cursor.position}
+        if cursor.reverse:
+            tokens['r'] = '1'
+
+        querystring = urlparse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field in ordering:
+            field_name = field.lstrip('-')
+            if isinstance(instance, dict):
+                attr = instance[field_name]
+            else:
+                attr = getattr(instance, field_name)
+            position.append(six.text_type(attr))
+        return position
+
+    def _get_seek_filter(self, position, reverse):
+        """
+        Returns the expansion f1 > v1 OR (f1 = v1 AND f2 > v2) OR ... of the
+        row-value comparison (f1, f2, ...) > (v1, v2, ...) for the current
+        ordering, each field being compared in its own direction. The
+        redundant bound f1 >= v1 is added, so that the database could use it
+        to start an index range scan at the cursor instead of filtering all
+        the rows in front of it.
+        """
+        seek, equals, bound = Q(), Q(), Q()
+        for i, (field, value) in enumerate(zip(self.ordering, position)):
+            descending = field.startswith('-') != reverse
+            lookup = '{field}__{op}'.format(
+                field=field.lstrip('-'),
+                op='lt' if descending else 'gt',
+            )
+            if i == 0:
+                bound = Q(**{lookup + 'e': value})
+            seek |= equals & Q(**{lookup: value})
+            equals &= Q(**{field.lstrip('-'): value})
+        return bound & seek
+
+    def _reverse_field(self, field):
+        return field[1:] if field.startswith('-') else '-' + field
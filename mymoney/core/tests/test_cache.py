@@ -0,0 +1,132 @@
+import datetime
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from mymoney.accounts.factories import AccountFactory
+from mymoney.accounts.models import Account
+from mymoney.tags.factories import TagFactory
+
+from ..cache import ResultCache
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-result-cache',
+    },
+})
+class ResultCacheTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = AccountFactory()
+
+    def setUp(self):
+        self.cache = ResultCache('test')
+        self.addCleanup(self.cache.clear)
+
+    def test_hit(self):
+        compute = mock.Mock(return_value={'total': Decimal('10')})
+
+        self.assertEqual(self.cache.get_or_set(self.account, {'foo': 1}, compute), {'total': Decimal('10')})
+        self.assertEqual(self.cache.get_or_set(self.account, {'foo': 1}, compute), {'total': Decimal('10')})
+        self.assertEqual(compute.call_count, 1)
+        self.assertDictEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'entries': 1})
+
+    def test_none(self):
+        compute = mock.Mock(return_value=None)
+
+        self.assertIsNone(self.cache.get_or_set(self.account, {}, compute))
+        self.assertIsNone(self.cache.get_or_set(self.account, {}, compute))
+        self.assertEqual(compute.call_count, 1)
+
+    def test_params(self):
+        tag = TagFactory()
+        params = {
+            'date': datetime.date(2015, 10, 26),
+            'sum': Decimal('10.5'),
+            'tags': [tag],
+            'tag': None,
+        }
+        compute = mock.Mock(return_value=1)
+
+        self.cache.get_or_set(self.account, params, compute)
+        self.cache.get_or_set(self.account, dict(params, tags=[tag.pk]), compute)
+        self.assertEqual(compute.call_count, 1)
+
+        self.cache.get_or_set(self.account, dict(params, sum=Decimal('11')), compute)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_version(self):
+        compute = mock.Mock(return_value=1)
+        self.cache.get_or_set(self.account, {}, compute)
+
+        Account.objects.bump_version(self.account)
+        self.account.refresh_from_db()
+        self.cache.get_or_set(self.account, {}, compute)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_account(self):
+        compute = mock.Mock(return_value=1)
+        self.cache.get_or_set(self.account, {}, compute)
+        self.cache.get_or_set(AccountFactory(), {}, compute)
+        self.assertEqual(compute.call_count, 2)
+
+    @override_settings(LANGUAGE_CODE='fr-fr')
+    def test_language(self):
+        compute = mock.Mock(return_value=1)
+        self.cache.get_or_set(self.account, {}, compute)
+
+        with override_settings(LANGUAGE_CODE='en-us'):
+            self.cache.get_or_set(self.account, {}, compute)
+        self.assertEqual(compute.call_count, 2)
+
+    @override_settings(MYMONEY={'RESULT_CACHE_MAX_ENTRIES': 2})
+    def test_lru(self):
+        compute = mock.Mock(return_value=1)
+        self.cache.get_or_set(self.account, {'foo': 1}, compute)
+        self.cache.get_or_set(self.account, {'foo': 2}, compute)
+        self.cache.get_or_set(self.account, {'foo': 1}, compute)
+        self.assertEqual(compute.call_count, 2)
+
+        # The least recently used is evicted.
+        self.cache.get_or_set(self.account, {'foo': 3}, compute)
+        self.assertEqual(self.cache.stats()['entries'], 2)
+        self.cache.get_or_set(self.account, {'foo': 1}, compute)
+        self.assertEqual(compute.call_count, 3)
+        self.cache.get_or_set(self.account, {'foo': 2}, compute)
+        self.assertEqual(compute.call_count, 4)
+
+    def test_clear(self):
+        compute = mock.Mock(return_value=1)
+        self.cache.get_or_set(self.account, {}, compute)
+
+        self.cache.clear()
+        self.assertDictEqual(self.cache.stats(), {'hits': 0, 'misses': 0, 'entries': 0})
+        self.cache.get_or_set(self.account, {}, compute)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_file_backend(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        compute = mock.Mock(return_value={'total': Decimal('10')})
+
+        with override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }},
+            MYMONEY={'RESULT_CACHE_MAX_ENTRIES': 1},
+        ):
+            self.cache.get_or_set(self.account, {'foo': 1}, compute)
+            self.assertEqual(self.cache.get_or_set(self.account, {'foo': 1}, compute), {'total': Decimal('10')})
+            self.assertEqual(compute.call_count, 1)
+
+            self.cache.get_or_set(self.account, {'foo': 2}, compute)
+            self.cache.get_or_set(self.account, {'foo': 1}, compute)
+            self.assertEqual(compute.call_count, 3)
+            self.cache.clear()
@@ -0,0 +1,28 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from mymoney.accounts.factories import AccountFactory
+from mymoney.accounts.models import Account
+
+from ..debug import ExceptionReporterFilter
+
+
+class ExceptionReporterFilterTestCase(TestCase):
+
+    def test_queryset(self):
+        AccountFactory()
+        qs = Account.objects.select_for_update()
+        with CaptureQueriesContext(connection) as context:
+            value = ExceptionReporterFilter().cleanse_special_types(None, qs)
+        self.assertEqual(value, '<unevaluated Account queryset>')
+        self.assertFalse(context.captured_queries)
+
+    def test_queryset_evaluated(self):
+        AccountFactory()
+        qs = Account.objects.all()
+        list(qs)
+        self.assertIs(ExceptionReporterFilter().cleanse_special_types(None, qs), qs)
+
+    def test_other(self):
+        self.assertEqual(ExceptionReporterFilter().cleanse_special_types(None, 'foo'), 'foo')
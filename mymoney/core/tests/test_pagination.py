@@ -0,0 +1,140 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from mymoney.accounts.factories import AccountFactory
+from mymoney.schedulers.factories import SchedulerFactory
+from mymoney.tags.factories import TagFactory
+from mymoney.transactions.factories import TransactionFactory
+from mymoney.transactions.models import Transaction
+
+from ..factories import UserFactory
+from ..pagination import CachedCountPagination
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-pagination',
+    },
+})
+class CachedCountPaginationTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.account = AccountFactory(currency='EUR')
+        cls.url = reverse('transaction-list')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_count_exact(self):
+        TransactionFactory(account=self.account)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertTrue(response.data['count_exact'])
+
+    def test_count_cached(self):
+        TransactionFactory(account=self.account)
+        self.client.get(self.url)
+
+        with mock.patch('django.db.models.query.QuerySet.count') as mock_count:
+            response = self.client.get(self.url, data={'page': 1, 'ordering': 'label'})
+        self.assertFalse(mock_count.called)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_count_filters(self):
+        TransactionFactory(account=self.account, reconciled=True)
+        TransactionFactory(account=self.account, reconciled=False)
+        self.client.get(self.url)
+
+        response = self.client.get(self.url, data={'reconciled': True})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_count_invalidate_save(self):
+        TransactionFactory(account=self.account)
+        self.client.get(self.url)
+
+        TransactionFactory(account=self.account)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_count_invalidate_inactive(self):
+        TransactionFactory(account=self.account)
+        self.client.get(self.url)
+
+        TransactionFactory(account=self.account, status=Transaction.STATUS_INACTIVE)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_count_invalidate_delete(self):
+        bt = TransactionFactory(account=self.account)
+        self.client.get(self.url)
+
+        bt.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_count_invalidate_delete_multiple(self):
+        bt = TransactionFactory(account=self.account)
+        self.client.get(self.url)
+
+        self.client.delete(reverse('transaction-delete-multiple'), data={'ids': [bt.pk]})
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_count_invalidate_partial_update_multiple(self):
+        bt = TransactionFactory(account=self.account, reconciled=False)
+        self.client.get(self.url, data={'reconciled': True})
+
+        self.client.patch(reverse('transaction-partial-update-multiple'), data={
+            'ids': [bt.pk],
+            'reconciled': True,
+        })
+        response = self.client.get(self.url, data={'reconciled': True})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_count_invalidate_scheduler(self):
+        url = reverse('scheduler-list')
+        self.client.get(url)
+
+        SchedulerFactory(account=self.account)
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_count_invalidate_tag(self):
+        url = reverse('tag-list')
+        self.client.get(url)
+
+        TagFactory()
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 1)
+
+    @mock.patch.object(CachedCountPagination, 'get_estimated_count', return_value=500000)
+    def test_count_estimated(self, mock_estimate):
+        TransactionFactory(account=self.account)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 500000)
+        self.assertFalse(response.data['count_exact'])
+
+    @mock.patch.object(CachedCountPagination, 'get_estimated_count', return_value=500000)
+    def test_count_estimated_filtered(self, mock_estimate):
+        TransactionFactory(account=self.account)
+        response = self.client.get(self.url, data={'search': 'test'})
+        self.assertFalse(mock_estimate.called)
+        self.assertEqual(response.data['count'], 1)
+        self.assertTrue(response.data['count_exact'])
+
+    @mock.patch.object(CachedCountPagination, 'get_estimated_count', return_value=10)
+    def test_count_estimated_small(self, mock_estimate):
+        TransactionFactory(account=self.account)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 1)
+        self.assertTrue(response.data['count_exact'])
@@ -1,3 +1,5 @@
+from unittest import mock
+
 from django.test import override_settings
 
 from rest_framework.reverse import reverse
@@ -6,6 +8,7 @@ from rest_framework.test import APITestCase
 from mymoney.transactions.models import Transaction
 
 from ..factories import UserFactory
+from ..views import get_config
 
 
 class ConfigAPITestCase(APITestCase):
@@ -15,6 +18,10 @@ class ConfigAPITestCase(APITestCase):
         cls.user = UserFactory()
         cls.url = reverse('config')
 
+    def setUp(self):
+        get_config.cache_clear()
+        self.addCleanup(get_config.cache_clear)
+
     def test_access_anonymous(self):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 401)
@@ -27,22 +34,22 @@ class ConfigAPITestCase(APITestCase):
     def test_currencies(self):
         self.client.force_authenticate(self.user)
         response = self.client.get(self.url)
-        self.assertIn('EUR', response.data['currencies'])
-        self.assertIn('USD', response.data['currencies'])
+        self.assertIn('EUR', response.json()['currencies'])
+        self.assertIn('USD', response.json()['currencies'])
 
     @override_settings(LANGUAGE_CODE='fr-fr')
     def test_currencies_localize(self):
         self.client.force_authenticate(self.user)
         response = self.client.get(self.url)
-        self.assertIn(response.data['currencies']['EUR'], 'Euro')
-        self.assertIn(response.data['currencies']['USD'], 'US Dollar')
+        self.assertIn(response.json()['currencies']['EUR'], 'Euro')
+        self.assertIn(response.json()['currencies']['USD'], 'US Dollar')
 
     def test_payment_methods(self):
         self.client.force_authenticate(self.user)
         response = self.client.get(self.url)
         self.assertIn(
             Transaction.PAYMENT_METHOD_CASH,
-            response.data['payment_methods'],
+            response.json()['payment_methods'],
         )
 
     @override_settings(LANGUAGE_CODE='fr-fr')
@@ -50,18 +57,56 @@ class ConfigAPITestCase(APITestCase):
         self.client.force_authenticate(self.user)
         response = self.client.get(self.url)
         self.assertEqual(
-            response.data['payment_methods'][Transaction.PAYMENT_METHOD_CASH],
+            response.json()['payment_methods'][Transaction.PAYMENT_METHOD_CASH],
             'Espèce',
         )
 
     def test_statuses(self):
         self.client.force_authenticate(self.user)
         response = self.client.get(self.url)
-        self.assertIn(Transaction.STATUS_IGNORED, response.data['statuses'])
+        self.assertIn(Transaction.STATUS_IGNORED, response.json()['statuses'])
 
     @override_settings(LANGUAGE_CODE='fr-fr')
     def test_statuses_localize(self):
         self.client.force_authenticate(self.user)
         response = self.client.get(self.url)
         self.assertEqual(
-            response.data['statuses'][Transaction.STATUS_IGNORED], 'Ignoré')
+            response.json()['statuses'][Transaction.STATUS_IGNORED], 'Ignoré')
+
+    def test_etag(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertRegex(etag, r'^"[0-9a-f]{40}"$')
+
+        with mock.patch('mymoney.core.views.get_currencies') as get_currencies:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertFalse(get_currencies.called)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"foo", ' + etag)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"foo"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_anonymous(self):
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(None)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 401)
+
+    def test_etag_language(self):
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(self.url)['ETag']
+
+        with override_settings(LANGUAGE_CODE='fr-fr'):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
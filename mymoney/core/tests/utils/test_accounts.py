@@ -0,0 +1,121 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from mymoney.accounts.factories import AccountFactory
+from mymoney.accounts.models import Account
+from mymoney.core.factories import UserFactory
+from mymoney.core.utils import (
+    clear_default_account, get_default_account, memoize_default_account,
+)
+from mymoney.transactions.factories import TransactionFactory
+
+
+class DefaultAccountTestCase(TestCase):
+
+    def setUp(self):
+        clear_default_account()
+        self.addCleanup(clear_default_account)
+
+    def test_none(self):
+        self.assertIsNone(get_default_account())
+
+    def test_first(self):
+        account = AccountFactory()
+        AccountFactory()
+        self.assertEqual(get_default_account(), account)
+
+    def test_no_process_cache(self):
+        account = AccountFactory(currency='EUR')
+        get_default_account()
+
+        # Another process may have altered it.
+        Account.objects.filter(pk=account.pk).update(currency='USD')
+        with self.assertNumQueries(1):
+            self.assertEqual(get_default_account().currency, 'USD')
+
+        Account.objects.filter(pk=account.pk).delete()
+        self.assertIsNone(get_default_account())
+
+    def test_memoize(self):
+        AccountFactory()
+
+        with memoize_default_account():
+            account = get_default_account()
+            self.assertIs(get_default_account(), account)
+
+        self.assertIsNot(get_default_account(), account)
+
+    def test_memoize_queries(self):
+        AccountFactory(balance=10)
+
+        with memoize_default_account():
+            with self.assertNumQueries(1):
+                account = get_default_account()
+                self.assertEqual(get_default_account().balance, Decimal('10'))
+                self.assertEqual(get_default_account().version, account.version)
+
+    def test_memoize_invalidation_save(self):
+        AccountFactory(currency='EUR')
+
+        with memoize_default_account():
+            get_default_account()
+            account = Account.objects.get()
+            account.currency = 'USD'
+            account.save()
+            self.assertEqual(get_default_account().currency, 'USD')
+
+    def test_memoize_balance(self):
+        AccountFactory(balance=0)
+
+        with memoize_default_account():
+            account = get_default_account()
+            self.assertEqual(account.balance, 0)
+
+            # Updated by another instance.
+            TransactionFactory(account=Account.objects.get(), amount=10)
+            self.assertEqual(get_default_account().balance, Decimal('10'))
+
+            version = account.version
+            TransactionFactory(account=Account.objects.get(), amount=10, status='inactive')
+            self.assertEqual(get_default_account().version, version + 1)
+
+    def test_memoize_balance_same_instance(self):
+        AccountFactory(balance=0)
+
+        with memoize_default_account():
+            account = get_default_account()
+            TransactionFactory(account=account, amount=10)
+
+            with self.assertNumQueries(0):
+                self.assertEqual(get_default_account().balance, Decimal('10'))
+
+
+class DefaultAccountRequestTestCase(APITestCase):
+
+    def setUp(self):
+        clear_default_account()
+        self.addCleanup(clear_default_account)
+
+    def test_no_repeated_queries(self):
+        user = UserFactory()
+        account = AccountFactory()
+        TransactionFactory.create_batch(2, account=account)
+
+        self.client.force_authenticate(user)
+        url = reverse('transaction-list')
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+        # The bank account is read once for the whole request.
+        queries = [query['sql'] for query in context.captured_queries if '"accounts"' in query['sql']]
+        self.assertEqual(len(queries), 1)
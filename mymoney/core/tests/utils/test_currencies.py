@@ -2,8 +2,12 @@ from decimal import Decimal
 
 from django.test import TestCase, override_settings
 
+from babel import numbers
+
 from mymoney.core.utils.currencies import (
-    format_currency, localize_signed_amount, localize_signed_amount_currency,
+    format_currencies, format_currency, get_currency_formatter,
+    localize_signed_amount, localize_signed_amount_currency,
+    localize_signed_amounts, localize_signed_amounts_currency,
 )
 
 
@@ -64,3 +68,59 @@ class CurrencyFormatTestCase(TestCase):
             localize_signed_amount_currency(Decimal('1547.23'), 'EUR'),
             '+1\xa0547,23\xa0€',
         )
+
+    @override_settings(LANGUAGE_CODE='fr-fr')
+    def test_localize_signed_amounts_fr_fr(self):
+        self.assertListEqual(
+            localize_signed_amounts([Decimal('15.23'), Decimal('-1547.2'), Decimal('0.00'), 10]),
+            ['+15,23', '-1547,2', '0,00', '+10'],
+        )
+
+    @override_settings(LANGUAGE_CODE='en-us')
+    def test_localize_signed_amounts_currency_en_us(self):
+        self.assertListEqual(
+            localize_signed_amounts_currency([Decimal('1547.23'), Decimal('-2'), 0], 'USD'),
+            ['+$1,547.23', '-$2.00', '$0.00'],
+        )
+
+    @override_settings(LANGUAGE_CODE='fr-fr')
+    def test_format_currencies_fr_fr(self):
+        self.assertListEqual(
+            format_currencies([Decimal('-1547.23'), Decimal('1')], 'EUR'),
+            ['-1\xa0547,23\xa0€', '1,00\xa0€'],
+        )
+
+
+class CurrencyFormatterTestCase(TestCase):
+
+    def setUp(self):
+        get_currency_formatter.cache_clear()
+        self.addCleanup(get_currency_formatter.cache_clear)
+
+    def test_same_as_babel(self):
+        amounts = [Decimal('-1547.238'), Decimal('0'), Decimal('12.5'), -3, 1234567.891]
+        for locale in ('en_US', 'fr_FR', 'de_CH', 'ja_JP', 'ar_EG'):
+            for currency in ('USD', 'EUR', 'JPY', 'BHD'):
+                for pattern in (None, '¤#,##0.00', '#,##0.00 ¤', '¤¤ #,##0.00;(¤¤ #,##0.00)'):
+                    formatter = get_currency_formatter(locale, currency, pattern)
+                    for amount in amounts:
+                        self.assertEqual(
+                            formatter(amount),
+                            numbers.format_currency(amount, currency, format=pattern, locale=locale),
+                        )
+
+    @override_settings(LANGUAGE_CODE='fr-fr')
+    def test_cache(self):
+        format_currency(Decimal('1'), 'EUR')
+        format_currency(Decimal('2'), 'EUR')
+        format_currency(Decimal('3'), 'USD')
+
+        info = get_currency_formatter.cache_info()
+        self.assertEqual(info.misses, 2)
+        self.assertEqual(info.hits, 1)
+
+    def test_cache_language(self):
+        with override_settings(LANGUAGE_CODE='fr-fr'):
+            self.assertEqual(format_currency(Decimal('1'), 'EUR'), '1,00\xa0€')
+        with override_settings(LANGUAGE_CODE='en-us'):
+            self.assertEqual(format_currency(Decimal('1'), 'EUR'), '€1.00')
@@ -1,7 +1,58 @@
+import threading
+from contextlib import contextmanager
+
 from .currencies import *  # NOQA
 from .dates import *  # NOQA
 
+_default_account_local = threading.local()
+
 
 def get_default_account():
+    """
+    Returns the default bank account. Within a request, it is queried once
+    and the same instance is returned. Nothing is kept between requests, as
+    any other process could rename or delete it.
+    """
+    account = getattr(_default_account_local, 'account', None)
+    if account is not None:
+        return account
+
     from mymoney.accounts.models import Account
-    return Account.objects.first()
+
+    account = Account.objects.order_by('pk').first()
+    if account is not None and getattr(_default_account_local, 'enabled', False):
+        _default_account_local.account = account
+    return account
+
+
+def clear_default_account():
+    """
+    Drop the default bank account memoized, i.e. once altered.
+    """
+    _default_account_local.account = None
+
+
+def expire_default_account(account=None):
+    """
+    Defer again the balance and data version of the default bank account
+    memoized, unless it is the instance which have been updated.
+    """
+    memoized = getattr(_default_account_local, 'account', None)
+    if memoized is None or memoized is account:
+        return
+    if account is None or account.pk == memoized.pk:
+        for name in ('balance', 'version', 'last_modified'):
+            memoized.__dict__.pop(name, None)
+
+
+@contextmanager
+def memoize_default_account():
+    """
+    Returns the same default bank account instance within the block.
+    """
+    _default_account_local.enabled = True
+    try:
+        yield
+    finally:
+        _default_account_local.enabled = False
+        _default_account_local.account = None
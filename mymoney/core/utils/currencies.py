@@ -1,6 +1,10 @@
+import copy
 import operator
 from decimal import Decimal
+from functools import lru_cache, partial
 
+from django.conf import settings
+from django.utils import numberformat
 from django.utils.formats import get_format, localize
 from django.utils.translation import get_language, to_locale
 
@@ -18,18 +22,58 @@ def get_currencies():
     )
 
 
+@lru_cache(maxsize=256)
+def get_currency_formatter(locale, currency, pattern=None):
+    """
+    Returns a function formatting amounts with the currency given for the
+    locale. The Babel locale data and number pattern are loaded and parsed
+    once, and the currency symbol and precision are resolved in the pattern
+    itself.
+    """
+    locale = Locale.parse(locale)
+    if pattern:
+        pattern = copy.copy(numbers.parse_pattern(pattern))
+    else:
+        pattern = copy.copy(locale.currency_formats['standard'])
+
+    pattern.frac_prec = (numbers.get_currency_precision(currency),) * 2
+    affixes = ''.join(pattern.prefix + pattern.suffix)
+    if '¤' in affixes and '¤¤' not in affixes:
+        symbol = numbers.get_currency_symbol(currency, locale)
+        pattern.prefix = tuple(affix.replace('¤', symbol) for affix in pattern.prefix)
+        pattern.suffix = tuple(affix.replace('¤', symbol) for affix in pattern.suffix)
+        currency = None
+
+    def formatter(amount):
+        return pattern.apply(amount, locale, currency=currency, currency_digits=False)
+
+    return formatter
+
+
+def get_active_currency_formatter(currency):
+    """
+    Returns the currency formatter of the current active language.
+    """
+    pattern = get_format('CURRENCY_PATTERN_FORMAT')
+    if pattern == 'CURRENCY_PATTERN_FORMAT':
+        pattern = None
+    return get_currency_formatter(to_locale(get_language()), currency, pattern)
+
+
 def format_currency(amount, currency):
     """
     Format an amount with the currency given for the current active language.
     """
-    format = get_format('CURRENCY_PATTERN_FORMAT')
-    if format == 'CURRENCY_PATTERN_FORMAT':
-        format = None
-    locale = to_locale(get_language())
+    return get_active_currency_formatter(currency)(amount)
 
-    return numbers.format_currency(
-        amount, currency, format=format, locale=locale
-    )
+
+def format_currencies(amounts, currency):
+    """
+    Format a list of amounts with the currency given for the current active
+    language, resolving the formatter once.
+    """
+    formatter = get_active_currency_formatter(currency)
+    return [formatter(amount) for amount in amounts]
 
 
 def localize_signed_amount(amount):
@@ -40,9 +84,38 @@ def localize_signed_amount(amount):
     return prefix + localize(amount)
 
 
+def localize_signed_amounts(amounts):
+    """
+    Localize a list of numbers and set a positive prefix, resolving the
+    number format of the current active language once.
+    """
+    lang = get_language() if settings.USE_L10N else None
+    format_number = partial(
+        numberformat.format,
+        decimal_sep=get_format('DECIMAL_SEPARATOR', lang),
+        grouping=get_format('NUMBER_GROUPING', lang),
+        thousand_sep=get_format('THOUSAND_SEPARATOR', lang),
+    )
+    return [
+        ('+' if amount > 0 else '') + format_number(amount)
+        for amount in amounts
+    ]
+
+
 def localize_signed_amount_currency(amount, currency):
     """
     Format an amount with its currency and set a positive prefix.
     """
     prefix = '+' if Decimal(amount) > 0 else ''
     return prefix + format_currency(amount, currency)
+
+
+def localize_signed_amounts_currency(amounts, currency):
+    """
+    Format a list of amounts with their currency and set a positive prefix.
+    """
+    formatter = get_active_currency_formatter(currency)
+    return [
+        ('+' if Decimal(amount) > 0 else '') + formatter(amount)
+        for amount in amounts
+    ]
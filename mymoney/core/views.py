@@ -1,16 +1,112 @@
-from rest_framework.response import Response
+import hashlib
+from functools import lru_cache
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+from django.utils.translation import get_language
+
+from rest_framework.renderers import JSONRenderer
 from rest_framework.views import APIView
 
 from mymoney.transactions.models import Transaction
 
-from .utils import get_currencies
+from .utils import get_currencies, get_default_account
+
+
+@lru_cache(maxsize=None)
+def get_config(language):
+    """
+    Returns the configuration of the language given, rendered once as JSON,
+    and its strong ETag.
+    """
+    content = JSONRenderer().render({
+        'currencies': dict(get_currencies()),
+        'payment_methods': dict(Transaction.PAYMENT_METHODS),
+        'statuses': dict(Transaction.STATUSES),
+    })
+    return content, '"{}"'.format(hashlib.sha1(content).hexdigest())
 
 
 class ConfigAPIView(APIView):
 
     def get(self, request, *args, **kwargs):
-        return Response({
-            'currencies': dict(get_currencies()),
-            'payment_methods': dict(Transaction.PAYMENT_METHODS),
-            'statuses': dict(Transaction.STATUSES),
-        })
+        content, etag = get_config(get_language())
+
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in etags or '*' in etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json')
+
+        response['ETag'] = etag
+        return response
+
+
+class NotModified(Exception):
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Answers the conditional GET of the actions given before running them,
+    with the data version of the default bank account as ETag and the time
+    of its last change as Last-Modified. Thus polling clients get a 304
+    with no other query than the version lookup.
+    """
+    conditional_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        self.etag = self.last_modified = None
+        if self.action not in self.conditional_actions or request.method not in ('GET', 'HEAD'):
+            return
+
+        account = get_default_account()
+        if account is None:
+            return
+
+        deferred = account.get_deferred_fields() & {'version', 'last_modified'}
+        if deferred:
+            account.refresh_from_db(fields=deferred)
+
+        self.etag = self.get_etag(account)
+        self.last_modified = self.get_last_modified(account)
+
+        response = get_conditional_response(
+            request,
+            etag=self.etag,
+            last_modified=int(self.last_modified.timestamp()),
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        if getattr(self, 'etag', None) is not None and response.status_code in (200, 304):
+            response['ETag'] = self.etag
+            response['Last-Modified'] = http_date(self.last_modified.timestamp())
+        return response
+
+    def get_etag(self, account):
+        return 'W/"{}"'.format('-'.join(str(part) for part in self.get_etag_parts(account)))
+
+    def get_etag_parts(self, account):
+        """
+        Returns what the representations depend on: the bank account data
+        version, and the language as they are localized.
+        """
+        return [account.pk, account.version, get_language()]
+
+    def get_last_modified(self, account):
+        return account.last_modified
@@ -1,27 +1,92 @@
+import datetime
+import multiprocessing
+
 from django.core.management.base import BaseCommand
+from django.db import connections
 
 from ...models import Scheduler
 
 
+def clone_worker(batch_size, limit, until):
+    """
+    Clone awaiting schedulers claimed by chunks, within a process of the
+    pool. Returns a list of tuples (scheduler, count).
+    """
+    try:
+        return list(Scheduler.objects.clone_awaiting(batch_size=batch_size, limit=limit, until=until).items())
+    finally:
+        connections.close_all()
+
+
 class Command(BaseCommand):
     help = 'Clone bank transaction scheduled'
 
     def add_arguments(self, parser):
 
-        parser.add_argument('--limit', action='store', type=int, default=100,
+        parser.add_argument('--limit', action='store', type=int, default=None,
                             help='Limit the number of scheduled bank '
-                                 'transaction to clone.')
+                                 'transaction to clone, 100 by default '
+                                 'unless catching up.')
+        parser.add_argument('--batch', action='store_true', default=False,
+                            help='Clone them by chunks instead of one by '
+                                 'one, each claimed so that concurrent runs '
+                                 'never clone the same.')
+        parser.add_argument('--catch-up', action='store_true', default=False,
+                            help='Clone by chunks every occurrence missed '
+                                 'until the current week or month too.')
+        parser.add_argument('--batch-size', action='store', type=int,
+                            default=500,
+                            help='Number of scheduled bank transaction per '
+                                 'chunk in batch mode.')
+        parser.add_argument('--workers', action='store', type=int, default=1,
+                            help='Number of processes cloning chunks '
+                                 'concurrently in batch mode, the limit '
+                                 'being shared between them.')
 
     def handle(self, *args, **options):
+        limit = options['limit']
+        if limit is None and not options['catch_up']:
+            limit = 100
 
-        # Sort by date instead of last action because last action could be NULL
-        # and postgreSQL sort NULL value as latest.
-        qs = (Scheduler.objects
-              .get_awaiting_transactions()
-              .order_by('date')
-              [:options['limit']])
-
-        for bts in qs:
-            bts.clone()
+        if options['catch_up'] or options['batch'] or options['workers'] > 1:
+            until = datetime.date.today() if options['catch_up'] else None
+            counts = self.clone_concurrently(options['workers'], options['batch_size'], limit, until)
+            if options['catch_up']:
+                for bts, count in counts:
+                    self.stdout.write('{pk} "{label}": {count} bank transaction(s) cloned.'.format(
+                        pk=bts.pk,
+                        label=bts.label,
+                        count=count,
+                    ))
+        else:
+            # Sort by date instead of last action because last action could
+            # be NULL and postgreSQL sort NULL value as latest.
+            qs = (Scheduler.objects
+                  .get_awaiting_transactions()
+                  .select_related('account')
+                  .order_by('date')
+                  [:limit])
+            for bts in qs:
+                bts.clone()
 
         self.stdout.write('Scheduled bank transaction have been cloned.')
+
+    def clone_concurrently(self, workers, batch_size, limit, until):
+        """
+        Returns a list of tuples (scheduler, count) cloned by the workers.
+        """
+        if workers <= 1:
+            return list(Scheduler.objects.clone_awaiting(batch_size=batch_size, limit=limit, until=until).items())
+
+        # The remainder of the limit is shared out between the first ones.
+        limits = [None] * workers
+        if limit is not None:
+            limits = [limit // workers + (i < limit % workers) for i in range(workers)]
+
+        # Forked processes must not share the database connections.
+        connections.close_all()
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.starmap(clone_worker, [
+                (batch_size, worker_limit, until) for worker_limit in limits if worker_limit != 0
+            ])
+        return [item for result in results for item in result]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedulers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='scheduler',
+            name='state',
+            field=models.CharField(choices=[('waiting', 'Waiting'), ('finished', 'Finished'), ('failed', 'Failed'), ('claimed', 'Claimed')], default='waiting', editable=False, help_text='State of the scheduled bank transaction.', max_length=32),
+        ),
+    ]
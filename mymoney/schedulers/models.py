@@ -1,31 +1,34 @@
 import logging
+from collections import OrderedDict
 from datetime import timedelta
 
-from django.db import models, transaction
-from django.db.models import Q, Sum
+from django.db import OperationalError, connections, models, transaction
+from django.db.models import Case, F, Q, Sum, Value, When
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+import numpy as np
 from dateutil.relativedelta import relativedelta
 
+from mymoney.accounts.models import Account
 from mymoney.core.utils import (
-    GRANULARITY_MONTH, GRANULARITY_WEEK, get_datetime_ranges,
+    GRANULARITY_MONTH, GRANULARITY_WEEK, get_date_ranges, get_datetime_ranges,
 )
 from mymoney.transactions.models import AbstractTransaction, Transaction
 
+from .projections import (
+    expand_monthly, expand_weekly, project_balance, to_cents,
+)
+
 logger = logging.getLogger('mymoney.errors')
 
 
 class SchedulerManager(models.Manager):
+    # Delay after which a scheduler claimed by a run which never ended is
+    # awaiting again.
+    claim_timeout = timedelta(hours=1)
 
-    def get_awaiting_transactions(self):
-        """
-        Return awaiting bank transaction scheduled. To be awaiting :
-        - have explicit state BankScheduler.STATE_WAITING
-        OR
-        - have state BankScheduler.STATE_FINISHED and being lower
-          than the recurring datetime, depending on its type.
-        """
+    def get_awaiting_q(self):
         month_start = get_datetime_ranges(timezone.now(), GRANULARITY_MONTH)[0]
         week_start = get_datetime_ranges(timezone.now(), GRANULARITY_WEEK)[0]
 
@@ -38,14 +41,238 @@ class SchedulerManager(models.Manager):
                 Q(last_action__lt=week_start)
         )
 
-        return self.filter(
+        return (
             Q(state=Scheduler.STATE_WAITING) |
             (
                     Q(state=Scheduler.STATE_FINISHED) &
                     (monthly | weekly)
+            ) |
+            (
+                    Q(state=Scheduler.STATE_CLAIMED) &
+                    Q(last_action__lt=timezone.now() - self.claim_timeout)
             )
         )
 
+    def get_awaiting_transactions(self):
+        """
+        Return awaiting bank transaction scheduled. To be awaiting :
+        - have explicit state BankScheduler.STATE_WAITING
+        OR
+        - have state BankScheduler.STATE_FINISHED and being lower
+          than the recurring datetime, depending on its type.
+        OR
+        - have state BankScheduler.STATE_CLAIMED for too long, its run
+          having been interrupted.
+        """
+        return self.filter(self.get_awaiting_q())
+
+    def claim(self, limit, exclude=()):
+        """
+        Claim up to `limit` awaiting schedulers, ordered by date, so that
+        concurrent runs never clone the same one. Where the database supports
+        it (i.e: PostgreSQL), rows are locked with SELECT ... FOR UPDATE SKIP
+        LOCKED until the end of the current transaction, so they must be
+        cloned within it. Otherwise, they are flagged with the explicit
+        claimed state, one conditional update each, which their clone then
+        overrides.
+
+        :param exclude: pks of schedulers not to claim again
+        """
+        # Sort by date instead of last action because last action could be
+        # NULL and postgreSQL sort NULL value as latest.
+        qs = (self
+              .get_awaiting_transactions()
+              .exclude(pk__in=exclude)
+              .select_related('account')
+              .order_by('date'))
+
+        if connections[self.db].features.has_select_for_update_skip_locked:
+            return list(qs.select_for_update(skip_locked=True, of=('self',))[:limit])
+
+        claimed = []
+        for pk in qs.values_list('pk', flat=True)[:limit]:
+            # The update only matches if no concurrent run claimed it since.
+            if self.filter(self.get_awaiting_q(), pk=pk).update(
+                    state=Scheduler.STATE_CLAIMED,
+                    last_action=timezone.now()):
+                claimed.append(pk)
+        return list(self.filter(pk__in=claimed).select_related('account').order_by('date'))
+
+    def clone_awaiting(self, batch_size=500, limit=None, until=None):
+        """
+        Claim and clone awaiting schedulers chunk after chunk until none is
+        left, or the limit reached. Thanks to claim(), many runs could safely
+        clone concurrently, from any process or host.
+
+        Returns an ordered dict of the number of bank transactions cloned by
+        scheduler instance.
+        """
+        locking = connections[self.db].features.has_select_for_update_skip_locked
+        counts = OrderedDict()
+        # Those cloned are not awaiting anymore, unlike the failures whose
+        # explicit failed state could not be saved, or left awaiting.
+        failed = []
+        while limit is None or len(counts) < limit:
+            size = batch_size if limit is None else min(batch_size, limit - len(counts))
+            if locking:
+                with transaction.atomic():
+                    cloned = self._clone_claimed(size, failed, until)
+            else:
+                cloned = self._clone_claimed(size, failed, until)
+            if not cloned:
+                break
+            counts.update(cloned)
+            failed.extend(scheduler.pk for scheduler, count in cloned.items() if not count)
+        return counts
+
+    def _clone_claimed(self, size, failed, until):
+        schedulers = self.claim(size, exclude=failed)
+        if connections[self.db].features.has_select_for_update_skip_locked:
+            # Locked until the end of the claim transaction like the
+            # schedulers, all the accounts are locked first in the same order
+            # for all the runs. Otherwise, a chunk cloned again one by one
+            # would lock them in the order of the schedulers, deadlocking.
+            Account.objects.lock({scheduler.account_id for scheduler in schedulers})
+        counts = self.clone_multiple(schedulers, batch_size=size, until=until)
+        return OrderedDict((scheduler, counts[scheduler.pk]) for scheduler in schedulers)
+
+    def get_occurrences(self, account, end):
+        """
+        Returns a tuple (dates, cents) of numpy arrays of the bank
+        transactions the active schedulers of the account would clone until
+        the end date included.
+        """
+        rows = list(
+            self
+            .filter(account=account)
+            .exclude(status=Scheduler.STATUS_INACTIVE)
+            .values_list('type', 'date', 'recurrence', 'amount')
+        )
+        end = np.datetime64(end, 'D')
+
+        dates, cents = [np.array([], dtype='datetime64[D]')], [np.array([], dtype=np.int64)]
+        expanders = ((Scheduler.TYPE_MONTHLY, expand_monthly), (Scheduler.TYPE_WEEKLY, expand_weekly))
+        for scheduler_type, expand in expanders:
+            schedulers = [row for row in rows if row[0] == scheduler_type]
+            if not schedulers:
+                continue
+
+            segments, occurrences = expand(
+                np.array([row[1] for row in schedulers], dtype='datetime64[D]'),
+                np.array([-1 if row[2] is None else row[2] for row in schedulers], dtype=np.int64),
+                end,
+            )
+            dates.append(occurrences)
+            cents.append(to_cents(row[3] for row in schedulers)[segments])
+
+        return np.concatenate(dates), np.concatenate(cents)
+
+    def get_balance_projection(self, account, start, end):
+        """
+        Returns an int64 numpy array of the daily balances in cents of the
+        account from the start date (today) to the end date included, with
+        the bank transactions to come and those scheduled.
+        """
+        future = list(
+            Transaction.objects
+            .filter(account=account, date__gt=start, date__lte=end)
+            .exclude(status=Transaction.STATUS_INACTIVE)
+            .values_list('date', 'amount')
+        )
+        dates, cents = self.get_occurrences(account, end)
+        dates = np.concatenate([np.array([row[0] for row in future], dtype='datetime64[D]'), dates])
+        cents = np.concatenate([to_cents(row[1] for row in future), cents])
+
+        balance = int(Transaction.objects.get_current_balance(account).scaleb(2))
+        return project_balance(balance, np.datetime64(start, 'D'), np.datetime64(end, 'D'), dates, cents)
+
+    def clone_multiple(self, schedulers, batch_size=500, until=None):
+        """
+        Clone many scheduled bank transactions at once. Per chunk, the bank
+        transactions of each account are created by
+        Transaction.objects.create_multiple(), whereas the schedulers are
+        updated or deleted by a single statement each. A chunk which fails
+        is cloned again one by one, so that only the failing schedulers end
+        up with an explicit failed state.
+
+        Returns the number of bank transactions cloned by scheduler pk.
+
+        :param until: if any, catch up the occurrences missed until the
+            period of this date, see Scheduler.get_clone_dates()
+        """
+        counts = OrderedDict()
+        schedulers = list(schedulers)
+        for i in range(0, len(schedulers), batch_size):
+            chunk = schedulers[i:i + batch_size]
+            try:
+                with transaction.atomic():
+                    counts.update(self._clone_chunk(chunk, until))
+            except Exception as e:
+                logger.exception(e)
+                for scheduler in chunk:
+                    # Read before, the pk being reset if the clone deletes it.
+                    pk = scheduler.pk
+                    counts[pk] = scheduler.clone(until=until)
+        return counts
+
+    def _clone_chunk(self, schedulers, until):
+        dates, clones = OrderedDict(), {}
+        for scheduler in schedulers:
+            dates[scheduler] = scheduler.get_clone_dates(until)
+            clones.setdefault(scheduler.account, []).extend(
+                Transaction(**scheduler.get_clone_values(date)) for date in dates[scheduler]
+            )
+        # All the accounts are locked at once, in the same order for all the
+        # runs, so that they wait for each other without deadlocking. If the
+        # chunk fails, these locks are released with it: the one by one
+        # fallback relies on those taken beforehand by _clone_claimed().
+        Account.objects.lock([account.pk for account in clones])
+        for account, transactions in clones.items():
+            Transaction.objects.create_multiple(account, transactions)
+
+        now = timezone.now()
+        finished, deleted = OrderedDict(), []
+        for scheduler, scheduler_dates in dates.items():
+            recurrence = scheduler.recurrence
+            if recurrence is not None:
+                recurrence -= len(scheduler_dates)
+            if recurrence is not None and recurrence <= 0:
+                deleted.append(scheduler.pk)
+            else:
+                finished[scheduler] = (scheduler_dates[-1], recurrence)
+
+        if deleted:
+            self.filter(pk__in=deleted).delete()
+        if finished:
+            updates = {
+                'date': Case(
+                    *[When(pk=scheduler.pk, then=Value(values[0])) for scheduler, values in finished.items()],
+                    output_field=models.DateField()
+                ),
+                'last_action': now,
+                'state': Scheduler.STATE_FINISHED,
+            }
+            # Endless schedulers keep their NULL recurrence. No NULL branch
+            # at all, otherwise a CASE of NULL only is typed as text by
+            # PostgreSQL, which then refuses to set it to the smallint column.
+            recurrences = [
+                When(pk=scheduler.pk, then=Value(values[1]))
+                for scheduler, values in finished.items() if values[1] is not None
+            ]
+            if recurrences:
+                updates['recurrence'] = Case(
+                    *recurrences, default=F('recurrence'), output_field=models.PositiveSmallIntegerField()
+                )
+            self.filter(pk__in=[scheduler.pk for scheduler in finished]).update(**updates)
+
+        # Only once saved, a failure being cloned again one by one.
+        for scheduler, (date, recurrence) in finished.items():
+            scheduler.date, scheduler.recurrence = date, recurrence
+            scheduler.last_action = now
+            scheduler.state = Scheduler.STATE_FINISHED
+
+        return [(scheduler.pk, len(scheduler_dates)) for scheduler, scheduler_dates in dates.items()]
+
     def get_total_debit(self, account):
         return dict(
             self.filter(
@@ -81,10 +308,12 @@ class Scheduler(AbstractTransaction):
     STATE_WAITING = 'waiting'
     STATE_FINISHED = 'finished'
     STATE_FAILED = 'failed'
+    STATE_CLAIMED = 'claimed'
     STATES = (
         (STATE_WAITING, _('Waiting')),
         (STATE_FINISHED, _('Finished')),
         (STATE_FAILED, _('Failed')),
+        (STATE_CLAIMED, _('Claimed')),
     )
 
     type = models.CharField(
@@ -122,53 +351,113 @@ class Scheduler(AbstractTransaction):
             models.Index(fields=['state', 'last_action']),
         ]
 
-    def clone(self):
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Account.objects.bump_version(self.account)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            super().delete(*args, **kwargs)
+            Account.objects.bump_version(self.account)
+
+    def get_next_date(self, date=None):
+        """
+        Returns the date of the next bank transaction cloned, after the one
+        given if any.
+        """
+        date = date or self.date
+        if self.type == Scheduler.TYPE_MONTHLY:
+            return date + relativedelta(months=1)
+        return date + timedelta(weeks=1)
+
+    def get_clone_dates(self, until=None):
+        """
+        Returns the dates of the bank transactions to clone: the next one,
+        and with a date given, any other missed until the end of its week or
+        month, like if they had been cloned at the start of each period.
+        Recurrence is respected.
+        """
+        dates = [self.get_next_date()]
+        if until is None:
+            return dates
+
+        granularity = GRANULARITY_WEEK if self.type == Scheduler.TYPE_WEEKLY else GRANULARITY_MONTH
+        end = get_date_ranges(until, granularity)[1]
+        while self.recurrence is None or len(dates) < self.recurrence:
+            date = self.get_next_date(dates[-1])
+            if date > end:
+                break
+            dates.append(date)
+        return dates
+
+    def get_clone_values(self, date=None):
         """
-        Clone the model instance into a transaction instance.
+        Returns the field values of the next bank transaction cloned, or of
+        the one of the date given.
         """
+        return {
+            'label': self.label,
+            'account': self.account,
+            'date': date or self.get_next_date(),
+            'amount': self.amount,
+            'status': self.status,
+            'reconciled': False,
+            'payment_method': self.payment_method,
+            'memo': self.memo,
+            'tag_id': self.tag_id,
+            'scheduled': True,
+        }
+
+    def clone(self, until=None):
+        """
+        Clone the model instance into a transaction instance, or into all
+        those missed until the date given, see get_clone_dates(). Returns the
+        number of bank transactions created.
+        """
+        dates = self.get_clone_dates(until)
 
         try:
             with transaction.atomic():
 
-                # Create a new bank transaction based on model.
-                if self.type == Scheduler.TYPE_MONTHLY:
-                    datedelta = relativedelta(months=1)
-                elif self.type == Scheduler.TYPE_WEEKLY:  # pragma: no branch
-                    datedelta = timedelta(weeks=1)
-
-                Transaction.objects.create(
-                    label=self.label,
-                    account=self.account,
-                    date=self.date + datedelta,
-                    amount=self.amount,
-                    status=self.status,
-                    reconciled=False,
-                    payment_method=self.payment_method,
-                    memo=self.memo,
-                    tag=self.tag,
-                    scheduled=True,
-                )
+                # Create new bank transactions based on model.
+                for date in dates:
+                    Transaction.objects.create(**self.get_clone_values(date))
 
                 # Then update the scheduled bank transaction or delete it.
                 if self.recurrence is not None:
-                    self.recurrence -= 1
+                    self.recurrence -= len(dates)
 
                 if self.recurrence is not None and self.recurrence <= 0:
                     self.delete()
                 else:
-                    self.date = self.date + datedelta
+                    self.date = dates[-1]
                     self.last_action = timezone.now()
                     self.state = Scheduler.STATE_FINISHED
                     self.save()
 
         except Exception as e:
             logger.exception(e)
-            try:
+            self._release(e)
+            return 0
+
+        return len(dates)
+
+    def _release(self, error):
+        try:
+            if isinstance(error, OperationalError):
+                # Deadlocks, serialization failures or a database locked are
+                # transient: the scheduler is left awaiting for a next run
+                # instead of an explicit failed state never cloned again.
+                Scheduler.objects\
+                    .filter(pk=self.pk, state=Scheduler.STATE_CLAIMED)\
+                    .update(state=Scheduler.STATE_WAITING)
+            else:
                 # Try to release lock with an explicit failed state. Use
                 # low-level API to prevent potential new exception (instead of
                 # a new save() method with update_fields).
                 Scheduler.objects\
                     .filter(pk=self.pk)\
                     .update(state=Scheduler.STATE_FAILED)
-            except Exception:
-                pass
+        except Exception:
+            pass
@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+import numpy as np
+
+CENT = Decimal('0.01')
+
+
+def to_cents(amounts):
+    """
+    Returns an array of int64 cents of the decimal amounts given.
+    """
+    return np.array([int(Decimal(amount).scaleb(2)) for amount in amounts], dtype=np.int64)
+
+
+def from_cents(cents):
+    """
+    Returns the decimal amount of the cents given.
+    """
+    return Decimal(int(cents)).scaleb(-2).quantize(CENT)
+
+
+def expand_ranges(counts):
+    """
+    Returns a tuple (segments, ranks) flattening the ranges 1..count of each
+    count given, i.e: [2, 3] gives ([0, 0, 1, 1, 1], [1, 2, 1, 2, 3]).
+    """
+    counts = np.maximum(counts, 0)
+    segments = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    ranks = np.arange(counts.sum()) - starts[segments] + 1
+    return segments, ranks
+
+
+def expand_weekly(dates, recurrences, end):
+    """
+    Returns a tuple (segments, dates) of the occurrences of weekly
+    schedulers until the end date included.
+
+    :param dates: datetime64[D] array of the last dates scheduled
+    :param recurrences: int array of the clones remaining, -1 for unlimited
+    :param end: datetime64[D] of the last day
+    """
+    counts = (end - dates).astype(np.int64) // 7
+    counts = np.where(recurrences >= 0, np.minimum(counts, recurrences), counts)
+    segments, ranks = expand_ranges(counts)
+    return segments, dates[segments] + ranks * 7
+
+
+def expand_monthly(dates, recurrences, end):
+    """
+    Returns a tuple (segments, dates) of the occurrences of monthly
+    schedulers until the end date included. As the clones are a month after
+    each other, a day clamped by a shorter month stays so, e.g: Jan 31,
+    Feb 28 then Mar 28.
+    """
+    months = dates.astype('datetime64[M]')
+    days = (dates - months.astype('datetime64[D]')).astype(np.int64) + 1
+
+    counts = (end.astype('datetime64[M]') - months).astype(np.int64)
+    counts = np.where(recurrences >= 0, np.minimum(counts, recurrences), counts)
+    segments, ranks = expand_ranges(counts)
+
+    occurrences = months[segments] + ranks
+    lengths = ((occurrences + 1).astype('datetime64[D]') - occurrences.astype('datetime64[D]')).astype(np.int64)
+
+    # Running minimum of the lengths restarted for each scheduler: offsets
+    # decreasing by segment put each one below all the previous ones.
+    offsets = (len(dates) - segments) * 32
+    lengths = np.minimum.accumulate(lengths + offsets) - offsets
+
+    occurrences = occurrences.astype('datetime64[D]') + np.minimum(days[segments], lengths) - 1
+    kept = occurrences <= end
+    return segments[kept], occurrences[kept]
+
+
+def project_balance(balance, start, end, dates, cents):
+    """
+    Returns an int64 array of the daily balances in cents from the start to
+    the end date included.
+
+    :param balance: the balance in cents of the start date
+    :param dates: datetime64[D] array of the future amounts, those before the
+        start being accounted on the start date
+    :param cents: int64 array of the future amounts in cents
+    """
+    days = (end - start).astype(np.int64) + 1
+    kept = dates <= end
+    indexes = np.maximum((dates[kept] - start).astype(np.int64), 0)
+    # Float weights are exact for integers below 2 ** 53.
+    daily = np.bincount(indexes, weights=cents[kept], minlength=days)
+    return balance + np.cumsum(np.rint(daily).astype(np.int64))
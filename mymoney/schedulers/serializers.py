@@ -29,3 +29,7 @@ class SchedulerCreateSerializer(SchedulerSerializer):
             instance.clone()
 
         return instance
+
+
+class SchedulerProjectionInputSerializer(serializers.Serializer):
+    months = serializers.IntegerField(min_value=1, max_value=60, default=12)
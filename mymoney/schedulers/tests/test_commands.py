@@ -1,4 +1,6 @@
 import datetime
+from decimal import Decimal
+from unittest import mock
 
 from django.core.management import call_command
 from django.test import TestCase
@@ -77,3 +79,74 @@ class CommandTestCase(TestCase):
         call_command('clonescheduled', stdout=out)
         self.assertEqual(Transaction.objects.all().count(), 2)
         self.assertIn('Scheduled bank transaction have been cloned.', out.getvalue())
+
+    def test_batch(self):
+        account = AccountFactory(balance=0)
+        SchedulerFactory.create_batch(
+            3,
+            account=account,
+            amount=-10,
+            recurrence=None,
+            state=Scheduler.STATE_WAITING,
+        )
+        out = StringIO()
+        call_command('clonescheduled', batch=True, batch_size=2, stdout=out)
+        self.assertEqual(Transaction.objects.all().count(), 3)
+        self.assertEqual(Scheduler.objects.filter(state=Scheduler.STATE_FINISHED).count(), 3)
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('-30'))
+
+        call_command('clonescheduled', batch=True, stdout=out)
+        self.assertEqual(Transaction.objects.all().count(), 3)
+
+    @mock.patch('mymoney.schedulers.management.commands.clonescheduled.connections')
+    @mock.patch('mymoney.schedulers.management.commands.clonescheduled.multiprocessing.Pool')
+    def test_workers(self, mock_pool, mock_connections):
+        # Worker processes cannot share the test database, so run serially.
+        pool = mock_pool.return_value.__enter__.return_value
+        pool.starmap.side_effect = lambda func, args: [func(*arguments) for arguments in args]
+
+        SchedulerFactory.create_batch(5, recurrence=None, state=Scheduler.STATE_WAITING)
+        out = StringIO()
+        call_command('clonescheduled', workers=2, limit=4, batch_size=1, stdout=out)
+
+        mock_pool.assert_called_once_with(2)
+        self.assertEqual(pool.starmap.call_args[0][1], [(1, 2, None)] * 2)
+        self.assertEqual(Transaction.objects.all().count(), 4)
+        self.assertEqual(Scheduler.objects.get_awaiting_transactions().count(), 1)
+
+    @mock.patch('mymoney.schedulers.management.commands.clonescheduled.connections')
+    @mock.patch('mymoney.schedulers.management.commands.clonescheduled.multiprocessing.Pool')
+    def test_workers_limit(self, mock_pool, mock_connections):
+        pool = mock_pool.return_value.__enter__.return_value
+        pool.starmap.return_value = []
+
+        # The total limit is never exceeded.
+        call_command('clonescheduled', workers=4, limit=5, batch_size=1, stdout=StringIO())
+        self.assertEqual([args[1] for args in pool.starmap.call_args[0][1]], [2, 1, 1, 1])
+
+        call_command('clonescheduled', workers=4, limit=2, batch_size=1, stdout=StringIO())
+        self.assertEqual([args[1] for args in pool.starmap.call_args[0][1]], [1, 1])
+
+    @mock.patch('mymoney.schedulers.management.commands.clonescheduled.datetime')
+    def test_catch_up(self, mock_datetime):
+        mock_datetime.date.today.return_value = datetime.date(2015, 11, 2)
+        account = AccountFactory(balance=0)
+        scheduler = SchedulerFactory(
+            account=account,
+            label='foo',
+            type=Scheduler.TYPE_MONTHLY,
+            date=datetime.date(2015, 8, 5),
+            amount=-10,
+            recurrence=None,
+            state=Scheduler.STATE_WAITING,
+        )
+        out = StringIO()
+        call_command('clonescheduled', catch_up=True, stdout=out)
+        self.assertEqual(Transaction.objects.all().count(), 3)
+        self.assertIn('{} "foo": 3 bank transaction(s) cloned.'.format(scheduler.pk), out.getvalue())
+
+        scheduler.refresh_from_db()
+        self.assertEqual(scheduler.date, datetime.date(2015, 11, 5))
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('-30'))
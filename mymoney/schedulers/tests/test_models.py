@@ -1,12 +1,17 @@
 import datetime
+import threading
 from decimal import Decimal
+from unittest import skipIf
 from unittest.mock import patch
 
+from django.db import OperationalError, connection, transaction
 from django.db.models import QuerySet
-from django.test import TestCase, override_settings
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from mymoney.accounts.factories import AccountFactory
+from mymoney.accounts.models import Account
 from mymoney.tags.factories import TagFactory
 from mymoney.transactions.models import Transaction
 
@@ -151,6 +156,66 @@ class SchedulerModelTestCase(TestCase):
         scheduler.refresh_from_db()
         self.assertEqual(scheduler.state, Scheduler.STATE_FINISHED)
 
+    def test_clone_dates(self):
+        scheduler = SchedulerFactory.build(
+            type=Scheduler.TYPE_MONTHLY,
+            date=datetime.date(2015, 10, 5),
+            recurrence=None,
+        )
+        self.assertListEqual(scheduler.get_clone_dates(), [datetime.date(2015, 11, 5)])
+        # Up to date, the next one anyway.
+        self.assertListEqual(
+            scheduler.get_clone_dates(datetime.date(2015, 10, 6)),
+            [datetime.date(2015, 11, 5)],
+        )
+        self.assertListEqual(
+            scheduler.get_clone_dates(datetime.date(2015, 12, 1)),
+            [datetime.date(2015, 11, 5), datetime.date(2015, 12, 5)],
+        )
+
+    def test_clone_dates_weekly(self):
+        scheduler = SchedulerFactory.build(
+            type=Scheduler.TYPE_WEEKLY,
+            date=datetime.date(2015, 10, 1),
+            recurrence=None,
+        )
+        # Weeks start on Sunday in english, so until Saturday 7.
+        self.assertListEqual(
+            scheduler.get_clone_dates(datetime.date(2015, 11, 2)),
+            [
+                datetime.date(2015, 10, 8),
+                datetime.date(2015, 10, 15),
+                datetime.date(2015, 10, 22),
+                datetime.date(2015, 10, 29),
+                datetime.date(2015, 11, 5),
+            ],
+        )
+
+    def test_clone_dates_recurrence(self):
+        scheduler = SchedulerFactory.build(
+            type=Scheduler.TYPE_MONTHLY,
+            date=datetime.date(2015, 1, 31),
+            recurrence=2,
+        )
+        self.assertListEqual(
+            scheduler.get_clone_dates(datetime.date(2015, 11, 2)),
+            [datetime.date(2015, 2, 28), datetime.date(2015, 3, 28)],
+        )
+
+    def test_clone_catch_up(self):
+        scheduler = SchedulerFactory(
+            type=Scheduler.TYPE_MONTHLY,
+            date=datetime.date(2015, 8, 5),
+            recurrence=3,
+            state=Scheduler.STATE_WAITING,
+        )
+        self.assertEqual(scheduler.clone(until=datetime.date(2015, 11, 2)), 3)
+        self.assertListEqual(
+            list(Transaction.objects.order_by('date').values_list('date', flat=True)),
+            [datetime.date(2015, 9, 5), datetime.date(2015, 10, 5), datetime.date(2015, 11, 5)],
+        )
+        self.assertFalse(Scheduler.objects.filter(pk=scheduler.pk).exists())
+
     @patch(
         'mymoney.schedulers.models.Transaction.objects.create',
         side_effect=Exception('Boom'),
@@ -195,17 +260,32 @@ class SchedulerModelTestCase(TestCase):
         self.assertEqual(scheduler.recurrence, 2)
         self.assertEqual(Transaction.objects.count(), 0)
 
-    @patch.object(Scheduler, 'delete', side_effect=Exception('Boom'))
-    @patch.object(QuerySet, 'update', side_effect=Exception('Boom'))
-    def test_clone_except_fail(self, mock_update, mock_delete):
+    def test_clone_transient_fail(self):
+        waiting = SchedulerFactory(state=Scheduler.STATE_WAITING)
+        claimed = SchedulerFactory(state=Scheduler.STATE_CLAIMED)
+        with patch.object(Transaction.objects, 'create', side_effect=OperationalError('deadlock detected')):
+            with self.assertLogs(logger='mymoney.errors', level='ERROR'):
+                self.assertEqual(waiting.clone(), 0)
+                self.assertEqual(claimed.clone(), 0)
+
+        # Left awaiting for a next run.
+        waiting.refresh_from_db()
+        claimed.refresh_from_db()
+        self.assertEqual(waiting.state, Scheduler.STATE_WAITING)
+        self.assertEqual(claimed.state, Scheduler.STATE_WAITING)
+        self.assertEqual(Scheduler.objects.get_awaiting_transactions().count(), 2)
+
+    def test_clone_except_fail(self):
         scheduler = SchedulerFactory(
             recurrence=1,
             state=Scheduler.STATE_WAITING,
             date=datetime.date(2015, 1, 31),
             last_action=None,
         )
-        with self.assertLogs(logger='mymoney.errors', level='ERROR'):
-            scheduler.clone()
+        with patch.object(Scheduler, 'delete', side_effect=Exception('Boom')), \
+                patch.object(QuerySet, 'update', side_effect=Exception('Boom')):
+            with self.assertLogs(logger='mymoney.errors', level='ERROR'):
+                scheduler.clone()
         scheduler.refresh_from_db()
         self.assertEqual(scheduler.state, Scheduler.STATE_WAITING)
         self.assertIsNone(scheduler.last_action)
@@ -617,6 +697,373 @@ class SchedulerManagerTestCase(TestCase):
         self.assertEqual(result['weekly'], 30)
 
 
+class CloneMultipleTestCase(TestCase):
+
+    def tearDown(self):
+        Transaction.objects.all().delete()
+
+    def test_clone(self):
+        account1 = AccountFactory(balance=0)
+        account2 = AccountFactory(balance=0)
+        monthly = SchedulerFactory(
+            account=account1,
+            type=Scheduler.TYPE_MONTHLY,
+            date=datetime.date(2015, 1, 31),
+            amount=-10,
+            recurrence=None,
+            state=Scheduler.STATE_WAITING,
+        )
+        weekly = SchedulerFactory(
+            account=account2,
+            type=Scheduler.TYPE_WEEKLY,
+            date=datetime.date(2015, 1, 31),
+            amount=20,
+            recurrence=3,
+            state=Scheduler.STATE_WAITING,
+        )
+        last = SchedulerFactory(
+            account=account1,
+            type=Scheduler.TYPE_MONTHLY,
+            date=datetime.date(2015, 1, 10),
+            amount=-5,
+            recurrence=1,
+            state=Scheduler.STATE_WAITING,
+        )
+
+        Scheduler.objects.clone_multiple(Scheduler.objects.select_related('account').order_by('pk'))
+
+        self.assertListEqual(
+            sorted(Transaction.objects.values_list('account', 'date', 'amount', 'scheduled', 'reconciled')),
+            sorted([
+                (account1.pk, datetime.date(2015, 2, 28), Decimal('-10'), True, False),
+                (account2.pk, datetime.date(2015, 2, 7), Decimal('20'), True, False),
+                (account1.pk, datetime.date(2015, 2, 10), Decimal('-5'), True, False),
+            ]),
+        )
+        account1.refresh_from_db()
+        account2.refresh_from_db()
+        self.assertEqual(account1.balance, Decimal('-15'))
+        self.assertEqual(account2.balance, Decimal('20'))
+
+        monthly.refresh_from_db()
+        self.assertEqual(monthly.date, datetime.date(2015, 2, 28))
+        self.assertIsNone(monthly.recurrence)
+        self.assertEqual(monthly.state, Scheduler.STATE_FINISHED)
+        self.assertIsNotNone(monthly.last_action)
+
+        weekly.refresh_from_db()
+        self.assertEqual(weekly.date, datetime.date(2015, 2, 7))
+        self.assertEqual(weekly.recurrence, 2)
+        self.assertEqual(weekly.state, Scheduler.STATE_FINISHED)
+
+        self.assertFalse(Scheduler.objects.filter(pk=last.pk).exists())
+
+    def test_queries(self):
+        queries = []
+        for count in (2, 10):
+            account = AccountFactory()
+            SchedulerFactory.create_batch(
+                count,
+                account=account,
+                type=Scheduler.TYPE_MONTHLY,
+                date=datetime.date(2015, 1, 31),
+                recurrence=None,
+            )
+            schedulers = list(Scheduler.objects.filter(account=account).select_related('account'))
+            with CaptureQueriesContext(connection) as context:
+                Scheduler.objects.clone_multiple(schedulers)
+            queries.append(len(context.captured_queries))
+        self.assertEqual(queries[0], queries[1])
+
+    def test_endless(self):
+        account = AccountFactory(balance=0)
+        schedulers = SchedulerFactory.create_batch(2, account=account, amount=-10, recurrence=None)
+        with patch.object(Scheduler, 'clone') as mock_clone, \
+                CaptureQueriesContext(connection) as context:
+            Scheduler.objects.clone_multiple(Scheduler.objects.select_related('account'))
+
+        # No fallback, and no CASE of NULL only which PostgreSQL types as text.
+        self.assertFalse(mock_clone.called)
+        updates = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE "schedulers"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"recurrence"', updates[0])
+        for scheduler in schedulers:
+            scheduler.refresh_from_db()
+            self.assertIsNone(scheduler.recurrence)
+            self.assertEqual(scheduler.state, Scheduler.STATE_FINISHED)
+
+    def test_recurrence_mixed(self):
+        account = AccountFactory(balance=0)
+        endless = SchedulerFactory(account=account, amount=-10, recurrence=None)
+        recurring = SchedulerFactory(account=account, amount=-10, recurrence=3)
+        Scheduler.objects.clone_multiple(Scheduler.objects.select_related('account'))
+        endless.refresh_from_db()
+        recurring.refresh_from_db()
+        self.assertIsNone(endless.recurrence)
+        self.assertEqual(recurring.recurrence, 2)
+
+    def test_batch_size(self):
+        account = AccountFactory(balance=0)
+        SchedulerFactory.create_batch(5, account=account, amount=-10, recurrence=None)
+        with patch.object(Transaction.objects, 'create_multiple',
+                          wraps=Transaction.objects.create_multiple) as mock_create:
+            Scheduler.objects.clone_multiple(Scheduler.objects.select_related('account'), batch_size=2)
+        self.assertEqual(mock_create.call_count, 3)
+        self.assertEqual(Transaction.objects.count(), 5)
+
+    def test_fail_fallback(self):
+        account = AccountFactory(balance=0)
+        SchedulerFactory.create_batch(2, account=account, amount=-10, recurrence=None)
+        with patch.object(Transaction.objects, 'create_multiple', side_effect=Exception('Boom')):
+            with self.assertLogs(logger='mymoney.errors', level='ERROR'):
+                Scheduler.objects.clone_multiple(Scheduler.objects.select_related('account'))
+
+        # Cloned one by one instead.
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(Scheduler.objects.filter(state=Scheduler.STATE_FINISHED).count(), 2)
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('-20'))
+
+    def test_fail_item(self):
+        account = AccountFactory(balance=0)
+        scheduler = SchedulerFactory(account=account, amount=-10, recurrence=None, state=Scheduler.STATE_WAITING)
+        failing = SchedulerFactory(account=account, amount=-20, recurrence=None, state=Scheduler.STATE_WAITING)
+
+        create = Transaction.objects.create
+
+        def create_or_fail(**kwargs):
+            if kwargs['amount'] == failing.amount:
+                raise Exception('Boom')
+            return create(**kwargs)
+
+        with patch.object(Transaction.objects, 'create_multiple', side_effect=Exception('Boom')), \
+                patch.object(Transaction.objects, 'create', side_effect=create_or_fail):
+            with self.assertLogs(logger='mymoney.errors', level='ERROR'):
+                Scheduler.objects.clone_multiple(Scheduler.objects.select_related('account'))
+
+        scheduler.refresh_from_db()
+        failing.refresh_from_db()
+        self.assertEqual(scheduler.state, Scheduler.STATE_FINISHED)
+        self.assertEqual(failing.state, Scheduler.STATE_FAILED)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_catch_up(self):
+        account = AccountFactory(balance=0)
+        monthly = SchedulerFactory(
+            account=account,
+            type=Scheduler.TYPE_MONTHLY,
+            date=datetime.date(2015, 7, 31),
+            amount=-10,
+            recurrence=None,
+        )
+        weekly = SchedulerFactory(
+            account=account,
+            type=Scheduler.TYPE_WEEKLY,
+            date=datetime.date(2015, 10, 1),
+            amount=-1,
+            recurrence=3,
+        )
+        counts = Scheduler.objects.clone_multiple(
+            Scheduler.objects.select_related('account').order_by('pk'),
+            until=datetime.date(2015, 11, 2),
+        )
+        self.assertEqual(counts, {monthly.pk: 4, weekly.pk: 3})
+
+        self.assertListEqual(
+            list(Transaction.objects.filter(amount=-10).order_by('date').values_list('date', flat=True)),
+            [
+                datetime.date(2015, 8, 31),
+                datetime.date(2015, 9, 30),
+                datetime.date(2015, 10, 30),
+                datetime.date(2015, 11, 30),
+            ],
+        )
+        self.assertEqual(Transaction.objects.filter(amount=-1).count(), 3)
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('-43'))
+
+        monthly.refresh_from_db()
+        self.assertEqual(monthly.date, datetime.date(2015, 11, 30))
+        self.assertEqual(monthly.state, Scheduler.STATE_FINISHED)
+        self.assertFalse(Scheduler.objects.filter(pk=weekly.pk).exists())
+
+    def test_catch_up_fail_fallback(self):
+        account = AccountFactory(balance=0)
+        scheduler = SchedulerFactory(
+            account=account,
+            type=Scheduler.TYPE_MONTHLY,
+            date=datetime.date(2015, 8, 5),
+            amount=-10,
+            recurrence=5,
+        )
+        with patch.object(Transaction.objects, 'create_multiple', side_effect=Exception('Boom')):
+            with self.assertLogs(logger='mymoney.errors', level='ERROR'):
+                counts = Scheduler.objects.clone_multiple(
+                    Scheduler.objects.select_related('account'),
+                    until=datetime.date(2015, 11, 2),
+                )
+        self.assertEqual(counts, {scheduler.pk: 3})
+        scheduler.refresh_from_db()
+        self.assertEqual(scheduler.date, datetime.date(2015, 11, 5))
+        self.assertEqual(scheduler.recurrence, 2)
+        self.assertEqual(Transaction.objects.count(), 3)
+
+
+    def test_fail_fallback_deleted(self):
+        account = AccountFactory(balance=0)
+        schedulers = SchedulerFactory.create_batch(2, account=account, amount=-10, recurrence=1)
+        with patch.object(Transaction.objects, 'create_multiple', side_effect=Exception('Boom')):
+            with self.assertLogs(logger='mymoney.errors', level='ERROR'):
+                counts = Scheduler.objects.clone_multiple(Scheduler.objects.select_related('account').order_by('pk'))
+        # Counted by their pk even though deleted by their clone.
+        self.assertEqual(counts, {schedulers[0].pk: 1, schedulers[1].pk: 1})
+        self.assertFalse(Scheduler.objects.exists())
+
+class ClaimTestCase(TestCase):
+
+    def test_claim(self):
+        schedulers = [
+            SchedulerFactory(date=datetime.date(2015, 1, day), state=Scheduler.STATE_WAITING)
+            for day in (3, 1, 2)
+        ]
+        with transaction.atomic():
+            claimed = Scheduler.objects.claim(2)
+            self.assertListEqual(claimed, [schedulers[1], schedulers[2]])
+            self.assertListEqual(Scheduler.objects.claim(2, exclude=[s.pk for s in claimed]), [schedulers[0]])
+
+    @skipIf(connection.features.has_select_for_update_skip_locked, 'Claimed by row locks.')
+    def test_claim_state(self):
+        scheduler = SchedulerFactory(state=Scheduler.STATE_WAITING)
+        self.assertListEqual(Scheduler.objects.claim(10), [scheduler])
+
+        scheduler.refresh_from_db()
+        self.assertEqual(scheduler.state, Scheduler.STATE_CLAIMED)
+        self.assertListEqual(Scheduler.objects.claim(10), [])
+
+    def test_claim_timeout(self):
+        scheduler = SchedulerFactory(
+            state=Scheduler.STATE_CLAIMED,
+            last_action=timezone.now() - datetime.timedelta(minutes=10),
+        )
+        self.assertFalse(Scheduler.objects.get_awaiting_transactions().exists())
+
+        Scheduler.objects.filter(pk=scheduler.pk).update(last_action=timezone.now() - datetime.timedelta(hours=2))
+        self.assertListEqual(list(Scheduler.objects.get_awaiting_transactions()), [scheduler])
+
+    def test_clone_awaiting(self):
+        account = AccountFactory(balance=0)
+        SchedulerFactory.create_batch(5, account=account, amount=-10, recurrence=None, state=Scheduler.STATE_WAITING)
+
+        counts = Scheduler.objects.clone_awaiting(batch_size=2, limit=3)
+        self.assertListEqual(list(counts.values()), [1, 1, 1])
+        self.assertEqual(Transaction.objects.count(), 3)
+
+        # Those cloned are not excluded explicitly by the next claims.
+        with CaptureQueriesContext(connection) as context:
+            counts = Scheduler.objects.clone_awaiting(batch_size=2)
+        self.assertFalse([query for query in context.captured_queries if 'NOT ("schedulers"."id" IN' in query['sql']])
+        self.assertEqual(len(counts), 2)
+        self.assertEqual(Scheduler.objects.filter(state=Scheduler.STATE_FINISHED).count(), 5)
+        self.assertFalse(Scheduler.objects.clone_awaiting())
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('-50'))
+
+    @patch.object(Transaction.objects, 'create', side_effect=Exception('Boom'))
+    @patch.object(Transaction.objects, 'create_multiple', side_effect=Exception('Boom'))
+    def test_clone_awaiting_fail(self, *mocks):
+        scheduler = SchedulerFactory(state=Scheduler.STATE_WAITING)
+        with self.assertLogs(logger='mymoney.errors', level='ERROR'):
+            counts = Scheduler.objects.clone_awaiting()
+        self.assertEqual(counts, {scheduler: 0})
+        scheduler.refresh_from_db()
+        self.assertEqual(scheduler.state, Scheduler.STATE_FAILED)
+
+
+    @patch.object(Transaction.objects, 'create', side_effect=OperationalError('deadlock detected'))
+    @patch.object(Transaction.objects, 'create_multiple', side_effect=OperationalError('deadlock detected'))
+    def test_clone_awaiting_transient_fail(self, *mocks):
+        scheduler = SchedulerFactory(state=Scheduler.STATE_WAITING)
+        with self.assertLogs(logger='mymoney.errors', level='ERROR'):
+            counts = Scheduler.objects.clone_awaiting()
+        self.assertEqual(counts, {scheduler: 0})
+        scheduler.refresh_from_db()
+        self.assertEqual(scheduler.state, Scheduler.STATE_WAITING)
+
+    @patch.object(connection.features, 'has_select_for_update_skip_locked', True)
+    def test_clone_awaiting_lock(self):
+        accounts = AccountFactory.create_batch(2, balance=0)
+        for account in reversed(accounts):
+            SchedulerFactory.create_batch(
+                2, account=account, amount=-10, recurrence=None, state=Scheduler.STATE_WAITING,
+            )
+
+        with patch.object(Account.objects, 'lock', wraps=Account.objects.lock) as mock_lock, \
+                patch.object(Transaction.objects, 'create_multiple', side_effect=Exception('Boom')):
+            with self.assertLogs(logger='mymoney.errors', level='ERROR'):
+                counts = Scheduler.objects.clone_awaiting()
+
+        # All the accounts of the claim are locked before any clone, even
+        # those cloned one by one once the chunk failed.
+        self.assertEqual(set(mock_lock.call_args_list[0][0][0]), {account.pk for account in accounts})
+        self.assertListEqual(list(counts.values()), [1, 1, 1, 1])
+        for account in accounts:
+            account.refresh_from_db()
+            self.assertEqual(account.balance, Decimal('-20'))
+
+class ConcurrentCloneTestCase(TransactionTestCase):
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Workers cannot share an in-memory database.')
+
+    def test_workers(self):
+        accounts = AccountFactory.create_batch(3, balance=0)
+        for i in range(60):
+            SchedulerFactory(
+                account=accounts[i % 3],
+                label='scheduler {}'.format(i),
+                amount=-10,
+                recurrence=None,
+                state=Scheduler.STATE_WAITING,
+            )
+
+        results = []
+
+        def worker():
+            try:
+                results.append(Scheduler.objects.clone_awaiting(batch_size=5))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Each scheduler is cloned once, by a single worker.
+        pks = [scheduler.pk for counts in results for scheduler, count in counts.items() if count]
+        self.assertEqual(len(pks), len(set(pks)))
+        self.assertEqual(len(pks), Scheduler.objects.filter(state=Scheduler.STATE_FINISHED).count())
+
+        # None failed for good, those of a transient failure (e.g. a database
+        # locked) being left awaiting, or claimed until the timeout at worst.
+        self.assertFalse(Scheduler.objects.filter(state=Scheduler.STATE_FAILED).exists())
+        with patch.object(Scheduler.objects, 'claim_timeout', datetime.timedelta(0)):
+            Scheduler.objects.clone_awaiting()
+        self.assertEqual(Scheduler.objects.filter(state=Scheduler.STATE_FINISHED).count(), 60)
+
+        labels = list(Transaction.objects.values_list('label', flat=True))
+        self.assertEqual(len(labels), 60)
+        self.assertEqual(len(set(labels)), 60)
+
+        # Accounts being locked, their running balances are consistent.
+        for account in accounts:
+            self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+            account.refresh_from_db()
+            self.assertEqual(account.balance, -10 * Transaction.objects.filter(account=account).count())
+
+
 class RelationshipTestCase(TestCase):
 
     def test_delete_account(self):
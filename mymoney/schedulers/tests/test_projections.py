@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+import numpy as np
+
+from ..projections import (
+    expand_monthly, expand_ranges, expand_weekly, from_cents, project_balance,
+    to_cents,
+)
+
+
+def dates(*values):
+    return np.array(values, dtype='datetime64[D]')
+
+
+class ProjectionsTestCase(SimpleTestCase):
+
+    def test_cents(self):
+        self.assertListEqual(to_cents([Decimal('10.5'), Decimal('-0.01'), 3]).tolist(), [1050, -1, 300])
+        self.assertEqual(str(from_cents(-5)), '-0.05')
+        self.assertEqual(str(from_cents(0)), '0.00')
+        self.assertEqual(str(from_cents(123456)), '1234.56')
+
+    def test_expand_ranges(self):
+        segments, ranks = expand_ranges(np.array([2, 0, -1, 3]))
+        self.assertListEqual(segments.tolist(), [0, 0, 3, 3, 3])
+        self.assertListEqual(ranks.tolist(), [1, 2, 1, 2, 3])
+
+    def test_expand_weekly(self):
+        segments, occurrences = expand_weekly(
+            dates('2015-10-26', '2015-10-27', '2015-11-30'),
+            np.array([-1, 2, -1]),
+            np.datetime64('2015-11-16'),
+        )
+        self.assertListEqual(segments.tolist(), [0, 0, 0, 1, 1])
+        self.assertListEqual(
+            occurrences.tolist(),
+            dates('2015-11-02', '2015-11-09', '2015-11-16', '2015-11-03', '2015-11-10').tolist(),
+        )
+
+    def test_expand_monthly(self):
+        segments, occurrences = expand_monthly(
+            dates('2015-01-31', '2015-01-15', '2015-03-30'),
+            np.array([-1, 1, -1]),
+            np.datetime64('2015-04-29'),
+        )
+        self.assertListEqual(segments.tolist(), [0, 0, 0, 1])
+        # Clamped by February, as cloned a month after the other.
+        self.assertListEqual(
+            occurrences.tolist(),
+            dates('2015-02-28', '2015-03-28', '2015-04-28', '2015-02-15').tolist(),
+        )
+
+    def test_project_balance(self):
+        balances = project_balance(
+            1000,
+            np.datetime64('2015-11-01'),
+            np.datetime64('2015-11-05'),
+            dates('2015-10-20', '2015-11-03', '2015-11-03', '2015-11-05', '2015-11-30'),
+            np.array([-100, 50, -25, 1, 10000]),
+        )
+        self.assertListEqual(balances.tolist(), [900, 900, 925, 925, 926])
@@ -8,7 +8,10 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.reverse import reverse
 from rest_framework.test import APITestCase
 
+from dateutil.relativedelta import relativedelta
+
 from mymoney.accounts.factories import AccountFactory
+from mymoney.accounts.models import Account
 from mymoney.core.factories import UserFactory
 from mymoney.tags.factories import TagFactory
 from mymoney.transactions.factories import TransactionFactory
@@ -699,6 +702,38 @@ class SummaryViewTestCase(APITestCase):
     def tearDown(self):
         Scheduler.objects.all().delete()
 
+    def test_etag(self):
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        SchedulerFactory(account=self.account)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @mock.patch('mymoney.schedulers.views.timezone.now')
+    def test_etag_period(self, now):
+        Account.objects.update(last_modified=timezone.make_aware(datetime.datetime(2015, 1, 1)))
+        self.client.force_authenticate(self.user)
+        now.return_value = timezone.make_aware(datetime.datetime(2015, 10, 27, 12))
+        response = self.client.get(self.url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        now.return_value = timezone.make_aware(datetime.datetime(2015, 10, 28, 12))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Both weekly and monthly periods are over.
+        now.return_value = timezone.make_aware(datetime.datetime(2015, 11, 2, 12))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
     def test_access_anonymous(self):
         self.client.force_authenticate(None)
         response = self.client.get(self.url)
@@ -1086,3 +1121,69 @@ class SummaryViewTestCase(APITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data['summary']['monthly']['used'], -500)
         self.assertEqual(response.data['summary']['monthly']['remaining'], 200)
+
+
+class ProjectionViewTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.url = reverse('scheduler-projection')
+
+    def setUp(self):
+        self.account = AccountFactory(balance=0)
+
+    def tearDown(self):
+        Account.objects.all().delete()
+
+    def test_access_anonymous(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_months_invalid(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={'months': 61})
+        self.assertEqual(response.status_code, 400)
+
+    def test_months(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={'months': 2})
+        self.assertEqual(response.status_code, 200)
+        today = datetime.date.today()
+        self.assertEqual(response.data['date_start'], today)
+        self.assertEqual(response.data['date_end'], today + relativedelta(months=2))
+        self.assertEqual(len(response.data['results']), (response.data['date_end'] - today).days + 1)
+
+    @mock.patch('mymoney.schedulers.views.datetime')
+    def test_projection(self, mock_datetime):
+        today = datetime.date(2015, 10, 26)
+        mock_datetime.date.today.return_value = today
+        mock_datetime.timedelta = datetime.timedelta
+
+        TransactionFactory(account=self.account, amount=100, date=datetime.date(2015, 10, 1))
+        TransactionFactory(account=self.account, amount=-10, date=datetime.date(2015, 10, 28))
+        TransactionFactory(account=self.account, amount=-1000, date=datetime.date(2015, 10, 28),
+                           status=Transaction.STATUS_INACTIVE)
+        SchedulerFactory(account=self.account, type=Scheduler.TYPE_MONTHLY, amount=-50,
+                         date=datetime.date(2015, 10, 5), recurrence=None)
+        SchedulerFactory(account=self.account, type=Scheduler.TYPE_WEEKLY, amount=Decimal('20.5'),
+                         date=datetime.date(2015, 10, 20), recurrence=2)
+        SchedulerFactory(account=self.account, type=Scheduler.TYPE_WEEKLY, amount=-1000,
+                         date=datetime.date(2015, 10, 20), status=Scheduler.STATUS_INACTIVE)
+
+        self.client.force_authenticate(self.user)
+        with mock.patch('mymoney.transactions.models.date') as mock_date:
+            mock_date.today.return_value = today
+            response = self.client.get(self.url, data={'months': 1})
+        self.assertEqual(response.status_code, 200)
+
+        balances = {row['date']: row['balance'] for row in response.data['results']}
+        self.assertEqual(len(balances), 32)
+        self.assertEqual(balances[datetime.date(2015, 10, 26)], '100.00')
+        self.assertEqual(balances[datetime.date(2015, 10, 27)], '120.50')
+        self.assertEqual(balances[datetime.date(2015, 10, 28)], '110.50')
+        self.assertEqual(balances[datetime.date(2015, 11, 3)], '131.00')
+        self.assertEqual(balances[datetime.date(2015, 11, 4)], '131.00')
+        self.assertEqual(balances[datetime.date(2015, 11, 5)], '81.00')
+        self.assertEqual(balances[datetime.date(2015, 11, 26)], '81.00')
@@ -1,19 +1,33 @@
+import datetime
+
+from django.utils import timezone
+
 from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from dateutil.relativedelta import relativedelta
+
 from mymoney.core.utils import get_default_account
-from mymoney.core.utils.dates import GRANULARITY_MONTH, GRANULARITY_WEEK
+from mymoney.core.utils.dates import (
+    GRANULARITY_MONTH, GRANULARITY_WEEK, get_datetime_ranges,
+)
+from mymoney.core.views import ConditionalGetMixin
 from mymoney.transactions.models import Transaction
 
 from .models import Scheduler
-from .serializers import SchedulerCreateSerializer, SchedulerSerializer
+from .projections import from_cents
+from .serializers import (
+    SchedulerCreateSerializer, SchedulerProjectionInputSerializer,
+    SchedulerSerializer,
+)
 
 
-class SchedulerViewSet(ModelViewSet):
+class SchedulerViewSet(ConditionalGetMixin, ModelViewSet):
     filter_backends = (OrderingFilter,)
     ordering = ('-last_action', 'type', '-id')
+    conditional_actions = ('summary',)
 
     def get_queryset(self):
         return Scheduler.objects.filter(account=get_default_account())
@@ -23,6 +37,19 @@ class SchedulerViewSet(ModelViewSet):
             return SchedulerCreateSerializer
         return SchedulerSerializer
 
+    def get_period_start(self):
+        # The summary is about the current week and month too.
+        return max(
+            get_datetime_ranges(timezone.now(), granularity)[0]
+            for granularity in (GRANULARITY_WEEK, GRANULARITY_MONTH)
+        )
+
+    def get_etag_parts(self, account):
+        return super().get_etag_parts(account) + [self.get_period_start().date()]
+
+    def get_last_modified(self, account):
+        return max(super().get_last_modified(account), self.get_period_start())
+
     @action(methods=['get'], detail=False)
     def summary(self, request, *args, **kwargs):
         account = get_default_account()
@@ -62,3 +89,30 @@ class SchedulerViewSet(ModelViewSet):
             'summary': summary,
             'total': total,
         })
+
+    @action(methods=['get'], detail=False)
+    def projection(self, request, *args, **kwargs):
+        """
+        Daily balance of the bank account for the next months, with the bank
+        transactions to come and those the schedulers would clone.
+        """
+        serializer = SchedulerProjectionInputSerializer(
+            data=request.query_params, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+
+        start = datetime.date.today()
+        end = start + relativedelta(months=serializer.validated_data['months'])
+        balances = Scheduler.objects.get_balance_projection(get_default_account(), start, end)
+
+        return Response({
+            'date_start': start,
+            'date_end': end,
+            'results': [
+                {
+                    'date': start + datetime.timedelta(days=index),
+                    # As the serializers, decimals as strings.
+                    'balance': str(from_cents(balance)),
+                }
+                for index, balance in enumerate(balances.tolist())
+            ],
+        })
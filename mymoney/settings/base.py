@@ -52,6 +52,7 @@ MIDDLEWARE = [
 'django.contrib.auth.middleware.AuthenticationMiddleware',
 'django.contrib.messages.middleware.MessageMiddleware',
 'django.middleware.clickjacking.XFrameOptionsMiddleware',
+'mymoney.core.middleware.DefaultAccountMiddleware',
 ]
 
 ROOT_URLCONF = 'mymoney.urls'
@@ -126,6 +127,7 @@ LOGGING['loggers']['mymoney'] = {
     'handlers': ['mail_admins'],
     'level': 'ERROR',
 }
+DEFAULT_EXCEPTION_REPORTER_FILTER = 'mymoney.core.debug.ExceptionReporterFilter'
 
 
 REST_FRAMEWORK = {
@@ -139,7 +141,7 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'mymoney.core.pagination.CachedCountPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': ('django_filters.rest_framework.DjangoFilterBackend',),
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
@@ -4,6 +4,13 @@ from .base import *
 
 EMAIL_BACKEND = 'django.core.mail.backends.dummy.EmailBackend'
 
+# Cache is explicitly enabled by tests relying on it.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+
 # Boost perf a little
 PASSWORD_HASHERS = (
     'django.contrib.auth.hashers.MD5PasswordHasher',
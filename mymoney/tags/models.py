@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import ugettext_lazy as _
 
+from mymoney.accounts.models import Account
+
 
 class Tag(models.Model):
     name = models.CharField(max_length=128, verbose_name=_('Name'))
@@ -10,3 +12,14 @@ class Tag(models.Model):
 
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        # Tags are shared by every bank accounts.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Account.objects.bump_version()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            super().delete(*args, **kwargs)
+            Account.objects.bump_version()
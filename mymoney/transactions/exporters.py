@@ -0,0 +1,61 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+FORMAT_CSV = 'csv'
+FORMAT_NDJSON = 'ndjson'
+FORMATS = (FORMAT_CSV, FORMAT_NDJSON)
+
+CONTENT_TYPES = {
+    FORMAT_CSV: 'text/csv',
+    FORMAT_NDJSON: 'application/x-ndjson',
+}
+
+FIELDS = (
+    'id', 'label', 'date', 'amount', 'currency', 'status', 'reconciled',
+    'payment_method', 'memo', 'tag',
+)
+BALANCE_FIELDS = ('balance_total', 'balance_reconciled')
+
+
+class Echo:
+    """
+    Pseudo-buffer which returns what is written instead of storing it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_csv(rows, fields):
+    """
+    Yields a CSV file line by line, header included, with the same fields
+    names as the import.
+
+    :param rows: iterable of tuples, the values of the fields
+    :param fields: the fields names
+    :return: generator of str
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def export_ndjson(rows, fields):
+    """
+    Yields a JSON object per line.
+
+    :param rows: iterable of tuples, the values of the fields
+    :param fields: the fields names
+    :return: generator of str
+    """
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+EXPORTERS = {
+    FORMAT_CSV: export_csv,
+    FORMAT_NDJSON: export_ndjson,
+}
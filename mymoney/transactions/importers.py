@@ -0,0 +1,220 @@
+import csv
+import datetime
+import os
+import re
+import time
+from itertools import islice
+
+from .models import Transaction
+
+FORMAT_CSV = 'csv'
+FORMAT_OFX = 'ofx'
+FORMAT_QIF = 'qif'
+FORMATS = (FORMAT_CSV, FORMAT_OFX, FORMAT_QIF)
+
+QIF_DATE_FORMATS = ('%m/%d/%Y', "%m/%d'%Y", '%m/%d/%y', "%m/%d'%y", '%Y-%m-%d')
+
+OFX_TAG_REGEX = re.compile(r'<([^>]+)>([^<]*)')
+
+
+class ImportResult:
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+        self.duration = 0
+
+    @property
+    def rate(self):
+        """
+        Returns the throughput in rows per second.
+        """
+        rows = self.created + len(self.errors)
+        return rows / self.duration if self.duration else 0
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'errors': self.errors,
+            'duration': round(self.duration, 3),
+            'rate': round(self.rate, 1),
+        }
+
+
+def get_format(filename):
+    """
+    Returns the format deduced from the file extension, if any.
+    """
+    extension = os.path.splitext(filename or '')[1][1:].lower()
+    return extension if extension in FORMATS else None
+
+
+def parse_csv(stream):
+    """
+    Yields the rows of a CSV file, whose header must use the bank
+    transaction fields names.
+
+    :param stream: a text stream
+    :return: generator of dict, the raw fields by name
+    """
+    reader = csv.reader(stream)
+    header = [name.strip().lower() for name in next(reader, [])]
+
+    for line in reader:
+        if not any(line):
+            continue
+        yield {name: value.strip() for name, value in zip(header, line) if name}
+
+
+def parse_ofx(stream):
+    """
+    Yields the statement transactions of an OFX file, either SGML (v1) or XML
+    (v2), read by chunks whatever the line breaks.
+
+    :param stream: a text stream
+    :return: generator of dict, the raw fields by name
+    """
+    row = None
+    for tag, value in _iter_ofx_tags(stream):
+        if tag == 'STMTTRN':
+            row = {}
+        elif tag == '/STMTTRN':
+            if row is not None:
+                yield _default_label(row)
+            row = None
+        elif row is not None:
+            if tag == 'DTPOSTED':
+                row['date'] = _parse_ofx_date(value)
+            elif tag == 'TRNAMT':
+                row['amount'] = _parse_amount(value)
+            elif tag == 'NAME':
+                row['label'] = value
+            elif tag == 'MEMO':
+                row['memo'] = value
+
+
+def parse_qif(stream):
+    """
+    Yields the records of a QIF bank file.
+
+    :param stream: a text stream
+    :return: generator of dict, the raw fields by name
+    """
+    fields = {
+        'D': ('date', _parse_qif_date),
+        'T': ('amount', _parse_amount),
+        'U': ('amount', _parse_amount),
+        'P': ('label', str),
+        'M': ('memo', str),
+        'C': ('reconciled', lambda value: value.upper() in ('X', '*')),
+    }
+
+    row = {}
+    for line in stream:
+        line = line.strip()
+        if not line or line.startswith('!'):
+            continue
+
+        code, value = line[0], line[1:].strip()
+        if code == '^':
+            if row:
+                yield _default_label(row)
+            row = {}
+        elif code in fields:
+            name, parse = fields[code]
+            row[name] = parse(value)
+
+    if row:
+        yield _default_label(row)
+
+
+PARSERS = {
+    FORMAT_CSV: parse_csv,
+    FORMAT_OFX: parse_ofx,
+    FORMAT_QIF: parse_qif,
+}
+
+
+def import_transactions(account, stream, file_format, batch_size=500):
+    """
+    Stream-parse a bank statement file, validate its rows and insert them by
+    batches, with a single balance update per batch.
+
+    :param account: the bank account to import into
+    :param stream: a text stream
+    :param file_format: one of FORMATS
+    :param batch_size: the number of rows inserted at once
+    :return: ImportResult
+    """
+    from .serializers import TransactionSerializer
+
+    result = ImportResult()
+    start = time.perf_counter()
+
+    rows = enumerate(PARSERS[file_format](stream), start=1)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+
+        transactions = []
+        for number, data in batch:
+            serializer = TransactionSerializer(data=data)
+            if serializer.is_valid():
+                transactions.append(Transaction(**serializer.validated_data))
+            else:
+                result.errors.append({'row': number, 'errors': serializer.errors})
+
+        Transaction.objects.create_multiple(account, transactions, batch_size=batch_size)
+        result.created += len(transactions)
+
+    result.duration = time.perf_counter() - start
+    return result
+
+
+def _default_label(row):
+    # Some banks only fill in the memo.
+    if not row.get('label') and row.get('memo'):
+        row['label'] = row['memo']
+    return row
+
+
+def _iter_ofx_tags(stream, chunk_size=64 * 1024):
+    buffer = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+
+        # Keep the last tag, which may be truncated, for the next chunk.
+        end = max(buffer.rfind('<'), 0) if chunk else len(buffer)
+        for match in OFX_TAG_REGEX.finditer(buffer, 0, end):
+            yield match.group(1).strip().upper(), match.group(2).strip()
+        buffer = buffer[end:]
+
+        if not chunk:
+            break
+
+
+def _parse_ofx_date(value):
+    try:
+        return datetime.datetime.strptime(value[:8], '%Y%m%d').date().isoformat()
+    except ValueError:
+        return value
+
+
+def _parse_qif_date(value):
+    value = value.replace(' ', '')
+    for date_format in QIF_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            pass
+    return value
+
+
+def _parse_amount(value):
+    value = value.replace(' ', '')
+    if value.rfind(',') > value.rfind('.'):
+        # Decimal comma of some banks.
+        value = value.replace('.', '').replace(',', '.')
+    return value.replace(',', '')
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mymoney.accounts.models import Account
+from mymoney.core.utils import get_default_account
+
+from ...importers import FORMATS, get_format, import_transactions
+
+
+class Command(BaseCommand):
+    help = 'Import bank transactions from a bank statement file'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('path', help='Path of the CSV, OFX or QIF file.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Format of the file. Default to the one '
+                                 'deduced from its extension.')
+        parser.add_argument('--account', type=int,
+                            help='Primary key of the bank account. Default '
+                                 'to the default one.')
+        parser.add_argument('--encoding', default='utf-8-sig',
+                            help='Encoding of the file.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of bank transactions inserted at '
+                                 'once.')
+
+    def handle(self, *args, **options):
+
+        file_format = options['format'] or get_format(options['path'])
+        if file_format is None:
+            raise CommandError('Unable to deduce the format of the file.')
+
+        if options['account'] is not None:
+            try:
+                account = Account.objects.get(pk=options['account'])
+            except Account.DoesNotExist:
+                raise CommandError('Unknown bank account.')
+        else:
+            account = get_default_account()
+            if account is None:
+                raise CommandError('No bank account to import into.')
+
+        with open(options['path'], encoding=options['encoding'], newline='') as stream:
+            result = import_transactions(account, stream, file_format, batch_size=options['batch_size'])
+
+        for error in result.errors:
+            for field, messages in error['errors'].items():
+                self.stderr.write('Row {row}: {field}: {messages}'.format(
+                    row=error['row'], field=field, messages=' '.join(messages)))
+
+        self.stdout.write(
+            '{created} bank transaction(s) imported, {errors} error(s), in '
+            '{duration:.2f}s ({rate:.0f} rows/s).'.format(
+                created=result.created, errors=len(result.errors),
+                duration=result.duration, rate=result.rate,
+            ))
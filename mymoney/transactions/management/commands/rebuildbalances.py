@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mymoney.accounts.models import Account
+
+from ...models import Transaction
+
+
+class Command(BaseCommand):
+    help = 'Rebuild running balances of bank transactions'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('accounts', nargs='*', type=int,
+                            help='Primary keys of the bank accounts to '
+                                 'rebuild. Default to all of them.')
+        parser.add_argument('--check', action='store_true', default=False,
+                            help='Only check that running balances match a '
+                                 'full recompute, without altering them.')
+
+    def handle(self, *args, **options):
+
+        accounts = Account.objects.order_by('pk')
+        if options['accounts']:
+            accounts = accounts.filter(pk__in=options['accounts'])
+
+        errors = 0
+        for account in accounts:
+            if options['check']:
+                pks = Transaction.objects.check_running_balances(account)
+                for pk in pks:
+                    self.stderr.write(
+                        'Bank transaction {pk} of account {account} has '
+                        'invalid running balances.'.format(pk=pk, account=account.pk))
+                errors += len(pks)
+            else:
+                count = Transaction.objects.rebuild_running_balances(account)
+                self.stdout.write(
+                    'Account {account}: {count} bank transaction(s) '
+                    'rebuilt.'.format(account=account.pk, count=count))
+
+        if options['check']:
+            if errors:
+                raise CommandError(
+                    '{count} bank transaction(s) with invalid running '
+                    'balances.'.format(count=errors))
+
+            self.stdout.write('Running balances are consistent.')
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mymoney.accounts.models import Account
+
+from ...models import TransactionRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily rollups of bank transactions per tag'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('accounts', nargs='*', type=int,
+                            help='Primary keys of the bank accounts to '
+                                 'rebuild. Default to all of them.')
+        parser.add_argument('--check', action='store_true', default=False,
+                            help='Only check that rollups match a full '
+                                 'recompute, without altering them.')
+
+    def handle(self, *args, **options):
+
+        accounts = Account.objects.order_by('pk')
+        if options['accounts']:
+            accounts = accounts.filter(pk__in=options['accounts'])
+
+        errors = 0
+        for account in accounts:
+            if options['check']:
+                keys = TransactionRollup.objects.check_rollups(account)
+                for tag, date, status, reconciled, sign in keys:
+                    self.stderr.write(
+                        'Rollup of account {account} is invalid: tag {tag}, '
+                        'date {date}, status {status}, reconciled {reconciled}, '
+                        'sign {sign}.'.format(
+                            account=account.pk, tag=tag, date=date, status=status,
+                            reconciled=reconciled, sign=sign))
+                errors += len(keys)
+            else:
+                count = TransactionRollup.objects.rebuild_rollups(account)
+                self.stdout.write(
+                    'Account {account}: {count} rollup(s) rebuilt.'.format(
+                        account=account.pk, count=count))
+
+        if options['check']:
+            if errors:
+                raise CommandError(
+                    '{count} invalid rollup(s).'.format(count=errors))
+
+            self.stdout.write('Rollups are consistent.')
@@ -0,0 +1,51 @@
+# Generated by Django 2.1.1 on 2026-10-17 02:44
+
+from django.db import migrations, models
+
+
+def compute_running_balances(apps, schema_editor):
+    Account = apps.get_model('accounts', 'Account')
+    Transaction = apps.get_model('transactions', 'Transaction')
+
+    for account in Account.objects.all():
+        total, reconciled = 0, None
+        qs = (
+            Transaction.objects
+            .filter(account=account)
+            .order_by('date', 'id')
+            .values_list('id', 'amount', 'reconciled')
+        )
+        for pk, amount, is_reconciled in qs.iterator():
+            total += amount
+            if is_reconciled:
+                reconciled = (reconciled or 0) + amount
+            Transaction.objects.filter(pk=pk).update(
+                balance_total=total,
+                balance_reconciled=reconciled,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='balance_reconciled',
+            field=models.DecimalField(decimal_places=2, editable=False, help_text='Running balance of the reconciled bank transactions, ordered by date.', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='balance_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Running balance of the bank account once the bank transaction is applied, ordered by date.', max_digits=10),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'date', 'id'], name='transaction_account_990da5_idx'),
+        ),
+        migrations.RunPython(compute_running_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def compute_rollups(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    TransactionRollup = apps.get_model('transactions', 'TransactionRollup')
+
+    rows = (
+        Transaction.objects
+        .annotate(sign=models.Case(
+            models.When(amount__gt=0, then=1),
+            models.When(amount__lt=0, then=-1),
+            default=0,
+            output_field=models.SmallIntegerField(),
+        ))
+        .order_by()
+        .values('account', 'tag', 'date', 'status', 'reconciled', 'sign')
+        .annotate(total=models.Sum('amount'), number=models.Count('id'))
+    )
+    TransactionRollup.objects.bulk_create(
+        [
+            TransactionRollup(
+                account_id=row['account'],
+                tag_id=row['tag'],
+                date=row['date'],
+                status=row['status'],
+                reconciled=row['reconciled'],
+                sign=row['sign'],
+                amount=row['total'],
+                quantity=row['number'],
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_account_last_modified'),
+        ('tags', '0001_initial'),
+        ('transactions', '0003_balance_checkpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('active', 'Active'), ('ignored', 'Ignored'), ('inactive', 'Inactive')], max_length=32)),
+                ('reconciled', models.BooleanField()),
+                ('sign', models.SmallIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('quantity', models.IntegerField(default=0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_rollups', to='accounts.Account')),
+                ('tag', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transaction_rollups', to='tags.Tag')),
+            ],
+            options={
+                'db_table': 'transaction_rollups',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='transactionrollup',
+            index=models.Index(fields=['account', 'status', 'date'], name='transaction_account_ed444e_idx'),
+        ),
+        migrations.RunPython(compute_rollups, migrations.RunPython.noop),
+    ]
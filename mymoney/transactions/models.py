@@ -1,10 +1,13 @@
 from datetime import date
 from decimal import Decimal
 
-from django.db import models, transaction
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models.functions import Coalesce, TruncMonth
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+from dateutil.relativedelta import relativedelta
+
 from mymoney.accounts.models import Account
 from mymoney.core.utils.dates import GRANULARITY_MONTH, get_date_ranges
 from mymoney.tags.models import Tag
@@ -28,18 +31,359 @@ class TransactionManager(models.Manager):
 
     def get_reconciled_balance(self, account):
         # Get non reconciled sum instead of sum of reconciled bank
-        # transactions. By assuming that most of the bank transactions are
-        # reconciled, it should be better for performance.
+        # transactions. Older ones are summed up by the checkpoint of the
+        # current month, so only the latest ones are scanned.
+        checkpoint = BalanceCheckpoint.objects.get_checkpoint(account, date.today())
+
         total_not_reconciled = (
             self
-            .filter(account=account)
+            .filter(account=account, date__gte=checkpoint.date)
             .filter(reconciled=False)
             .exclude(status=Transaction.STATUS_INACTIVE)
             .aggregate(models.Sum('amount'))
         )['amount__sum'] or 0
+        total_not_reconciled += checkpoint.total - checkpoint.reconciled
 
         return Decimal(account.balance - total_not_reconciled)
 
+    def get_running_balances(self, account, since=None):
+        """
+        Recompute the running balances of the account, fully or from the
+        position since=(date, pk) included. Yields tuples of (pk,
+        balance_total, balance_reconciled, stored balance_total, stored
+        balance_reconciled) ordered by date then id.
+        """
+        qs, base_total, base_reconciled = self._get_running_balances_queryset(account, since)
+
+        if connections[self.db].features.supports_over_clause:
+            rows = self._annotate_running_balances(qs).values_list(
+                'id', 'running_total', 'running_reconciled',
+                'balance_total', 'balance_reconciled',
+            )
+            for pk, total, reconciled, balance_total, balance_reconciled in rows.iterator():
+                if reconciled is not None:
+                    reconciled += base_reconciled or 0
+                else:
+                    reconciled = base_reconciled
+                yield pk, base_total + total, reconciled, balance_total, balance_reconciled
+            return
+
+        # Without window support, a single ordered scan is still linear.
+        total, reconciled = base_total, base_reconciled
+        rows = qs.values_list(
+            'id', 'amount', 'reconciled', 'balance_total', 'balance_reconciled',
+        )
+        for pk, amount, is_reconciled, balance_total, balance_reconciled in rows.iterator():
+            total += amount
+            if is_reconciled:
+                reconciled = (reconciled or 0) + amount
+            yield pk, total, reconciled, balance_total, balance_reconciled
+
+    def check_running_balances(self, account):
+        """
+        Returns the pks of the bank transactions for which stored running
+        balances differ from a full recompute.
+        """
+        return [
+            row[0] for row in self.get_running_balances(account)
+            if row[1:3] != row[3:5]
+        ]
+
+    def rebuild_running_balances(self, account, since=None):
+        """
+        Rewrite the running balances which differ from a recompute, fully or
+        from the position since=(date, pk) included. Returns the number of
+        bank transactions updated.
+        """
+        if connections[self.db].vendor == 'postgresql':
+            return self._rebuild_running_balances_postgresql(account, since)
+
+        count = 0
+        with transaction.atomic():
+            for pk, total, reconciled, balance_total, balance_reconciled in self.get_running_balances(account, since):
+                if (total, reconciled) != (balance_total, balance_reconciled):
+                    self.filter(pk=pk).update(
+                        balance_total=total,
+                        balance_reconciled=reconciled,
+                    )
+                    count += 1
+        return count
+
+    def _rebuild_running_balances_postgresql(self, account, since):
+        # A single UPDATE ... FROM the window query, whatever the number of
+        # rows to rewrite.
+        qs, base_total, base_reconciled = self._get_running_balances_queryset(account, since)
+        sql, params = (
+            self._annotate_running_balances(qs)
+            .values('id', 'running_total', 'running_reconciled')
+            .query.sql_with_params()
+        )
+        table = connections[self.db].ops.quote_name(self.model._meta.db_table)
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                "UPDATE {table} AS t "
+                "SET balance_total = r.total, balance_reconciled = r.reconciled "
+                "FROM ("
+                "SELECT w.id, %s::numeric + w.running_total AS total, "
+                "COALESCE(%s::numeric + w.running_reconciled, %s::numeric, w.running_reconciled) AS reconciled "
+                "FROM ({sql}) AS w"
+                ") AS r "
+                "WHERE t.id = r.id "
+                "AND (t.balance_total, t.balance_reconciled) IS DISTINCT FROM (r.total, r.reconciled)".format(
+                    table=table, sql=sql,
+                ),
+                (base_total, base_reconciled, base_reconciled) + tuple(params),
+            )
+            return cursor.rowcount
+
+    def _get_running_balances_queryset(self, account, since):
+        """
+        Returns the ordered queryset to recompute from the position since,
+        with the running balances of its predecessor to start with.
+        """
+        qs = self.filter(account=account).order_by('date', 'id')
+        if since is None:
+            return qs, Decimal(0), None
+
+        date, pk = since
+        predecessor = (
+            qs
+            .filter(models.Q(date__lt=date) | models.Q(date=date, pk__lt=pk))
+            .order_by('-date', '-id')
+            .values_list('balance_total', 'balance_reconciled')
+            .first()
+        ) or (Decimal(0), None)
+
+        qs = qs.filter(models.Q(date__gt=date) | models.Q(date=date, pk__gte=pk))
+        return (qs,) + tuple(predecessor)
+
+    def _annotate_running_balances(self, qs):
+        window = {
+            'partition_by': [models.F('account')],
+            'order_by': [models.F('date').asc(), models.F('id').asc()],
+        }
+        return qs.annotate(
+            running_total=models.Window(
+                expression=models.Sum('amount'),
+                **window
+            ),
+            running_reconciled=models.Window(
+                expression=models.Sum(
+                    models.Case(
+                        models.When(reconciled=True, then=models.F('amount')),
+                        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+                    ),
+                ),
+                **window
+            ),
+        )
+
+    def shift_running_balances(self, account, date, pk, total, reconciled, reconciling=False):
+        """
+        Shift running balances of the bank transactions following the
+        position (date, pk) by the amounts given. Without pk, the position is
+        the one of a new bank transaction, after all those of the same date.
+        With reconciling, a reconciled one is put at the position, so that
+        the followers without reconciled predecessor have one from now on,
+        even of a zero amount.
+        """
+        if not total and not reconciled and not reconciling:
+            return
+
+        fields = {'balance_total': models.F('balance_total') + total}
+        if reconciled or reconciling:
+            # Transactions without any reconciled predecessor are NULL.
+            fields['balance_reconciled'] = Coalesce('balance_reconciled', models.Value(0)) + reconciled
+
+        position = models.Q(date__gt=date)
+        if pk is not None:
+            position |= models.Q(date=date, pk__gt=pk)
+
+        self.filter(position, account=account).update(**fields)
+
+    def clear_running_balances_reconciled(self, account):
+        """
+        Reset reconciled running balances to NULL for the bank transactions
+        preceding the first reconciled one, like SUM() of nothing.
+        """
+        qs = self.filter(account=account, balance_reconciled__isnull=False)
+
+        first = (
+            self
+            .filter(account=account, reconciled=True)
+            .order_by('date', 'id')
+            .values_list('date', 'pk')
+            .first()
+        )
+        if first is not None:
+            qs = qs.filter(
+                models.Q(date__lt=first[0]) | models.Q(date=first[0], pk__lt=first[1]),
+            )
+
+        qs.update(balance_reconciled=None)
+
+    def create_multiple(self, account, transactions, batch_size=None):
+        """
+        Set-based insertion of many bank transactions of the account at once,
+        with a single balance adjustment. Returns the bank transactions
+        created, their pk set whatever the backend.
+        """
+        transactions = list(transactions)
+        if not transactions:
+            return transactions
+
+        amount = 0
+        for obj in transactions:
+            # Like AbstractTransaction.save(), but once for all of them.
+            obj.account = account
+            obj.currency = account.currency
+            if obj.status != Transaction.STATUS_INACTIVE:
+                amount += Decimal(obj.amount)
+
+        with transaction.atomic():
+            Account.objects.lock([account.pk])
+            since = min(obj.date for obj in transactions)
+            last = (
+                self
+                .filter(account=account)
+                .order_by('-date', '-id')
+                .values_list('date', 'balance_total', 'balance_reconciled')
+                .first()
+            )
+
+            # Appended ones (i.e. a bank feed sync) get their running
+            # balances straight away, following the insertion order for
+            # the same date like ids do.
+            append = last is None or since >= last[0]
+            if append:
+                total, reconciled = last[1:] if last is not None else (Decimal(0), None)
+                for obj in sorted(transactions, key=lambda obj: obj.date):
+                    total += Decimal(obj.amount)
+                    if obj.reconciled:
+                        reconciled = (reconciled or 0) + Decimal(obj.amount)
+                    obj.balance_total, obj.balance_reconciled = total, reconciled
+
+            transactions = self.bulk_create(transactions, batch_size=batch_size)
+            if transactions[0].pk is None:
+                self._set_inserted_pks(account, transactions)
+
+            TransactionRollup.objects.refresh(account, {obj.date for obj in transactions})
+
+            if not append:
+                self.rebuild_running_balances(account, since=(since, 0))
+            BalanceCheckpoint.objects.invalidate(account, since)
+
+            if amount:
+                Account.objects.adjust_balance(account, amount)
+            else:
+                Account.objects.bump_version(account)
+
+        return transactions
+
+    def _set_inserted_pks(self, account, transactions):
+        # Without RETURNING (i.e: SQLite), the rows just inserted are the
+        # latest ones of the bank account, which is locked.
+        pks = (
+            self
+            .filter(account=account)
+            .order_by('-pk')
+            .values_list('pk', flat=True)
+            [:len(transactions)]
+        )
+        for obj, pk in zip(transactions, reversed(pks)):
+            obj.pk = pk
+
+    def update_multiple(self, pks, **fields):
+        """
+        Set-based update of the status and/or reconciled fields of many bank
+        transactions at once: a single UPDATE per account. Like a save of each
+        of them, the bank account balance is left as is.
+        """
+        fields = {k: v for k, v in fields.items() if k in ('status', 'reconciled')}
+        if not fields:
+            return
+
+        with transaction.atomic():
+            accounts = (
+                Account.objects
+                .select_for_update()
+                .filter(pk__in=self.filter(pk__in=pks).values('account'))
+                .order_by('pk')
+            )
+            for account in accounts:
+                qs = self.filter(account=account, pk__in=pks)
+
+                day = qs.aggregate(date=models.Min('date'))['date']
+
+                # Running balances are only rewritten from the first
+                # bank transaction toggled.
+                since = None
+                if 'reconciled' in fields:
+                    since = (
+                        qs
+                        .exclude(reconciled=fields['reconciled'])
+                        .order_by('date', 'id')
+                        .values_list('date', 'pk')
+                        .first()
+                    )
+
+                qs.update(**fields)
+                TransactionRollup.objects.refresh(account, qs.values('date'))
+
+                if since is not None:
+                    self.rebuild_running_balances(account, since=since)
+                BalanceCheckpoint.objects.invalidate(account, day)
+                Account.objects.bump_version(account)
+
+    def delete_multiple(self, pks):
+        """
+        Set-based deletion of many bank transactions at once: DELETE
+        statements chunked to fit the database parameters limit, with one
+        balance adjustment per account.
+        """
+        pks = list(pks)
+        batch_size = max(connections[self.db].ops.bulk_batch_size(['pk'], pks), 1)
+        dates = {}
+        amounts = {}
+
+        with transaction.atomic():
+            accounts = set()
+            for i in range(0, len(pks), batch_size):
+                accounts.update(self.filter(pk__in=pks[i:i + batch_size]).values_list('account', flat=True))
+            Account.objects.lock(accounts)
+
+            for i in range(0, len(pks), batch_size):
+                qs = self.filter(pk__in=pks[i:i + batch_size])
+
+                rows = (
+                    qs
+                    .order_by()
+                    .values_list('account', 'date')
+                    .annotate(amount=models.Sum(models.Case(
+                        models.When(~models.Q(status=Transaction.STATUS_INACTIVE), then=models.F('amount')),
+                    )))
+                )
+                for account, day, amount in rows:
+                    dates.setdefault(account, set()).add(day)
+                    amounts[account] = amounts.get(account, 0) + (amount or 0)
+
+                qs.delete()
+
+            for account in Account.objects.filter(pk__in=dates.keys()):
+                date, amount = min(dates[account.pk]), amounts[account.pk]
+
+                # Rewrite the running balances of the whole first day
+                # altered, the deleted position being gone.
+                self.rebuild_running_balances(account, since=(date, 0))
+                BalanceCheckpoint.objects.invalidate(account, date)
+                TransactionRollup.objects.refresh(account, dates[account.pk])
+
+                if amount:
+                    Account.objects.adjust_balance(account, -amount)
+                else:
+                    Account.objects.bump_version(account)
+
     def get_total_unscheduled_period(self, account, granularity=GRANULARITY_MONTH):
         """
         Returns the total sum for the current period of bank transactions not
@@ -143,53 +487,535 @@ class AbstractTransaction(models.Model):
 class Transaction(AbstractTransaction):
 
     scheduled = models.BooleanField(default=False, editable=False)
+    balance_total = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text=_('Running balance of the bank account once the bank '
+                    'transaction is applied, ordered by date.'),
+    )
+    balance_reconciled = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        help_text=_('Running balance of the reconciled bank transactions, '
+                    'ordered by date.'),
+    )
 
     objects = TransactionManager()
 
+    TRACKED_FIELDS = ('date', 'amount', 'status', 'reconciled', 'tag_id')
+    BALANCE_FIELDS = ('balance_total', 'balance_reconciled')
+
     class Meta:
         db_table = 'transactions'
         indexes = [
             models.Index(fields=['amount', 'date', 'reconciled']),
+            models.Index(fields=['account', 'date', 'id']),
         ]
         get_latest_by = "date"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Keep the values stored, to deduce what a save alters without
+        # querying them again.
+        if all(name in field_names for name in cls.TRACKED_FIELDS):
+            instance._track_values()
+        return instance
+
     def save(self, *args, **kwargs):
 
-        if self.status == self.STATUS_INACTIVE:
+        previous = None
+        if self.pk is not None:
+            previous = getattr(self, '_tracked_values', None)
+            if previous is None:
+                previous = (
+                    Transaction.objects
+                    .values(*self.TRACKED_FIELDS)
+                    .get(pk=self.pk)
+                )
+
+        amount = 0
+        if self.status != self.STATUS_INACTIVE:
+            amount = Decimal(self.amount)
+            if previous is not None:
+                # Deduce previous value if updated.
+                amount -= Decimal(previous['amount'])
+
+        update_fields = kwargs.get('update_fields')
+
+        with transaction.atomic():
+            altered = self._update_running_balances(previous)
+            kwargs['update_fields'] = self._get_update_fields(previous, altered, update_fields)
             super().save(*args, **kwargs)
-            return
 
-        amount = Decimal(self.amount)
-        if self.pk is not None:
-            # Deduce previous value if updated.
-            amount -= Decimal(Transaction.objects.get(pk=self.pk).amount)
+            # It may have been the only reconciled predecessor of some others.
+            if previous is not None and previous['reconciled']:
+                if previous['date'] != self.date or not self.reconciled:
+                    Transaction.objects.clear_running_balances_reconciled(self.account)
 
-        # Update bank account balance.
-        try:
-            with transaction.atomic():
-                super().save(*args, **kwargs)
+            self._invalidate_balance_checkpoints(previous, locked=altered)
+            self._update_rollups(previous, self._get_tracked_values())
 
-                self.account.balance = models.F('balance') + amount
-                self.account.save(update_fields=['balance'])
-        finally:
-            # Reload it to replace F expression of instance attribute.
-            self.account.refresh_from_db(fields=['balance'])
+            # Update bank account balance.
+            if amount:
+                Account.objects.adjust_balance(self.account, amount)
+            else:
+                Account.objects.bump_version(self.account)
+
+        self._track_values(update_fields)
 
     def delete(self, *args, **kwargs):
+        # Primary key is reset by the deletion.
+        position = (self.date, self.pk)
 
-        if self.status == self.STATUS_INACTIVE:
+        with transaction.atomic():
+            Account.objects.lock([self.account_id])
             super().delete(*args, **kwargs)
-            return
+            self._remove_running_balances(*position)
+            self._update_rollups(self._get_tracked_values(), None)
+
+            if self.status == self.STATUS_INACTIVE:
+                Account.objects.bump_version(self.account)
+            else:
+                BalanceCheckpoint.objects.invalidate(self.account, self.date)
+                # Update bank account balance.
+                Account.objects.adjust_balance(self.account, -Decimal(self.amount))
+
+        self._tracked_values = None
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        self._track_values(fields)
+
+    def _track_values(self, fields=None):
+        values = getattr(self, '_tracked_values', None) or {}
+        deferred = self.get_deferred_fields()
+        for name in self.TRACKED_FIELDS:
+            field = self._meta.get_field(name)
+            loaded = fields is None or field.name in fields or field.attname in fields
+            if loaded and field.attname not in deferred:
+                values[name] = getattr(self, field.attname)
+
+        # Partial ones are useless.
+        if len(values) < len(self.TRACKED_FIELDS):
+            values = None
+        self._tracked_values = values
+
+    def _get_update_fields(self, previous, altered, update_fields):
+        if altered:
+            if update_fields is not None:
+                return set(update_fields) | set(self.BALANCE_FIELDS)
+        elif previous is not None and update_fields is None:
+            # Stored running balances may be newer than those of the
+            # instance.
+            return [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.BALANCE_FIELDS
+            ]
+        return update_fields
+
+    def _update_running_balances(self, previous):
+        """
+        Shift the running balances of the bank transactions following the old
+        and new positions only, then deduce its own ones from its predecessor
+        to be saved along with it. Returns whether they have been altered.
+        """
+        amount = Decimal(self.amount)
+        reconciled = amount if self.reconciled else 0
+
+        if previous is not None:
+            previous_amount = Decimal(previous['amount'])
+            previous_reconciled = previous_amount if previous['reconciled'] else 0
+            moved = previous['date'] != self.date
+
+            # The reconciled flag matters by itself, a reconciled bank
+            # transaction of a zero amount still turning NULL ones to 0.
+            if not moved and (previous_amount, previous['reconciled']) == (amount, self.reconciled):
+                return False
+
+        # Concurrent writers of the bank account must not compute from the
+        # same predecessor.
+        Account.objects.lock([self.account_id])
+
+        if previous is None:
+            Transaction.objects.shift_running_balances(
+                self.account, self.date, self.pk, amount, reconciled, self.reconciled)
+        elif moved:
+            Transaction.objects.shift_running_balances(
+                self.account, previous['date'], self.pk,
+                -previous_amount, -previous_reconciled)
+            Transaction.objects.shift_running_balances(
+                self.account, self.date, self.pk, amount, reconciled, self.reconciled)
+        else:
+            Transaction.objects.shift_running_balances(
+                self.account, self.date, self.pk,
+                amount - previous_amount, reconciled - previous_reconciled,
+                self.reconciled and not previous['reconciled'])
+
+        # Not saved yet, so it could only be found at its previous position.
+        predecessors = Transaction.objects.filter(account=self.account)
+        if self.pk is None:
+            predecessors = predecessors.filter(date__lte=self.date)
+        else:
+            predecessors = predecessors.filter(
+                models.Q(date__lt=self.date) | models.Q(date=self.date, pk__lt=self.pk),
+            ).exclude(pk=self.pk)
+
+        predecessor = (
+            predecessors
+            .order_by('-date', '-pk')
+            .values_list('balance_total', 'balance_reconciled')
+            .first()
+        ) or (0, None)
+
+        self.balance_total = predecessor[0] + amount
+        self.balance_reconciled = predecessor[1]
+        if self.reconciled:
+            self.balance_reconciled = (self.balance_reconciled or 0) + amount
+
+        return True
+
+    def _remove_running_balances(self, date, pk):
+        amount = Decimal(self.amount)
+
+        Transaction.objects.shift_running_balances(
+            self.account, date, pk, -amount, -amount if self.reconciled else 0)
+
+        if self.reconciled:
+            Transaction.objects.clear_running_balances_reconciled(self.account)
+
+    def _get_tracked_values(self):
+        return {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
+    def _update_rollups(self, previous, current):
+        """
+        Move the bank transaction from its previous rollup to its current one,
+        if any.
+        """
+        deltas = {}
+        for values, count in ((previous, -1), (current, 1)):
+            if values is not None:
+                TransactionRollup.objects.add(
+                    deltas, TransactionRollup.objects.make_key(values), Decimal(values['amount']) * count, count)
+        TransactionRollup.objects.apply(self.account, deltas)
+
+    def _invalidate_balance_checkpoints(self, previous, locked):
+        """
+        Drop the checkpoints following the oldest date altered, if any. The
+        bank account is locked first if not yet, see
+        BalanceCheckpointManager.get_checkpoint().
+        """
+        if previous is None:
+            if self.status == self.STATUS_INACTIVE:
+                return
+            day = self.date
+        else:
+            if previous['status'] == self.STATUS_INACTIVE and self.status == self.STATUS_INACTIVE:
+                return
+
+            current = (self.date, Decimal(self.amount), self.status, self.reconciled)
+            if current == (previous['date'], previous['amount'], previous['status'], previous['reconciled']):
+                return
+            day = min(self.date, previous['date'])
+
+        if not locked:
+            Account.objects.lock([self.account_id])
+        BalanceCheckpoint.objects.invalidate(self.account, day)
+
+
+class BalanceCheckpointManager(models.Manager):
+
+    def get_checkpoint(self, account, day):
+        """
+        Returns the checkpoint of the month of the given day. Missing ones are
+        lazily built from the latest valid checkpoint, by summing up the
+        months between them.
+        """
+        month = get_date_ranges(day, GRANULARITY_MONTH)[0]
+
+        latest = self._get_latest(account, month)
+        if latest is not None and latest.date == month:
+            return latest
 
-        # Update bank account balance.
         try:
             with transaction.atomic():
-                super().delete(*args, **kwargs)
+                # Bank transaction writes invalidate the checkpoints with the
+                # bank account locked too, so those built meanwhile include
+                # them or are deleted by them, never stale.
+                Account.objects.lock([account.pk])
+                latest = self._get_latest(account, month)
+                if latest is not None and latest.date == month:
+                    return latest
+
+                checkpoints = self._build_checkpoints(account, month, latest)
+                self.bulk_create(checkpoints)
+        except IntegrityError:
+            # Already built by a concurrent request, values are the same.
+            pass
+
+        return checkpoints[-1]
+
+    def _get_latest(self, account, month):
+        return (
+            self
+            .filter(account=account, date__lte=month)
+            .order_by('-date')
+            .first()
+        )
+
+    def _build_checkpoints(self, account, month, latest):
+        qs = (
+            Transaction.objects
+            .filter(account=account, date__lt=month)
+            .exclude(status=Transaction.STATUS_INACTIVE)
+        )
+        if latest is not None:
+            qs = qs.filter(date__gte=latest.date)
+        else:
+            latest = self.model(account=account, date=month)
+
+        months = (
+            qs
+            .annotate(month=TruncMonth('date'))
+            .order_by('month')
+            .values('month')
+            .annotate(
+                total=models.Sum('amount'),
+                reconciled=models.Sum(
+                    models.Case(
+                        models.When(reconciled=True, then=models.F('amount')),
+                        default=0,
+                        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+                    ),
+                ),
+            )
+        )
+
+        checkpoints = []
+        total, reconciled = latest.total, latest.reconciled
+        for row in months:
+            total += row['total']
+            reconciled += row['reconciled']
+            checkpoints.append(self.model(
+                account=account,
+                date=row['month'] + relativedelta(months=1),
+                total=total,
+                reconciled=reconciled,
+            ))
 
-                self.account.balance = (
-                    models.F('balance') - Decimal(self.amount)
-                )
+        if not checkpoints or checkpoints[-1].date != month:
+            checkpoints.append(self.model(
+                account=account,
+                date=month,
+                total=total,
+                reconciled=reconciled,
+            ))
+
+        return checkpoints
+
+    def invalidate(self, account, day):
+        """
+        Delete the checkpoints which include the given day. The bank account
+        must be locked, see get_checkpoint().
+        """
+        self.filter(account=account, date__gt=day).delete()
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    Cumulative sums of the non inactive bank transactions of an account dated
+    before the first day of a month.
+    """
+    account = models.ForeignKey(
+        Account,
+        related_name='balance_checkpoints',
+        on_delete=models.CASCADE,
+    )
+    date = models.DateField()
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    reconciled = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    objects = BalanceCheckpointManager()
+
+    class Meta:
+        db_table = 'balance_checkpoints'
+        unique_together = (('account', 'date'),)
+
+
+class TransactionRollupManager(models.Manager):
 
-                self.account.save()
-        finally:
-            self.account.refresh_from_db(fields=['balance'])
+    def make_key(self, values):
+        """
+        Returns the rollup key of the bank transaction values given, as
+        tracked by Transaction.
+        """
+        amount = Decimal(values['amount'])
+        return (
+            values['tag_id'],
+            values['date'],
+            values['status'],
+            values['reconciled'],
+            (amount > 0) - (amount < 0),
+        )
+
+    def add(self, deltas, key, amount, count):
+        """
+        Accumulate a difference of sum and count for the rollup key given.
+        """
+        total, number = deltas.get(key, (0, 0))
+        deltas[key] = (total + Decimal(amount), number + count)
+        return deltas
+
+    def group(self, qs):
+        """
+        Yields a tuple (account pk, key, sum, count) for each rollup of the
+        bank transactions queryset given.
+        """
+        rows = (
+            qs
+            .annotate(sign=models.Case(
+                models.When(amount__gt=0, then=1),
+                models.When(amount__lt=0, then=-1),
+                default=0,
+                output_field=models.SmallIntegerField(),
+            ))
+            .order_by()
+            .values_list('account', 'tag', 'date', 'status', 'reconciled', 'sign')
+            .annotate(total=models.Sum('amount'), number=models.Count('id'))
+        )
+        for row in rows:
+            yield row[0], row[1:-2], row[-2], row[-1]
+
+    def apply(self, account, deltas):
+        """
+        Add the differences of sum and count given by key to the rollups of
+        the bank account, creating the missing ones.
+        """
+        missing = []
+        for key, (amount, count) in deltas.items():
+            if not amount and not count:
+                continue
+
+            fields = dict(zip(self.model.KEY_FIELDS, key))
+            # Duplicates may exist (concurrent creations, tags deleted), so
+            # only one of them is altered.
+            first = self.filter(account=account, **fields).values('pk')[:1]
+            updated = self.filter(pk=models.Subquery(first)).update(
+                amount=models.F('amount') + amount,
+                quantity=models.F('quantity') + count,
+            )
+            if not updated:
+                missing.append(self.model(account=account, amount=amount, quantity=count, **fields))
+
+        if missing:
+            self.bulk_create(missing)
+
+    def refresh(self, account, dates):
+        """
+        Recompute the rollups of the bank account for the days given, either
+        as a collection or as a queryset, with constant statements whatever
+        the number of bank transactions altered.
+        """
+        if isinstance(dates, models.QuerySet):
+            chunks = [dates]
+        else:
+            dates = sorted(dates)
+            batch_size = max(connections[self.db].ops.bulk_batch_size(['date'], dates), 1)
+            chunks = [dates[i:i + batch_size] for i in range(0, len(dates), batch_size)]
+
+        for chunk in chunks:
+            rollups = self._build(account, Transaction.objects.filter(account=account, date__in=chunk))
+            self.filter(account=account, date__in=chunk).delete()
+            self.bulk_create(rollups)
+
+    def rebuild_rollups(self, account):
+        """
+        Recompute the rollups of the bank account from scratch. Returns the
+        number of rollups.
+        """
+        rollups = self._build(account, Transaction.objects.filter(account=account))
+
+        with transaction.atomic():
+            self.filter(account=account).delete()
+            self.bulk_create(rollups)
+
+        return len(rollups)
+
+    def check_rollups(self, account):
+        """
+        Returns the keys whose rollups of the bank account do not match a full
+        recompute.
+        """
+        # Float sums (i.e: SQLite) leave residues beyond the amount precision.
+        places = Decimal(1).scaleb(-self.model._meta.get_field('amount').decimal_places)
+
+        def normalize(rows):
+            return {
+                key: (Decimal(amount or 0).quantize(places), count or 0)
+                for key, amount, count in rows
+            }
+
+        expected = normalize(
+            (key, amount, count)
+            for account_pk, key, amount, count in self.group(Transaction.objects.filter(account=account))
+        )
+        actual = normalize(
+            (row[:-2], row[-2], row[-1])
+            for row in (
+                self
+                .filter(account=account)
+                .order_by()
+                .values_list(*self.model.KEY_FIELDS)
+                .annotate(total=models.Sum('amount'), number=models.Sum('quantity'))
+            )
+        )
+        actual = {key: values for key, values in actual.items() if any(values)}
+        return sorted(
+            (key for key in expected.keys() | actual.keys() if expected.get(key) != actual.get(key)),
+            key=lambda key: (key[1], str(key)),
+        )
+
+    def _build(self, account, qs):
+        return [
+            self.model(account=account, amount=amount, quantity=count, **dict(zip(self.model.KEY_FIELDS, key)))
+            for account_pk, key, amount, count in self.group(qs)
+        ]
+
+
+class TransactionRollup(models.Model):
+    """
+    Daily sum and count of the bank transactions of an account per tag,
+    status, reconciliation and sign of their amount, maintained along with
+    them for analytics.
+    """
+    account = models.ForeignKey(
+        Account,
+        related_name='transaction_rollups',
+        on_delete=models.CASCADE,
+    )
+    tag = models.ForeignKey(
+        Tag,
+        null=True,
+        related_name='transaction_rollups',
+        on_delete=models.SET_NULL,
+    )
+    date = models.DateField()
+    status = models.CharField(max_length=32, choices=Transaction.STATUSES)
+    reconciled = models.BooleanField()
+    sign = models.SmallIntegerField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    quantity = models.IntegerField(default=0)
+
+    objects = TransactionRollupManager()
+
+    KEY_FIELDS = ('tag_id', 'date', 'status', 'reconciled', 'sign')
+
+    class Meta:
+        db_table = 'transaction_rollups'
+        indexes = [
+            models.Index(fields=['account', 'status', 'date']),
+        ]
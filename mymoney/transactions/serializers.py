@@ -1,13 +1,22 @@
+import codecs
+import operator
+from collections import OrderedDict
+
+from django.db import connections, models
 from django.template.defaultfilters import date as date_format
+from django.utils.encoding import force_text
+from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
 from mymoney.core.utils import (
     get_default_account, localize_signed_amount,
-    localize_signed_amount_currency,
+    localize_signed_amount_currency, localize_signed_amounts,
+    localize_signed_amounts_currency,
 )
 from mymoney.tags.serializers import TagSerializer
 
+from .importers import FORMATS, get_format
 from .models import AbstractTransaction, Transaction
 
 
@@ -76,10 +85,94 @@ class TransactionListSerializer(TransactionDetailSerializer):
         return ret
 
 
+class TransactionFastListSerializer(serializers.ListSerializer):
+    """
+    Same representation as TransactionListSerializer(many=True), without the
+    fields machinery for each row: a plan of the fields is computed once,
+    nested values are memoized and amounts are localized by column for the
+    whole page.
+    """
+
+    def to_representation(self, data):
+        iterable = list(data.all() if isinstance(data, models.Manager) else data)
+
+        plan = []
+        for field in self.child._readable_fields:
+            nested = isinstance(field, serializers.BaseSerializer)
+            plan.append((
+                field.field_name,
+                operator.attrgetter(field.source),
+                field.to_representation,
+                {} if nested else None,
+            ))
+
+        displays = {
+            name: {
+                value: force_text(label, strings_only=True)
+                for value, label in Transaction._meta.get_field(name).flatchoices
+            }
+            for name in ('payment_method', 'status')
+        }
+        memo = {'date': {}}
+        memo['amount'], memo['currency'] = self.localize_amounts(iterable)
+
+        return [
+            self.represent(instance, plan, displays, memo)
+            for instance in iterable
+        ]
+
+    def localize_amounts(self, iterable):
+        # Distinct amounts of the page, keyed by their string to keep their
+        # exponent, e.g 10 and 10.00 are not localized the same way.
+        amounts = OrderedDict()
+        currencies = OrderedDict()
+        for instance in iterable:
+            for amount in (instance.amount, instance.balance_total, instance.balance_reconciled):
+                if amount is not None:
+                    amounts.setdefault(str(amount), amount)
+            currencies.setdefault(instance.currency, OrderedDict()).setdefault(
+                str(instance.amount), instance.amount)
+
+        localized = dict(zip(amounts, localize_signed_amounts(amounts.values())))
+        for currency, values in currencies.items():
+            currencies[currency] = dict(zip(values, localize_signed_amounts_currency(values.values(), currency)))
+        return localized, currencies
+
+    def represent(self, instance, plan, displays, memo):
+        ret = OrderedDict()
+
+        for name, get_attribute, to_representation, nested in plan:
+            attribute = get_attribute(instance)
+            if attribute is None:
+                ret[name] = None
+            elif nested is None:
+                ret[name] = to_representation(attribute)
+            else:
+                if attribute.pk not in nested:
+                    nested[attribute.pk] = to_representation(attribute)
+                ret[name] = nested[attribute.pk]
+
+        if instance.date not in memo['date']:
+            memo['date'][instance.date] = date_format(instance.date, 'SHORT_DATE_FORMAT')
+        ret['date_view'] = memo['date'][instance.date]
+
+        ret['amount_localized'] = memo['amount'][str(instance.amount)]
+        ret['amount_currency'] = memo['currency'][instance.currency][str(instance.amount)]
+
+        ret['payment_method_display'] = displays['payment_method'].get(
+            instance.payment_method, instance.payment_method)
+        ret['status_display'] = displays['status'].get(instance.status, instance.status)
+
+        for field in ('balance_total', 'balance_reconciled'):
+            attr = getattr(instance, field)
+            ret[field + '_view'] = memo['amount'][str(attr)] if attr is not None else None
+
+        return ret
+
+
 class BaseTransactionMultipleSerializer(serializers.ModelSerializer):
-    ids = serializers.PrimaryKeyRelatedField(
-        queryset=Transaction.objects.all(),
-        many=True,
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
         allow_empty=False,
     )
 
@@ -87,6 +180,25 @@ class BaseTransactionMultipleSerializer(serializers.ModelSerializer):
         model = Transaction
         fields = ('ids',)
 
+    def validate_ids(self, value):
+        # Check them by chunks instead of one query per pk.
+        ids = list(set(value))
+        batch_size = max(connections[Transaction.objects.db].ops.bulk_batch_size(['pk'], ids), 1)
+
+        missing = set(ids)
+        for i in range(0, len(ids), batch_size):
+            missing.difference_update(
+                Transaction.objects.filter(pk__in=ids[i:i + batch_size]).values_list('pk', flat=True)
+            )
+
+        if missing:
+            raise serializers.ValidationError(
+                serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist'].format(
+                    pk_value=min(missing),
+                )
+            )
+        return ids
+
 
 class TransactionPartialUpdateMutipleSerializer(BaseTransactionMultipleSerializer):
     class Meta(BaseTransactionMultipleSerializer.Meta):
@@ -97,6 +209,29 @@ class TransactionDeleteMutipleSerializer(BaseTransactionMultipleSerializer):
     pass
 
 
+class TransactionImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False)
+    encoding = serializers.CharField(default='utf-8-sig')
+
+    def validate(self, data):
+        if not data.get('format'):
+            data['format'] = get_format(data['file'].name)
+            if data['format'] is None:
+                raise serializers.ValidationError({
+                    'format': _('Unable to deduce the format of the file.'),
+                })
+
+        try:
+            codecs.lookup(data['encoding'])
+        except LookupError:
+            raise serializers.ValidationError({
+                'encoding': _('Unknown encoding.'),
+            })
+
+        return data
+
+
 class TransactionTeaserSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -0,0 +1,148 @@
+import os
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from mymoney.accounts.factories import AccountFactory
+
+from ..factories import TransactionFactory
+from ..models import Transaction, TransactionRollup
+
+
+class RebuildBalancesCommandTestCase(TestCase):
+
+    def test_none(self):
+        out = StringIO()
+        call_command('rebuildbalances', stdout=out)
+        self.assertEqual(out.getvalue(), '')
+
+    def test_rebuild(self):
+        account = AccountFactory()
+        bt = TransactionFactory(account=account, amount=10)
+        Transaction.objects.filter(pk=bt.pk).update(balance_total=0)
+
+        out = StringIO()
+        call_command('rebuildbalances', stdout=out)
+        self.assertIn('1 bank transaction(s) rebuilt', out.getvalue())
+        bt.refresh_from_db()
+        self.assertEqual(bt.balance_total, 10)
+
+    def test_rebuild_account(self):
+        account = AccountFactory()
+        bt1 = TransactionFactory(account=account, amount=10)
+        bt2 = TransactionFactory(amount=10)
+        Transaction.objects.update(balance_total=0)
+
+        out = StringIO()
+        call_command('rebuildbalances', account.pk, stdout=out)
+        bt1.refresh_from_db()
+        bt2.refresh_from_db()
+        self.assertEqual(bt1.balance_total, 10)
+        self.assertEqual(bt2.balance_total, 0)
+
+    def test_check(self):
+        account = AccountFactory()
+        TransactionFactory(account=account, amount=10)
+
+        out = StringIO()
+        call_command('rebuildbalances', check=True, stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+    def test_check_invalid(self):
+        account = AccountFactory()
+        bt = TransactionFactory(account=account, amount=10)
+        Transaction.objects.filter(pk=bt.pk).update(balance_total=0)
+
+        err = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuildbalances', check=True, stdout=StringIO(), stderr=err)
+        self.assertIn(str(bt.pk), err.getvalue())
+        bt.refresh_from_db()
+        self.assertEqual(bt.balance_total, 0)
+
+
+class RebuildRollupsCommandTestCase(TestCase):
+
+    def test_none(self):
+        out = StringIO()
+        call_command('rebuildrollups', stdout=out)
+        self.assertEqual(out.getvalue(), '')
+
+    def test_rebuild(self):
+        account = AccountFactory()
+        TransactionFactory(account=account, amount=10)
+        TransactionRollup.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuildrollups', stdout=out)
+        self.assertIn('1 rollup(s) rebuilt', out.getvalue())
+        self.assertListEqual(TransactionRollup.objects.check_rollups(account), [])
+
+    def test_rebuild_account(self):
+        account = AccountFactory()
+        TransactionFactory(account=account, amount=10)
+        other = TransactionFactory(amount=10).account
+        TransactionRollup.objects.all().delete()
+
+        call_command('rebuildrollups', account.pk, stdout=StringIO())
+        self.assertListEqual(TransactionRollup.objects.check_rollups(account), [])
+        self.assertEqual(len(TransactionRollup.objects.check_rollups(other)), 1)
+
+    def test_check(self):
+        account = AccountFactory()
+        TransactionFactory(account=account, amount=10)
+
+        out = StringIO()
+        call_command('rebuildrollups', check=True, stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+    def test_check_invalid(self):
+        account = AccountFactory()
+        bt = TransactionFactory(account=account, amount=10)
+        TransactionRollup.objects.update(amount=0)
+
+        err = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuildrollups', check=True, stdout=StringIO(), stderr=err)
+        self.assertIn(str(bt.date), err.getvalue())
+        self.assertEqual(TransactionRollup.objects.get().amount, 0)
+
+
+class ImportTransactionsCommandTestCase(TestCase):
+
+    def setUp(self):
+        self.file = tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False)
+        self.addCleanup(os.remove, self.file.name)
+        self.file.write('label,date,amount\nfoo,2015-10-26,10\nbar,2015-10-27,\n')
+        self.file.close()
+
+    def test_import(self):
+        account = AccountFactory(balance=0)
+
+        out, err = StringIO(), StringIO()
+        call_command('importtransactions', self.file.name, stdout=out, stderr=err)
+        self.assertIn('1 bank transaction(s) imported, 1 error(s)', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        self.assertIn('Row 2: amount:', err.getvalue())
+
+        account.refresh_from_db()
+        self.assertEqual(account.balance, 10)
+        self.assertEqual(account.transactions.get().label, 'foo')
+
+    def test_import_account(self):
+        AccountFactory()
+        account = AccountFactory(balance=0)
+
+        call_command('importtransactions', self.file.name, account=account.pk, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(account.transactions.count(), 1)
+
+    def test_unknown_account(self):
+        with self.assertRaises(CommandError):
+            call_command('importtransactions', self.file.name, account=-1)
+
+    def test_unknown_format(self):
+        AccountFactory()
+        with self.assertRaises(CommandError):
+            call_command('importtransactions', 'statement.txt')
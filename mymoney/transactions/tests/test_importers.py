@@ -0,0 +1,176 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from mymoney.accounts.factories import AccountFactory
+
+from ..importers import (
+    FORMAT_CSV, FORMAT_OFX, FORMAT_QIF, _iter_ofx_tags, get_format,
+    import_transactions, parse_csv, parse_ofx, parse_qif,
+)
+from ..models import Transaction
+
+OFX_SGML = """OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+
+<OFX>
+<BANKMSGSRSV1><STMTTRNRS><STMTRS>
+<BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20151026120000[-5:EST]
+<TRNAMT>-12,50
+<FITID>1
+<NAME>Grocery
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20151027
+<TRNAMT>1500.00
+<FITID>2
+<MEMO>Salary
+</STMTTRN>
+</BANKTRANLIST>
+</STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+OFX_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?><?OFX OFXHEADER="200" VERSION="211"?>'
+    '<OFX><BANKTRANLIST><STMTTRN><TRNTYPE>DEBIT</TRNTYPE><DTPOSTED>20151026</DTPOSTED>'
+    '<TRNAMT>-1.234,56</TRNAMT><NAME>Rent</NAME><MEMO>October</MEMO></STMTTRN>'
+    '</BANKTRANLIST></OFX>'
+)
+
+QIF = """!Type:Bank
+D10/26/2015
+T-1,234.56
+PRent
+Cx
+^
+D10/27'15
+T1500.00
+MSalary
+^
+"""
+
+
+class ParserTestCase(SimpleTestCase):
+
+    def test_get_format(self):
+        self.assertEqual(get_format('statement.CSV'), FORMAT_CSV)
+        self.assertEqual(get_format('statement.ofx'), FORMAT_OFX)
+        self.assertIsNone(get_format('statement.txt'))
+        self.assertIsNone(get_format(None))
+
+    def test_csv(self):
+        rows = list(parse_csv(StringIO(
+            'Label,Date,Amount,Reconciled,Unknown\n'
+            'foo,2015-10-26,-10.5,true,bar\n'
+            '\n'
+            '"baz, qux",2015-10-27,20,,\n'
+        )))
+        self.assertListEqual(rows, [
+            {'label': 'foo', 'date': '2015-10-26', 'amount': '-10.5', 'reconciled': 'true', 'unknown': 'bar'},
+            {'label': 'baz, qux', 'date': '2015-10-27', 'amount': '20', 'reconciled': '', 'unknown': ''},
+        ])
+
+    def test_csv_empty(self):
+        self.assertListEqual(list(parse_csv(StringIO(''))), [])
+
+    def test_ofx_sgml(self):
+        rows = list(parse_ofx(StringIO(OFX_SGML)))
+        self.assertListEqual(rows, [
+            {'date': '2015-10-26', 'amount': '-12.50', 'label': 'Grocery'},
+            {'date': '2015-10-27', 'amount': '1500.00', 'memo': 'Salary', 'label': 'Salary'},
+        ])
+
+    def test_ofx_xml(self):
+        rows = list(parse_ofx(StringIO(OFX_XML)))
+        self.assertListEqual(rows, [
+            {'date': '2015-10-26', 'amount': '-1234.56', 'label': 'Rent', 'memo': 'October'},
+        ])
+
+    def test_ofx_chunks(self):
+        # Tags split between chunks whatever the chunk size.
+        expected = list(_iter_ofx_tags(StringIO(OFX_XML)))
+        for chunk_size in (1, 7, 16):
+            self.assertListEqual(list(_iter_ofx_tags(StringIO(OFX_XML), chunk_size)), expected)
+
+    def test_qif(self):
+        rows = list(parse_qif(StringIO(QIF)))
+        self.assertListEqual(rows, [
+            {'date': '2015-10-26', 'amount': '-1234.56', 'label': 'Rent', 'reconciled': True},
+            {'date': '2015-10-27', 'amount': '1500.00', 'memo': 'Salary', 'label': 'Salary'},
+        ])
+
+    def test_qif_last_record(self):
+        rows = list(parse_qif(StringIO('D2015-10-26\nT10\nPfoo')))
+        self.assertListEqual(rows, [{'date': '2015-10-26', 'amount': '10', 'label': 'foo'}])
+
+
+class ImportTestCase(TestCase):
+
+    def test_import(self):
+        account = AccountFactory(balance=0, currency='EUR')
+
+        result = import_transactions(account, StringIO(QIF), FORMAT_QIF)
+        self.assertEqual(result.created, 2)
+        self.assertListEqual(result.errors, [])
+        self.assertGreater(result.rate, 0)
+
+        self.assertListEqual(
+            list(
+                account.transactions
+                .order_by('date')
+                .values_list('label', 'date', 'amount', 'currency', 'reconciled')
+            ),
+            [
+                ('Rent', datetime.date(2015, 10, 26), Decimal('-1234.56'), 'EUR', True),
+                ('Salary', datetime.date(2015, 10, 27), Decimal('1500'), 'EUR', False),
+            ],
+        )
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('265.44'))
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+
+    def test_import_errors(self):
+        account = AccountFactory(balance=0)
+
+        result = import_transactions(account, StringIO(
+            'label,date,amount\n'
+            'foo,2015-10-26,10\n'
+            ',2015-10-27,10\n'
+            'bar,26/10/2015,foo\n'
+        ), FORMAT_CSV)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(len(result.errors), 2)
+        self.assertEqual(result.errors[0]['row'], 2)
+        self.assertIn('label', result.errors[0]['errors'])
+        self.assertEqual(result.errors[1]['row'], 3)
+        self.assertIn('date', result.errors[1]['errors'])
+        self.assertIn('amount', result.errors[1]['errors'])
+
+        report = result.as_dict()
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(len(report['errors']), 2)
+
+    def test_import_batches(self):
+        account = AccountFactory(balance=0)
+        stream = StringIO('label,amount\n' + 'foo,10\n' * 5)
+
+        with mock.patch.object(Transaction.objects, 'create_multiple',
+                               wraps=Transaction.objects.create_multiple) as create_multiple:
+            result = import_transactions(account, stream, FORMAT_CSV, batch_size=2)
+
+        self.assertEqual(result.created, 5)
+        self.assertListEqual(
+            [len(call[0][1]) for call in create_multiple.call_args_list],
+            [2, 2, 1],
+        )
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('50'))
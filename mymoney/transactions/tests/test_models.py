@@ -2,14 +2,18 @@ import datetime
 from decimal import Decimal
 from unittest import mock
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from dateutil.relativedelta import relativedelta
 
 from mymoney.accounts.factories import AccountFactory
-from mymoney.accounts.models import Account
+from mymoney.accounts.models import Account, AccountManager
 from mymoney.tags.factories import TagFactory
 
 from ..factories import TransactionFactory
-from ..models import Transaction
+from ..models import BalanceCheckpoint, Transaction, TransactionRollup
 
 
 class TransactionModelTestCase(TestCase):
@@ -75,7 +79,7 @@ class TransactionModelTestCase(TestCase):
     def test_save_account_update_fail(self):
         account = AccountFactory(balance=0)
 
-        with mock.patch.object(Account, 'save', side_effect=Exception('Boom')):
+        with mock.patch.object(AccountManager, 'adjust_balance', side_effect=Exception('Boom')):
             with self.assertRaises(Exception):
                 TransactionFactory(
                     account=account,
@@ -170,7 +174,7 @@ class TransactionModelTestCase(TestCase):
         )
         transaction_pk = transaction.pk
 
-        with mock.patch.object(Account, 'save', side_effect=Exception('Boom')):
+        with mock.patch.object(AccountManager, 'adjust_balance', side_effect=Exception('Boom')):
             with self.assertRaises(Exception):
                 transaction.delete()
 
@@ -178,6 +182,403 @@ class TransactionModelTestCase(TestCase):
         account.refresh_from_db()
         self.assertEqual(account.balance, Decimal(25))
 
+    def test_update_queries(self):
+        account = AccountFactory(balance=0)
+        TransactionFactory(account=account, amount=10)
+        transaction = Transaction.objects.select_related('account').get()
+
+        # No query to fetch previous values nor to reload the balance, which
+        # is read back by the UPDATE where supported. The same rollup is
+        # updated, once the bank account locked.
+        transaction.amount = 20
+        with self.assertNumQueries(9 if connection.vendor == 'postgresql' else 10):
+            transaction.save()
+        self.assertEqual(transaction.account.balance, Decimal('20'))
+
+        transaction.label = 'foo'
+        with self.assertNumQueries(4):
+            transaction.save()
+
+    def test_update_tracked_values(self):
+        account = AccountFactory(balance=0)
+        transaction = TransactionFactory(account=account, amount=10)
+
+        transaction.amount = 15
+        transaction.save()
+        transaction.status = Transaction.STATUS_INACTIVE
+        transaction.save()
+        transaction.status = Transaction.STATUS_ACTIVE
+        transaction.amount = 30
+        transaction.save()
+
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('30'))
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+
+    def test_update_refreshed_values(self):
+        account = AccountFactory(balance=0)
+        transaction = TransactionFactory(account=account, amount=10)
+        Transaction.objects.filter(pk=transaction.pk).update(reconciled=True)
+
+        transaction.refresh_from_db(fields=['reconciled'])
+        transaction.amount = 20
+        transaction.save()
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.balance_reconciled, Decimal('20'))
+
+    def test_update_deferred(self):
+        account = AccountFactory(balance=0)
+        TransactionFactory(account=account, amount=10)
+        transaction = Transaction.objects.only('label', 'account').get()
+
+        # Previous values are fetched instead.
+        transaction.amount = 20
+        transaction.save()
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('20'))
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+
+    def test_update_stale_running_balances(self):
+        account = AccountFactory(balance=0)
+        transaction = TransactionFactory(account=account, amount=10, date=datetime.date(2015, 10, 27))
+        TransactionFactory(account=account, amount=20, date=datetime.date(2015, 10, 26))
+
+        transaction.label = 'foo'
+        transaction.save()
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+
+    def test_adjust_balance(self):
+        account = AccountFactory(balance=10)
+        version = Account.objects.get(pk=account.pk).version
+
+        Account.objects.adjust_balance(account, Decimal('-2.5'))
+        self.assertEqual(account.balance, Decimal('7.5'))
+        self.assertEqual(account.version, version + 1)
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('7.5'))
+
+    def test_adjust_balance_last_modified(self):
+        account = AccountFactory(balance=10)
+        last_modified = Account.objects.get(pk=account.pk).last_modified
+
+        Account.objects.adjust_balance(account, Decimal('-2.5'))
+        self.assertGreater(account.last_modified, last_modified)
+        self.assertEqual(Account.objects.get(pk=account.pk).last_modified, account.last_modified)
+
+    def test_bump_version(self):
+        account = AccountFactory()
+        other = AccountFactory()
+        values = dict(Account.objects.values_list('pk', 'last_modified'))
+
+        Account.objects.bump_version(account)
+        self.assertGreater(Account.objects.get(pk=account.pk).last_modified, values[account.pk])
+        self.assertEqual(Account.objects.get(pk=other.pk).last_modified, values[other.pk])
+
+        Account.objects.bump_version()
+        self.assertGreater(Account.objects.get(pk=other.pk).last_modified, values[other.pk])
+
+    def test_account_save_version(self):
+        account = AccountFactory()
+        version = account.version
+
+        account.label = 'foo'
+        account.save()
+        self.assertEqual(account.version, version + 1)
+        account.save(update_fields=['label'])
+        self.assertEqual(account.version, version + 2)
+        self.assertEqual(Account.objects.get(pk=account.pk).version, version + 2)
+
+
+class RunningBalanceTestCase(TestCase):
+
+    def assertRunningBalances(self, account, expected):
+        self.assertListEqual(
+            [
+                (row['balance_total'], row['balance_reconciled'])
+                for row in Transaction.objects.filter(account=account)
+                .order_by('date', 'id')
+                .values('balance_total', 'balance_reconciled')
+            ],
+            [
+                (Decimal(total), Decimal(reconciled) if reconciled is not None else None)
+                for total, reconciled in expected
+            ],
+        )
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+
+    def test_insert(self):
+        account = AccountFactory(balance=0)
+        bt = TransactionFactory(
+            account=account,
+            amount=10,
+            date=datetime.date(2015, 10, 27),
+        )
+        self.assertEqual(bt.balance_total, Decimal(10))
+        self.assertIsNone(bt.balance_reconciled)
+
+        TransactionFactory(
+            account=account,
+            amount=5,
+            date=datetime.date(2015, 10, 28),
+        )
+        self.assertRunningBalances(account, [(10, None), (15, None)])
+
+    def test_insert_backdated(self):
+        account = AccountFactory(balance=0)
+        TransactionFactory(
+            account=account,
+            amount=10,
+            date=datetime.date(2015, 10, 27),
+        )
+        TransactionFactory(
+            account=account,
+            amount=5,
+            reconciled=True,
+            date=datetime.date(2015, 10, 26),
+        )
+        self.assertRunningBalances(account, [(5, 5), (15, 5)])
+
+    def test_insert_inactive(self):
+        account = AccountFactory(balance=0)
+        TransactionFactory(
+            account=account,
+            amount=10,
+            status=Transaction.STATUS_INACTIVE,
+            date=datetime.date(2015, 10, 27),
+        )
+        TransactionFactory(
+            account=account,
+            amount=5,
+            date=datetime.date(2015, 10, 28),
+        )
+        self.assertRunningBalances(account, [(10, None), (15, None)])
+
+    def test_update_amount(self):
+        account = AccountFactory(balance=0)
+        bt = TransactionFactory(
+            account=account,
+            amount=10,
+            reconciled=True,
+            date=datetime.date(2015, 10, 27),
+        )
+        TransactionFactory(
+            account=account,
+            amount=5,
+            date=datetime.date(2015, 10, 28),
+        )
+
+        bt.amount = 20
+        bt.save()
+        self.assertRunningBalances(account, [(20, 20), (25, 20)])
+
+    def test_update_date(self):
+        account = AccountFactory(balance=0)
+        bt = TransactionFactory(
+            account=account,
+            amount=10,
+            reconciled=True,
+            date=datetime.date(2015, 10, 27),
+        )
+        TransactionFactory(
+            account=account,
+            amount=5,
+            date=datetime.date(2015, 10, 28),
+        )
+        TransactionFactory(
+            account=account,
+            amount=1,
+            date=datetime.date(2015, 10, 30),
+        )
+
+        bt.date = datetime.date(2015, 10, 29)
+        bt.save()
+        self.assertRunningBalances(account, [(5, None), (15, 10), (16, 10)])
+
+        bt.date = datetime.date(2015, 10, 26)
+        bt.save()
+        self.assertRunningBalances(account, [(10, 10), (15, 10), (16, 10)])
+
+    def test_update_reconciled(self):
+        account = AccountFactory(balance=0)
+        bt = TransactionFactory(
+            account=account,
+            amount=10,
+            date=datetime.date(2015, 10, 27),
+        )
+        TransactionFactory(
+            account=account,
+            amount=5,
+            reconciled=True,
+            date=datetime.date(2015, 10, 28),
+        )
+        self.assertRunningBalances(account, [(10, None), (15, 5)])
+
+        bt.reconciled = True
+        bt.save(update_fields=['reconciled'])
+        self.assertRunningBalances(account, [(10, 10), (15, 15)])
+
+        bt.reconciled = False
+        bt.save(update_fields=['reconciled'])
+        self.assertRunningBalances(account, [(10, None), (15, 5)])
+
+    def test_reconciled_zero(self):
+        account = AccountFactory(balance=0)
+        TransactionFactory(
+            account=account,
+            amount=10,
+            date=datetime.date(2015, 10, 28),
+        )
+        bt = TransactionFactory(
+            account=account,
+            amount=0,
+            reconciled=True,
+            date=datetime.date(2015, 10, 27),
+        )
+        self.assertRunningBalances(account, [(0, 0), (10, 0)])
+
+        bt.reconciled = False
+        bt.save(update_fields=['reconciled'])
+        self.assertRunningBalances(account, [(0, None), (10, None)])
+
+        bt.reconciled = True
+        bt.save(update_fields=['reconciled'])
+        self.assertRunningBalances(account, [(0, 0), (10, 0)])
+
+        bt.date = datetime.date(2015, 10, 29)
+        bt.save(update_fields=['date'])
+        self.assertRunningBalances(account, [(10, None), (10, 0)])
+
+        bt.date = datetime.date(2015, 10, 26)
+        bt.save(update_fields=['date'])
+        self.assertRunningBalances(account, [(0, 0), (10, 0)])
+
+    def test_update_status(self):
+        account = AccountFactory(balance=0)
+        bt = TransactionFactory(
+            account=account,
+            amount=10,
+            date=datetime.date(2015, 10, 27),
+        )
+        TransactionFactory(
+            account=account,
+            amount=5,
+            date=datetime.date(2015, 10, 28),
+        )
+
+        bt.status = Transaction.STATUS_INACTIVE
+        bt.save(update_fields=['status'])
+        self.assertRunningBalances(account, [(10, None), (15, None)])
+
+    def test_delete(self):
+        account = AccountFactory(balance=0)
+        bt = TransactionFactory(
+            account=account,
+            amount=10,
+            reconciled=True,
+            date=datetime.date(2015, 10, 27),
+        )
+        TransactionFactory(
+            account=account,
+            amount=5,
+            date=datetime.date(2015, 10, 28),
+        )
+        TransactionFactory(
+            account=account,
+            amount=1,
+            reconciled=True,
+            date=datetime.date(2015, 10, 29),
+        )
+
+        bt.delete()
+        self.assertRunningBalances(account, [(5, None), (6, 1)])
+
+    def test_delete_inactive(self):
+        account = AccountFactory(balance=0)
+        bt = TransactionFactory(
+            account=account,
+            amount=10,
+            status=Transaction.STATUS_INACTIVE,
+            date=datetime.date(2015, 10, 27),
+        )
+        TransactionFactory(
+            account=account,
+            amount=5,
+            date=datetime.date(2015, 10, 28),
+        )
+
+        bt.delete()
+        self.assertRunningBalances(account, [(5, None)])
+
+    def test_other_account(self):
+        account = AccountFactory(balance=0)
+        TransactionFactory(
+            account=account,
+            amount=10,
+            date=datetime.date(2015, 10, 28),
+        )
+        TransactionFactory(
+            amount=5,
+            reconciled=True,
+            date=datetime.date(2015, 10, 27),
+        )
+        self.assertRunningBalances(account, [(10, None)])
+
+    def test_random_operations(self):
+        account = AccountFactory(balance=0)
+        transactions = []
+        for i in range(30):
+            transactions.append(TransactionFactory(
+                account=account,
+                date=datetime.date(2015, 10, i % 5 + 1),
+                reconciled=i % 3 == 0,
+                status=Transaction.STATUS_INACTIVE if i % 7 == 0 else Transaction.STATUS_ACTIVE,
+            ))
+
+        for i, bt in enumerate(transactions):
+            if i % 4 == 0:
+                bt.delete()
+                continue
+
+            bt.refresh_from_db()
+            if i % 4 == 1:
+                bt.date = datetime.date(2015, 10, 5 - i % 5)
+            elif i % 4 == 2:
+                bt.reconciled = not bt.reconciled
+            else:
+                bt.amount += 1
+            bt.save()
+
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+
+    def test_lock_account(self):
+        account = AccountFactory(balance=0)
+        bt = TransactionFactory(account=account, amount=10)
+
+        def assertLockedFirst(func, *args, **kwargs):
+            with CaptureQueriesContext(connection) as context:
+                func(*args, **kwargs)
+            queries = [query['sql'] for query in context.captured_queries]
+            locks = [sql for sql in queries if sql.startswith('SELECT') and 'FROM "accounts"' in sql]
+            # The bank account is locked before any running balance is read
+            # or any row written.
+            first = next(
+                sql for sql in queries
+                if 'balance_total' in sql or sql.startswith(('INSERT', 'UPDATE', 'DELETE'))
+            )
+            self.assertTrue(locks)
+            self.assertLess(queries.index(locks[0]), queries.index(first))
+            if connection.features.has_select_for_update:
+                self.assertIn('FOR UPDATE', locks[0])
+
+        bt.amount = 20
+        assertLockedFirst(bt.save)
+        assertLockedFirst(TransactionFactory.build(account=account, amount=5).save)
+        assertLockedFirst(Transaction.objects.create_multiple, account, [Transaction(amount=5)])
+        assertLockedFirst(Transaction.objects.update_multiple, [bt.pk], reconciled=True)
+        assertLockedFirst(bt.delete)
+        assertLockedFirst(Transaction.objects.delete_multiple, Transaction.objects.values_list('pk', flat=True))
+        self.assertEqual(Transaction.objects.count(), 0)
+
 
 class TransactionManagerTestCase(TestCase):
 
@@ -341,6 +742,235 @@ class TransactionManagerTestCase(TestCase):
             Decimal('10'),
         )
 
+    def test_reconciled_balance_checkpoint(self):
+        account = AccountFactory(balance=0)
+        TransactionFactory(
+            account=account,
+            amount=-15,
+            reconciled=True,
+            date=datetime.date.today() - relativedelta(months=3),
+        )
+        TransactionFactory(
+            account=account,
+            amount=-20,
+            reconciled=False,
+            date=datetime.date.today() - relativedelta(months=3),
+        )
+        TransactionFactory(
+            account=account,
+            amount=40,
+            reconciled=True,
+        )
+        self.assertEqual(
+            Transaction.objects.get_reconciled_balance(account),
+            Decimal('25'),
+        )
+        self.assertTrue(BalanceCheckpoint.objects.filter(account=account).exists())
+
+        # Use the checkpoint built instead.
+        self.assertEqual(
+            Transaction.objects.get_reconciled_balance(account),
+            Decimal('25'),
+        )
+
+    def test_running_balances_none(self):
+        account = AccountFactory(balance=0)
+        self.assertListEqual(
+            list(Transaction.objects.get_running_balances(account)),
+            [],
+        )
+
+    def test_running_balances(self):
+        account = AccountFactory(balance=0)
+        TransactionFactory(
+            amount=15,
+            date=datetime.date(2015, 10, 26),
+        )
+        bt1 = TransactionFactory(
+            account=account,
+            amount=-15,
+            date=datetime.date(2015, 10, 27),
+        )
+        bt2 = TransactionFactory(
+            account=account,
+            amount=20,
+            reconciled=True,
+            status=Transaction.STATUS_INACTIVE,
+            date=datetime.date(2015, 10, 27),
+        )
+        rows = list(Transaction.objects.get_running_balances(account))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0][:3], (bt1.pk, Decimal('-15'), None))
+        self.assertEqual(rows[1][:3], (bt2.pk, Decimal('5'), Decimal('20')))
+
+    def test_check_running_balances(self):
+        account = AccountFactory(balance=0)
+        bt1 = TransactionFactory(account=account, amount=10)
+        bt2 = TransactionFactory(account=account, amount=10)
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+
+        Transaction.objects.filter(pk=bt2.pk).update(balance_total=0)
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [bt2.pk])
+
+        Transaction.objects.filter(pk=bt1.pk).update(balance_reconciled=10)
+        self.assertEqual(len(Transaction.objects.check_running_balances(account)), 2)
+
+    def test_rebuild_running_balances(self):
+        account = AccountFactory(balance=0)
+        TransactionFactory(account=account, amount=10, reconciled=True)
+        TransactionFactory(account=account, amount=10)
+        Transaction.objects.filter(account=account).update(
+            balance_total=0,
+            balance_reconciled=None,
+        )
+
+        self.assertEqual(Transaction.objects.rebuild_running_balances(account), 2)
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+        self.assertEqual(Transaction.objects.rebuild_running_balances(account), 0)
+
+    def test_rebuild_running_balances_since(self):
+        account = AccountFactory(balance=0)
+        bt1 = TransactionFactory(account=account, amount=10, reconciled=True, date=datetime.date(2015, 10, 26))
+        bt2 = TransactionFactory(account=account, amount=20, date=datetime.date(2015, 10, 27))
+        bt3 = TransactionFactory(account=account, amount=40, date=datetime.date(2015, 10, 28))
+        Transaction.objects.filter(account=account).update(balance_total=0)
+
+        # Predecessors are trusted as is.
+        Transaction.objects.filter(pk=bt1.pk).update(balance_total=10)
+        self.assertEqual(
+            Transaction.objects.rebuild_running_balances(account, since=(bt2.date, bt2.pk)),
+            2,
+        )
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+        bt3.refresh_from_db()
+        self.assertEqual(bt3.balance_total, Decimal('70'))
+        self.assertEqual(bt3.balance_reconciled, Decimal('10'))
+
+    def test_create_multiple(self):
+        account = AccountFactory(balance=0, currency='EUR')
+        TransactionFactory(account=account, amount=10, reconciled=True, date=datetime.date(2015, 10, 26))
+
+        Transaction.objects.create_multiple(account, [
+            Transaction(label='foo', amount=20, date=datetime.date(2015, 10, 27)),
+            Transaction(label='bar', amount=40, date=datetime.date(2015, 10, 26), reconciled=True),
+            Transaction(label='baz', amount=80, date=datetime.date(2015, 10, 26),
+                        status=Transaction.STATUS_INACTIVE),
+        ])
+        self.assertEqual(account.balance, Decimal('70'))
+        self.assertEqual(account.transactions.filter(currency='EUR').count(), 4)
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+
+    def test_create_multiple_backdated(self):
+        account = AccountFactory(balance=0)
+        TransactionFactory(account=account, amount=10, date=datetime.date(2015, 10, 27))
+
+        Transaction.objects.create_multiple(account, [
+            Transaction(label='foo', amount=20, date=datetime.date(2015, 10, 28), reconciled=True),
+            Transaction(label='bar', amount=40, date=datetime.date(2015, 10, 26)),
+        ])
+        self.assertEqual(account.balance, Decimal('70'))
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+
+    def test_create_multiple_none(self):
+        account = AccountFactory(balance=0)
+        with self.assertNumQueries(0):
+            self.assertListEqual(Transaction.objects.create_multiple(account, []), [])
+
+    def test_update_multiple(self):
+        account = AccountFactory(balance=0)
+        bt1 = TransactionFactory(account=account, amount=10, date=datetime.date(2015, 10, 26))
+        bt2 = TransactionFactory(account=account, amount=20, date=datetime.date(2015, 10, 27),
+                                 status=Transaction.STATUS_INACTIVE)
+        bt3 = TransactionFactory(account=account, amount=40, date=datetime.date(2015, 10, 28))
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('50'))
+
+        Transaction.objects.update_multiple(
+            [bt2.pk, bt3.pk],
+            status=Transaction.STATUS_ACTIVE,
+            reconciled=True,
+        )
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('50'))
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+        bt3.refresh_from_db()
+        self.assertEqual(bt3.balance_reconciled, Decimal('60'))
+
+        Transaction.objects.update_multiple(
+            [bt1.pk, bt3.pk],
+            status=Transaction.STATUS_INACTIVE,
+            reconciled=False,
+        )
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('50'))
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+        bt1.refresh_from_db()
+        self.assertIsNone(bt1.balance_reconciled)
+
+    def test_update_multiple_no_field(self):
+        account = AccountFactory(balance=0)
+        bt = TransactionFactory(account=account, amount=10)
+        account.refresh_from_db()
+
+        with self.assertNumQueries(0):
+            Transaction.objects.update_multiple([bt.pk], amount=20)
+
+    def test_update_multiple_checkpoints(self):
+        account = AccountFactory(balance=0)
+        TransactionFactory(account=account, amount=5, date=datetime.date(2015, 7, 2))
+        bt = TransactionFactory(account=account, amount=10, date=datetime.date(2015, 8, 2))
+        BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+
+        Transaction.objects.update_multiple([bt.pk], reconciled=True)
+        self.assertListEqual(
+            list(BalanceCheckpoint.objects.filter(account=account).values_list('date', flat=True)),
+            [datetime.date(2015, 8, 1)],
+        )
+        checkpoint = BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+        self.assertEqual(checkpoint.reconciled, Decimal('10'))
+
+    def test_update_multiple_version(self):
+        account = AccountFactory(balance=0)
+        bt = TransactionFactory(account=account, amount=10)
+        account.refresh_from_db()
+        version = account.version
+
+        Transaction.objects.update_multiple([bt.pk], reconciled=True)
+        account.refresh_from_db()
+        self.assertEqual(account.version, version + 1)
+
+    def test_delete_multiple(self):
+        account = AccountFactory(balance=0)
+        other = AccountFactory(balance=0)
+        bt1 = TransactionFactory(account=account, amount=10, date=datetime.date(2015, 10, 26))
+        bt2 = TransactionFactory(account=account, amount=20, date=datetime.date(2015, 10, 27))
+        bt3 = TransactionFactory(account=account, amount=40, reconciled=True, date=datetime.date(2015, 10, 28))
+        bt4 = TransactionFactory(account=other, amount=80, date=datetime.date(2015, 10, 26))
+        BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 12, 1))
+
+        Transaction.objects.delete_multiple([bt2.pk, bt4.pk])
+        account.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('50'))
+        self.assertEqual(other.balance, Decimal('0'))
+        self.assertListEqual(
+            list(Transaction.objects.filter(account=account).values_list('pk', flat=True)),
+            [bt1.pk, bt3.pk],
+        )
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+        self.assertFalse(BalanceCheckpoint.objects.filter(account=account).exists())
+
+    def test_delete_multiple_inactive(self):
+        account = AccountFactory(balance=0)
+        bt = TransactionFactory(account=account, amount=10, status=Transaction.STATUS_INACTIVE)
+        account.refresh_from_db()
+        version = account.version
+
+        Transaction.objects.delete_multiple([bt.pk])
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('0'))
+        self.assertEqual(account.version, version + 1)
+
     def test_total_unscheduled_period_none(self):
         account = AccountFactory(balance=0)
         self.assertEqual(
@@ -465,6 +1095,281 @@ class TransactionManagerTestCase(TestCase):
         )
 
 
+class BalanceCheckpointTestCase(TestCase):
+
+    def test_get_checkpoint_none(self):
+        account = AccountFactory()
+        checkpoint = BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+        self.assertEqual(checkpoint.date, datetime.date(2015, 10, 1))
+        self.assertEqual(checkpoint.total, 0)
+        self.assertEqual(checkpoint.reconciled, 0)
+
+    def test_get_checkpoint(self):
+        account = AccountFactory()
+        TransactionFactory(account=account, amount=10, reconciled=True, date=datetime.date(2015, 7, 2))
+        TransactionFactory(account=account, amount=20, date=datetime.date(2015, 8, 31))
+        TransactionFactory(account=account, amount=40, date=datetime.date(2015, 8, 31),
+                           status=Transaction.STATUS_INACTIVE)
+        TransactionFactory(account=account, amount=80, reconciled=True, date=datetime.date(2015, 10, 1))
+        TransactionFactory(amount=160, date=datetime.date(2015, 8, 1))
+
+        checkpoint = BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+        self.assertEqual(checkpoint.date, datetime.date(2015, 10, 1))
+        self.assertEqual(checkpoint.total, Decimal('30'))
+        self.assertEqual(checkpoint.reconciled, Decimal('10'))
+
+        self.assertListEqual(
+            list(BalanceCheckpoint.objects.filter(account=account).order_by('date').values_list('date', 'total')),
+            [
+                (datetime.date(2015, 8, 1), Decimal('10')),
+                (datetime.date(2015, 9, 1), Decimal('30')),
+                (datetime.date(2015, 10, 1), Decimal('30')),
+            ],
+        )
+
+    def test_get_checkpoint_lazy(self):
+        account = AccountFactory()
+        TransactionFactory(account=account, amount=10, date=datetime.date(2015, 7, 2))
+        BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 8, 26))
+        TransactionFactory(account=account, amount=20, date=datetime.date(2015, 8, 31))
+
+        checkpoint = BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+        self.assertEqual(checkpoint.total, Decimal('30'))
+        self.assertEqual(
+            BalanceCheckpoint.objects.get(account=account, date=datetime.date(2015, 8, 1)).total,
+            Decimal('10'),
+        )
+
+    def test_insert_backdated(self):
+        account = AccountFactory()
+        TransactionFactory(account=account, amount=10, date=datetime.date(2015, 7, 2))
+        BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+
+        TransactionFactory(account=account, amount=20, date=datetime.date(2015, 8, 31))
+        self.assertListEqual(
+            list(BalanceCheckpoint.objects.filter(account=account).values_list('date', flat=True)),
+            [datetime.date(2015, 8, 1)],
+        )
+        checkpoint = BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+        self.assertEqual(checkpoint.total, Decimal('30'))
+
+    def test_insert_inactive(self):
+        account = AccountFactory()
+        BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+
+        TransactionFactory(
+            account=account,
+            amount=20,
+            date=datetime.date(2015, 8, 31),
+            status=Transaction.STATUS_INACTIVE,
+        )
+        self.assertTrue(BalanceCheckpoint.objects.filter(account=account).exists())
+
+    def test_update(self):
+        account = AccountFactory()
+        bt = TransactionFactory(account=account, amount=10, date=datetime.date(2015, 9, 2))
+        TransactionFactory(account=account, amount=10, date=datetime.date(2015, 7, 2))
+        BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+
+        bt.label = 'foo'
+        bt.save()
+        self.assertEqual(BalanceCheckpoint.objects.filter(account=account).count(), 2)
+
+        bt.reconciled = True
+        bt.save()
+        self.assertEqual(BalanceCheckpoint.objects.filter(account=account).count(), 1)
+        checkpoint = BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+        self.assertEqual(checkpoint.reconciled, Decimal('10'))
+
+    def test_update_date(self):
+        account = AccountFactory()
+        bt = TransactionFactory(account=account, amount=10, date=datetime.date(2015, 9, 2))
+        TransactionFactory(account=account, amount=10, date=datetime.date(2015, 6, 2))
+        BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+
+        bt.date = datetime.date(2015, 7, 2)
+        bt.save()
+        self.assertEqual(BalanceCheckpoint.objects.filter(account=account).count(), 1)
+        checkpoint = BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 8, 26))
+        self.assertEqual(checkpoint.total, Decimal('20'))
+
+    def test_delete(self):
+        account = AccountFactory()
+        bt = TransactionFactory(account=account, amount=10, date=datetime.date(2015, 9, 2))
+        TransactionFactory(account=account, amount=10, date=datetime.date(2015, 7, 2))
+        BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+
+        bt.delete()
+        self.assertEqual(BalanceCheckpoint.objects.filter(account=account).count(), 1)
+        checkpoint = BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+        self.assertEqual(checkpoint.total, Decimal('10'))
+
+    def assertLockedFirst(self, method, func, *args, **kwargs):
+        calls = []
+        with mock.patch.object(Account.objects, 'lock', side_effect=lambda pks: calls.append('lock')), \
+                mock.patch.object(BalanceCheckpoint.objects, method,
+                                  side_effect=lambda *a, **kw: calls.append(method)):
+            func(*args, **kwargs)
+        self.assertEqual(calls[:1], ['lock'])
+        self.assertIn(method, calls)
+
+    def test_get_checkpoint_lock(self):
+        account = AccountFactory()
+        TransactionFactory(account=account, amount=10, date=datetime.date(2015, 7, 2))
+        self.assertLockedFirst(
+            'bulk_create', BalanceCheckpoint.objects.get_checkpoint, account, datetime.date(2015, 10, 26))
+
+        # Not once built.
+        BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+        with mock.patch.object(Account.objects, 'lock') as mock_lock:
+            BalanceCheckpoint.objects.get_checkpoint(account, datetime.date(2015, 10, 26))
+        self.assertFalse(mock_lock.called)
+
+    def test_update_status_lock(self):
+        account = AccountFactory()
+        bt = TransactionFactory(account=account, amount=10, date=datetime.date(2015, 9, 2))
+
+        bt.status = Transaction.STATUS_INACTIVE
+        self.assertLockedFirst('invalidate', bt.save)
+
+
+class TransactionRollupTestCase(TestCase):
+
+    def setUp(self):
+        self.account = AccountFactory()
+        self.tag = TagFactory()
+
+    def assertRollupsValid(self):
+        self.assertListEqual(TransactionRollup.objects.check_rollups(self.account), [])
+
+    def test_create(self):
+        TransactionFactory(account=self.account, amount=-10, tag=self.tag, date=datetime.date(2015, 10, 26))
+        TransactionFactory(account=self.account, amount=-5, tag=self.tag, date=datetime.date(2015, 10, 26))
+
+        rollup = TransactionRollup.objects.get(account=self.account)
+        self.assertEqual(rollup.tag, self.tag)
+        self.assertEqual(rollup.date, datetime.date(2015, 10, 26))
+        self.assertEqual(rollup.sign, -1)
+        self.assertEqual(rollup.amount, Decimal('-15'))
+        self.assertEqual(rollup.quantity, 2)
+        self.assertRollupsValid()
+
+    def test_update_amount(self):
+        bt = TransactionFactory(account=self.account, amount=-10)
+        bt.amount = -20
+        bt.save()
+
+        rollup = TransactionRollup.objects.get(account=self.account)
+        self.assertEqual(rollup.amount, Decimal('-20'))
+        self.assertEqual(rollup.quantity, 1)
+        self.assertRollupsValid()
+
+    def test_update_sign(self):
+        bt = TransactionFactory(account=self.account, amount=-10)
+        bt.amount = 10
+        bt.save()
+        self.assertEqual(TransactionRollup.objects.get(account=self.account, sign=-1).quantity, 0)
+        self.assertEqual(TransactionRollup.objects.get(account=self.account, sign=1).quantity, 1)
+        self.assertRollupsValid()
+
+    def test_update_key(self):
+        bt = TransactionFactory(account=self.account, amount=-10, tag=self.tag)
+        bt.date += datetime.timedelta(days=1)
+        bt.save()
+        self.assertRollupsValid()
+
+        bt.tag = TagFactory()
+        bt.save()
+        self.assertRollupsValid()
+
+        bt.tag = None
+        bt.save(update_fields=['tag'])
+        self.assertRollupsValid()
+
+        bt.status = Transaction.STATUS_INACTIVE
+        bt.save()
+        self.assertRollupsValid()
+
+        bt.reconciled = True
+        bt.save()
+        self.assertRollupsValid()
+
+    def test_update_untracked(self):
+        bt = TransactionFactory(account=self.account, amount=-10)
+        bt.label = 'foo'
+        with CaptureQueriesContext(connection) as context:
+            bt.save()
+        self.assertFalse([query for query in context.captured_queries if 'transaction_rollups' in query['sql']])
+
+    def test_delete(self):
+        bt = TransactionFactory(account=self.account, amount=-10)
+        TransactionFactory(account=self.account, amount=-5)
+        bt.delete()
+        self.assertRollupsValid()
+
+    def test_create_multiple(self):
+        Transaction.objects.create_multiple(self.account, [
+            Transaction(amount=-10, date=datetime.date(2015, 10, 26), tag=self.tag),
+            Transaction(amount=20, date=datetime.date(2015, 10, 26)),
+            Transaction(amount=-30, date=datetime.date(2015, 10, 27), tag=self.tag),
+        ])
+        self.assertEqual(TransactionRollup.objects.filter(account=self.account).count(), 3)
+        self.assertRollupsValid()
+
+    def test_update_multiple(self):
+        bts = TransactionFactory.create_batch(3, account=self.account, amount=-10)
+        Transaction.objects.update_multiple([bt.pk for bt in bts[:2]], tag=self.tag, reconciled=True)
+        self.assertRollupsValid()
+
+    def test_delete_multiple(self):
+        bts = TransactionFactory.create_batch(3, account=self.account, amount=-10, tag=self.tag)
+        Transaction.objects.delete_multiple([bt.pk for bt in bts[:2]])
+        self.assertEqual(TransactionRollup.objects.get(account=self.account).quantity, 1)
+        self.assertRollupsValid()
+
+    def test_delete_tag(self):
+        tag = TagFactory()
+        TransactionFactory(account=self.account, amount=-10, date=datetime.date(2015, 10, 26))
+        bt = TransactionFactory(account=self.account, amount=-20, date=datetime.date(2015, 10, 26), tag=tag)
+        tag.delete()
+        self.assertRollupsValid()
+
+        # Only one of the duplicates is altered.
+        bt.refresh_from_db()
+        bt.delete()
+        self.assertRollupsValid()
+
+    def test_rebuild(self):
+        TransactionFactory.create_batch(
+            2, account=self.account, amount=-10, tag=self.tag, date=datetime.date(2015, 10, 26))
+        TransactionRollup.objects.filter(account=self.account).update(amount=0)
+        self.assertEqual(len(TransactionRollup.objects.check_rollups(self.account)), 1)
+
+        self.assertEqual(TransactionRollup.objects.rebuild_rollups(self.account), 1)
+        self.assertRollupsValid()
+
+    def test_check_missing(self):
+        TransactionFactory(account=self.account, amount=-10, tag=self.tag, date=datetime.date(2015, 10, 26))
+        TransactionRollup.objects.all().delete()
+        self.assertListEqual(
+            TransactionRollup.objects.check_rollups(self.account),
+            [(self.tag.pk, datetime.date(2015, 10, 26), Transaction.STATUS_ACTIVE, False, -1)],
+        )
+
+    def test_check_residue(self):
+        TransactionFactory(account=self.account, amount=Decimal('0.3'), date=datetime.date(2015, 10, 26))
+        rollup = TransactionRollup.objects.get(account=self.account)
+
+        # Left by bank transactions moved away, but summed up as floats by
+        # some backends.
+        for amount, count in ((Decimal('0.1'), 1), (Decimal('0.2'), 1), (Decimal('-0.3'), -2)):
+            TransactionRollup.objects.create(
+                account=self.account, tag=None, date=datetime.date(2015, 10, 27), status=rollup.status,
+                reconciled=rollup.reconciled, sign=rollup.sign, amount=amount, quantity=count,
+            )
+        self.assertRollupsValid()
+
+
 class RelationshipTestCase(TestCase):
 
     def test_delete_account(self):
@@ -3,12 +3,16 @@ from decimal import Decimal
 
 from django.test import TestCase, override_settings
 
+from rest_framework.renderers import JSONRenderer
+
 from mymoney.accounts.factories import AccountFactory
+from mymoney.tags.factories import TagFactory
 
 from ..factories import TransactionFactory
 from ..models import Transaction
 from ..serializers import (
-    TransactionDetailSerializer, TransactionListSerializer,
+    TransactionDetailSerializer, TransactionFastListSerializer,
+    TransactionListSerializer,
 )
 
 
@@ -144,3 +148,42 @@ class TransactionListSerializerTestCase(TestCase):
             serializer.data['balance_reconciled_view'],
             '+20,15',
         )
+
+
+class TransactionFastListSerializerTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        account = AccountFactory(currency='EUR', balance=0)
+        tags = [TagFactory(), TagFactory()]
+        for i in range(30):
+            TransactionFactory(
+                account=account,
+                amount=Decimal(i * 7 % 11 - 5) + Decimal('0.25'),
+                date=datetime.date(2015, 10, 1 + i % 5),
+                reconciled=i % 3 == 0,
+                status=Transaction.STATUSES[i % 3][0],
+                payment_method=Transaction.PAYMENT_METHODS[i % 5][0],
+                tag=tags[i % 3] if i % 3 < 2 else None,
+                memo='memo {}'.format(i) if i % 2 else '',
+            )
+        TransactionFactory(currency='USD', amount=Decimal('1234567.89'))
+
+    def assertParity(self):
+        transactions = list(Transaction.objects.select_related('tag').order_by('date', 'id'))
+        expected = JSONRenderer().render(TransactionListSerializer(transactions, many=True).data)
+
+        serializer = TransactionFastListSerializer(transactions, child=TransactionListSerializer())
+        self.assertEqual(JSONRenderer().render(serializer.data), expected)
+
+    @override_settings(LANGUAGE_CODE='en-us')
+    def test_parity_en_us(self):
+        self.assertParity()
+
+    @override_settings(LANGUAGE_CODE='fr-fr')
+    def test_parity_fr_fr(self):
+        self.assertParity()
+
+    def test_empty(self):
+        serializer = TransactionFastListSerializer([], child=TransactionListSerializer())
+        self.assertListEqual(serializer.data, [])
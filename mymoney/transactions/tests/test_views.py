@@ -1,9 +1,14 @@
 import datetime
+import io
+import json
 from decimal import Decimal
 from unittest import mock
 
 from django.core.exceptions import NON_FIELD_ERRORS
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.reverse import reverse
@@ -11,10 +16,14 @@ from rest_framework.settings import api_settings
 from rest_framework.test import APITestCase
 
 from mymoney.accounts.factories import AccountFactory
+from mymoney.accounts.models import Account
 from mymoney.core.factories import UserFactory
+from mymoney.core.pagination import KeysetPagination
+from mymoney.core.utils import clear_default_account
 from mymoney.tags.factories import TagFactory
 
 from ..factories import TransactionFactory
+from ..importers import import_transactions
 from ..models import Transaction
 
 
@@ -290,6 +299,300 @@ class CreateViewTestCase(APITestCase):
         self.assertEqual(transaction.tag, tag)
 
 
+class BulkCreateViewTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.account = AccountFactory(currency='USD', balance=0)
+        cls.url = reverse('transaction-bulk')
+
+    def test_access_anonymous(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_access_granted(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url)
+        self.assertNotIn(response.status_code, [401, 403])
+
+    def test_empty(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, data=[])
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, data=[
+            {'label': 'foo', 'amount': 10},
+            {'label': 'bar'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount', response.data[1])
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_create(self):
+        tag = TagFactory()
+        TransactionFactory(account=self.account, amount=5, date=datetime.date(2015, 10, 28))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, data=[
+            {'label': 'foo', 'amount': 10, 'date': '2015-10-27', 'tag': tag.pk, 'reconciled': True},
+            {'label': 'bar', 'amount': 20, 'date': '2015-10-29', 'currency': 'EUR'},
+            {'label': 'baz', 'amount': 40, 'date': '2015-10-26', 'status': Transaction.STATUS_INACTIVE},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertListEqual(
+            [bt['id'] for bt in response.data],
+            [Transaction.objects.get(label=label).pk for label in ('foo', 'bar', 'baz')],
+        )
+
+        self.assertListEqual(
+            list(
+                Transaction.objects
+                .filter(account=self.account)
+                .order_by('date')
+                .values_list('label', 'currency', 'balance_total', 'balance_reconciled')
+            ),
+            [
+                ('baz', 'USD', Decimal('40'), None),
+                ('foo', 'USD', Decimal('50'), Decimal('10')),
+                (self.account.transactions.get(amount=5).label, 'USD', Decimal('55'), Decimal('10')),
+                ('bar', 'USD', Decimal('75'), Decimal('10')),
+            ],
+        )
+        self.assertEqual(Transaction.objects.get(label='foo').tag, tag)
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('35'))
+
+    def test_create_batches(self):
+        self.client.force_authenticate(self.user)
+        with mock.patch('mymoney.transactions.views.TransactionViewSet.bulk_batch_size', 2):
+            response = self.client.post(self.url, data=[
+                {'label': 'foo', 'amount': 10} for i in range(5)
+            ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.account.transactions.count(), 5)
+        self.assertListEqual(Transaction.objects.check_running_balances(self.account), [])
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('50'))
+
+    def test_create_queries(self):
+        self.client.force_authenticate(self.user)
+
+        # Same number of queries whatever the number of rows.
+        counts = []
+        for size in (2, 10):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(self.url, data=[
+                    {'label': 'foo', 'amount': 10} for i in range(size)
+                ])
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+
+class ExportViewTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.account = AccountFactory(currency='EUR', balance=0)
+        cls.url = reverse('transaction-export')
+        cls.tag = TagFactory()
+        cls.bt1 = TransactionFactory(
+            account=cls.account,
+            label='foo, bar',
+            amount=Decimal('-10.5'),
+            date=datetime.date(2015, 10, 26),
+            reconciled=True,
+            payment_method=Transaction.PAYMENT_METHOD_CREDIT_CARD,
+            memo='',
+            tag=cls.tag,
+        )
+        cls.bt2 = TransactionFactory(
+            account=cls.account,
+            label='baz',
+            amount=20,
+            date=datetime.date(2015, 10, 27),
+            payment_method=Transaction.PAYMENT_METHOD_CREDIT_CARD,
+            memo='',
+        )
+        TransactionFactory(label='other')
+
+    def export(self, **params):
+        response = self.client.get(self.url, data=params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_access_anonymous(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_access_granted(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertNotIn(response.status_code, [401, 403])
+
+    def test_unknown_format(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={'export_format': 'foo'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('export_format', response.data)
+
+    def test_csv(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('transactions.csv', response['Content-Disposition'])
+
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertListEqual(lines, [
+            'id,label,date,amount,currency,status,reconciled,payment_method,memo,tag',
+            '{},baz,2015-10-27,20.00,EUR,active,False,credit_card,,'.format(self.bt2.pk),
+            '{},"foo, bar",2015-10-26,-10.50,EUR,active,True,credit_card,,{}'.format(self.bt1.pk, self.tag.pk),
+        ])
+
+    def test_csv_reimport(self):
+        self.client.force_authenticate(self.user)
+        content = self.export()
+
+        account = AccountFactory(balance=0)
+        result = import_transactions(account, io.StringIO(content), 'csv')
+        self.assertEqual(result.created, 2)
+        self.assertListEqual(result.errors, [])
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('9.5'))
+
+    def test_ndjson(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={'export_format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 2)
+        self.assertDictEqual(rows[1], {
+            'id': self.bt1.pk,
+            'label': 'foo, bar',
+            'date': '2015-10-26',
+            'amount': '-10.50',
+            'currency': 'EUR',
+            'status': 'active',
+            'reconciled': True,
+            'payment_method': 'credit_card',
+            'memo': '',
+            'tag': self.tag.pk,
+        })
+
+    def test_balances(self):
+        self.client.force_authenticate(self.user)
+        rows = [
+            json.loads(line) for line in
+            self.export(export_format='ndjson', balances='1').splitlines()
+        ]
+        self.assertListEqual(
+            [(row['balance_total'], row['balance_reconciled']) for row in rows],
+            [('9.50', '-10.50'), ('-10.50', '-10.50')],
+        )
+
+    def test_filters(self):
+        self.client.force_authenticate(self.user)
+        lines = self.export(reconciled='true', search='foo').splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(str(self.bt1.pk)))
+
+    def test_ordering(self):
+        self.client.force_authenticate(self.user)
+        lines = self.export(ordering='label').splitlines()
+        self.assertListEqual(
+            [line.split(',')[0] for line in lines[1:]],
+            [str(self.bt2.pk), str(self.bt1.pk)],
+        )
+
+    def test_iterator_chunks(self):
+        self.client.force_authenticate(self.user)
+        with mock.patch('django.db.models.query.QuerySet.iterator', autospec=True,
+                        side_effect=lambda qs, chunk_size: iter([])) as iterator:
+            lines = self.export().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(iterator.call_args[1]['chunk_size'], 2000)
+
+
+class ImportViewTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.account = AccountFactory(currency='USD', balance=0)
+        cls.url = reverse('transaction-import')
+
+    def upload(self, content, name='statement.csv', **data):
+        data['file'] = SimpleUploadedFile(name, content)
+        return self.client.post(self.url, data=data, format='multipart')
+
+    def test_access_anonymous(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_access_granted(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url)
+        self.assertNotIn(response.status_code, [401, 403])
+
+    def test_file_required(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, data={}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file', response.data)
+
+    def test_unknown_format(self):
+        self.client.force_authenticate(self.user)
+        response = self.upload(b'foo', name='statement.txt')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('format', response.data)
+
+    def test_unknown_encoding(self):
+        self.client.force_authenticate(self.user)
+        response = self.upload(b'label,amount\nfoo,10\n', encoding='foo')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('encoding', response.data)
+
+    def test_import(self):
+        self.client.force_authenticate(self.user)
+        response = self.upload('label,amount\nfoo,10\nbar,\nbaz,20\n'.encode('utf-8-sig'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertIn('amount', response.data['errors'][0]['errors'])
+        self.assertIn('rate', response.data)
+
+        self.assertSetEqual(
+            set(self.account.transactions.values_list('label', flat=True)),
+            {'foo', 'baz'},
+        )
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('30'))
+
+    def test_import_format_encoding(self):
+        self.client.force_authenticate(self.user)
+        response = self.upload(
+            'D10/26/2015\nT-10\nPCafé\n^\n'.encode('latin-1'),
+            name='statement',
+            format='qif',
+            encoding='latin-1',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(self.account.transactions.get().label, 'Café')
+
+
 class PartialUpdateViewTestCase(APITestCase):
 
     @classmethod
@@ -1361,6 +1664,290 @@ class ListViewTestCase(APITestCase):
         self.assertEqual(response.data['results'][2]['balance_reconciled'], '10.00')
 
 
+    def test_balance_filtered(self):
+        TransactionFactory(
+            account=self.account,
+            reconciled=True,
+            amount=10,
+            date=datetime.date(2015, 10, 27),
+        )
+        TransactionFactory(
+            account=self.account,
+            amount=15,
+            date=datetime.date(2015, 10, 28),
+        )
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={
+            'date_after': '2015-10-28',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['balance_total'], '25.00')
+        self.assertEqual(response.data['results'][0]['balance_reconciled'], '10.00')
+
+    def test_balance_ordering(self):
+        TransactionFactory(
+            account=self.account,
+            label='b',
+            amount=10,
+            date=datetime.date(2015, 10, 27),
+        )
+        TransactionFactory(
+            account=self.account,
+            label='a',
+            amount=15,
+            date=datetime.date(2015, 10, 28),
+        )
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={
+            '{key}'.format(key=api_settings.ORDERING_PARAM): 'label',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['balance_total'], '25.00')
+        self.assertEqual(response.data['results'][1]['balance_total'], '10.00')
+
+    def test_fast_serialization(self):
+        tag = TagFactory()
+        for i in range(5):
+            TransactionFactory(account=self.account, tag=tag if i % 2 else None, reconciled=bool(i % 3))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        with mock.patch('mymoney.transactions.views.TransactionViewSet.fast_list_serialization', False):
+            expected = self.client.get(self.url)
+        self.assertEqual(response.content, expected.content)
+
+    def test_tags_queries(self):
+        for i in range(3):
+            TransactionFactory(account=self.account, tag=TagFactory())
+
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        self.assertFalse(any('FROM "tags"' in query['sql'] for query in context.captured_queries))
+
+class ConditionalListViewTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.account = AccountFactory()
+        cls.url = reverse('transaction-list')
+
+    def setUp(self):
+        clear_default_account()
+        self.addCleanup(clear_default_account)
+        self.client.force_authenticate(self.user)
+
+    def test_etag(self):
+        TransactionFactory(account=self.account)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+
+        # Only the data version is read.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='W/"foo"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_last_modified(self):
+        response = self.client.get(self.url)
+        last_modified = response['Last-Modified']
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_anonymous(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(None)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 401)
+
+    def test_language(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with override_settings(LANGUAGE_CODE='fr-fr'):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_writes(self):
+        transaction = TransactionFactory(account=self.account)
+        tag = TagFactory()
+        writes = (
+            lambda: TransactionFactory(account=self.account),
+            lambda: self.client.patch(
+                reverse('transaction-partial-update-multiple'),
+                data={'ids': [transaction.pk], 'reconciled': True},
+            ),
+            lambda: self.client.post(reverse('transaction-bulk'), data=[
+                {'label': 'foo', 'amount': '10', 'date': '2015-10-26'},
+            ]),
+            lambda: tag.save(),
+            lambda: self.client.delete(
+                reverse('transaction-delete-multiple'),
+                data={'ids': [transaction.pk]},
+            ),
+        )
+
+        etags = {self.client.get(self.url)['ETag']}
+        for write in writes:
+            etag = self.client.get(self.url)['ETag']
+            write()
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            etags.add(response['ETag'])
+        self.assertEqual(len(etags), len(writes) + 1)
+
+    def test_no_account(self):
+        Account.objects.all().delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_other_actions(self):
+        transaction = TransactionFactory(account=self.account)
+        response = self.client.get(reverse('transaction-detail', kwargs={'pk': transaction.pk}))
+        self.assertNotIn('ETag', response)
+
+
+class KeysetListViewTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.account = AccountFactory(currency='EUR')
+        cls.url = reverse('transaction-list')
+
+    def setUp(self):
+        patcher = mock.patch.object(KeysetPagination, 'page_size', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_none(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+        self.assertListEqual(response.data['results'], [])
+
+    def test_pages(self):
+        bt1 = TransactionFactory(account=self.account, amount=10, date=datetime.date(2015, 10, 27))
+        bt2 = TransactionFactory(account=self.account, amount=10, date=datetime.date(2015, 10, 28))
+        bt3 = TransactionFactory(account=self.account, amount=10, date=datetime.date(2015, 10, 28))
+        bt4 = TransactionFactory(account=self.account, amount=10, date=datetime.date(2015, 10, 29))
+        bt5 = TransactionFactory(account=self.account, amount=10, date=datetime.date(2015, 10, 26))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([bt['id'] for bt in response.data['results']], [bt4.pk, bt3.pk])
+        self.assertIsNone(response.data['previous'])
+        self.assertIn('pagination=cursor', response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([bt['id'] for bt in response.data['results']], [bt2.pk, bt1.pk])
+        self.assertEqual(response.data['results'][0]['balance_total'], '30.00')
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([bt['id'] for bt in response.data['results']], [bt5.pk])
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([bt['id'] for bt in response.data['results']], [bt2.pk, bt1.pk])
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([bt['id'] for bt in response.data['results']], [bt4.pk, bt3.pk])
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_seek_bound(self):
+        TransactionFactory.create_batch(3, account=self.account, date=datetime.date(2015, 10, 28))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={'pagination': 'cursor'})
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+
+        # The leading field bounds the index range scanned.
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if 'FROM "transactions"' in query['sql'] and 'LIMIT' in query['sql']
+        ]
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"transactions"."date" <=', queries[0])
+
+    def test_ordering(self):
+        bt1 = TransactionFactory(account=self.account, label='b')
+        bt2 = TransactionFactory(account=self.account, label='a')
+        bt3 = TransactionFactory(account=self.account, label='b')
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={
+            'pagination': 'cursor',
+            '{key}'.format(key=api_settings.ORDERING_PARAM): 'label',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([bt['id'] for bt in response.data['results']], [bt2.pk, bt3.pk])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([bt['id'] for bt in response.data['results']], [bt1.pk])
+
+    def test_filters(self):
+        TransactionFactory(account=self.account, amount=10, reconciled=True, date=datetime.date(2015, 10, 26))
+        bt1 = TransactionFactory(account=self.account, amount=5, date=datetime.date(2015, 10, 27))
+        TransactionFactory(account=self.account, amount=5, reconciled=True, date=datetime.date(2015, 10, 28))
+        bt2 = TransactionFactory(account=self.account, amount=5, date=datetime.date(2015, 10, 29))
+        bt3 = TransactionFactory(account=self.account, amount=5, date=datetime.date(2015, 10, 30))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={
+            'pagination': 'cursor',
+            'reconciled': False,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([bt['id'] for bt in response.data['results']], [bt3.pk, bt2.pk])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([bt['id'] for bt in response.data['results']], [bt1.pk])
+        self.assertEqual(response.data['results'][0]['balance_total'], '15.00')
+        self.assertEqual(response.data['results'][0]['balance_reconciled'], '10.00')
+
+    def test_invalid_cursor(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, data={
+            'pagination': 'cursor',
+            'cursor': 'foo',
+        })
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_default(self):
+        TransactionFactory(account=self.account)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+
 class PartialUpdateMultipleViewTestCase(APITestCase):
 
     @classmethod
@@ -1532,6 +2119,80 @@ class PartialUpdateMultipleViewTestCase(APITestCase):
         self.assertEqual(bt2.status, Transaction.STATUS_ACTIVE)
 
 
+    def test_update_multiple_status_balance(self):
+        account = AccountFactory(balance=0)
+        bt1 = TransactionFactory(account=account, amount=10, status=Transaction.STATUS_INACTIVE)
+        bt2 = TransactionFactory(account=account, amount=20, status=Transaction.STATUS_IGNORED)
+        bt3 = TransactionFactory(account=account, amount=40)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(self.url, data={
+            'ids': [bt1.pk, bt2.pk],
+            'status': Transaction.STATUS_ACTIVE,
+        })
+        self.assertEqual(response.status_code, 200)
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('60'))
+
+        response = self.client.patch(self.url, data={
+            'ids': [bt1.pk, bt2.pk, bt3.pk],
+            'status': Transaction.STATUS_INACTIVE,
+        })
+        self.assertEqual(response.status_code, 200)
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('60'))
+
+        # Same as a single update.
+        bt3.refresh_from_db()
+        bt3.status = Transaction.STATUS_ACTIVE
+        bt3.save()
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('60'))
+
+    def test_update_multiple_running_balances(self):
+        account = AccountFactory(balance=0)
+        bts = [
+            TransactionFactory(account=account, amount=10, date=datetime.date(2015, 10, 26 + i))
+            for i in range(4)
+        ]
+
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(self.url, data={
+            'ids': [bts[1].pk, bts[3].pk],
+            'reconciled': True,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+        self.assertListEqual(
+            list(
+                Transaction.objects
+                .filter(account=account)
+                .order_by('date')
+                .values_list('balance_reconciled', flat=True)
+            ),
+            [None, Decimal('10'), Decimal('10'), Decimal('20')],
+        )
+
+    def test_update_multiple_queries(self):
+        account = AccountFactory(balance=0)
+        self.client.force_authenticate(self.user)
+
+        # Same number of queries whatever the number of ids.
+        counts = []
+        for size in (2, 10):
+            ids = [TransactionFactory(account=account, amount=10).pk for i in range(size)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.patch(self.url, data={
+                    'ids': ids,
+                    'status': Transaction.STATUS_INACTIVE,
+                    'reconciled': False,
+                })
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+
 class DeleteMultipleViewTestCase(APITestCase):
 
     @classmethod
@@ -1581,3 +2242,65 @@ class DeleteMultipleViewTestCase(APITestCase):
             bt1.refresh_from_db()
         with self.assertRaises(Transaction.DoesNotExist):
             bt2.refresh_from_db()
+
+    def test_delete_multiple_balance(self):
+        account = AccountFactory(balance=0)
+        bt1 = TransactionFactory(account=account, amount=10, reconciled=True, date=datetime.date(2015, 10, 26))
+        bt2 = TransactionFactory(account=account, amount=20, status=Transaction.STATUS_INACTIVE,
+                                 date=datetime.date(2015, 10, 27))
+        TransactionFactory(account=account, amount=40, date=datetime.date(2015, 10, 28))
+        TransactionFactory(account=account, amount=80, reconciled=True, date=datetime.date(2015, 10, 29))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.delete(self.url, data={
+            'ids': [bt1.pk, bt2.pk],
+        })
+        self.assertEqual(response.status_code, 204)
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('120'))
+        self.assertListEqual(Transaction.objects.check_running_balances(account), [])
+        self.assertListEqual(
+            list(
+                Transaction.objects
+                .filter(account=account)
+                .order_by('date')
+                .values_list('balance_total', 'balance_reconciled')
+            ),
+            [(Decimal('40'), None), (Decimal('120'), Decimal('80'))],
+        )
+
+    def test_delete_multiple_chunked(self):
+        account = AccountFactory(balance=0)
+        ids = [TransactionFactory(account=account, amount=10).pk for i in range(5)]
+
+        self.client.force_authenticate(self.user)
+        with mock.patch.object(connection.ops, 'bulk_batch_size', return_value=2):
+            response = self.client.delete(self.url, data={
+                'ids': ids[:4],
+            })
+        self.assertEqual(response.status_code, 204)
+        self.assertListEqual(
+            list(Transaction.objects.filter(account=account).values_list('pk', flat=True)),
+            ids[4:],
+        )
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('10'))
+
+    def test_delete_multiple_queries(self):
+        account = AccountFactory(balance=0)
+        self.client.force_authenticate(self.user)
+
+        # Same number of queries whatever the number of ids.
+        counts = []
+        for size in (2, 10):
+            ids = [TransactionFactory(account=account, amount=10).pk for i in range(size)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.delete(self.url, data={
+                    'ids': ids,
+                })
+            self.assertEqual(response.status_code, 204)
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('0'))
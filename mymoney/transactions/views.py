@@ -1,34 +1,66 @@
-from collections import OrderedDict
+import io
+
+from django.http import StreamingHttpResponse
+from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
 from django_filters.rest_framework import DjangoFilterBackend
 
+from mymoney.core.pagination import KeysetPagination
 from mymoney.core.utils import get_default_account
+from mymoney.core.views import ConditionalGetMixin
 from mymoney.transactions.filters import TransactionFilter
 
+from .exporters import (
+    BALANCE_FIELDS, CONTENT_TYPES, EXPORTERS, FIELDS, FORMAT_CSV,
+)
+from .importers import import_transactions
 from .models import Transaction
 from .serializers import (
     TransactionDeleteMutipleSerializer, TransactionDetailSerializer,
+    TransactionFastListSerializer, TransactionImportSerializer,
     TransactionListSerializer, TransactionPartialUpdateMutipleSerializer,
     TransactionSerializer,
 )
 
 
-class TransactionViewSet(ModelViewSet):
+class TransactionViewSet(ConditionalGetMixin, ModelViewSet):
+    conditional_actions = ('list',)
     filter_backends = (DjangoFilterBackend, SearchFilter, OrderingFilter,)
     filterset_class = TransactionFilter
     search_fields = ('label',)
     ordering_fields = ('label', 'date')
     ordering = ('-date',)
+    pagination_query_param = 'pagination'
+    fast_list_serialization = True
+    bulk_batch_size = 500
+    export_chunk_size = 2000
+    export_format_query_param = 'export_format'
+    export_balances_query_param = 'balances'
 
     def get_queryset(self):
         return Transaction.objects.filter(account=get_default_account())
 
+    @property
+    def paginator(self):
+        """
+        Page number pagination by default, whereas keyset pagination could be
+        chosen with ?pagination=cursor.
+        """
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get(self.pagination_query_param) == 'cursor':
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def get_serializer_class(self):
         if self.action == 'list':
             return TransactionListSerializer
@@ -37,14 +69,84 @@ class TransactionViewSet(ModelViewSet):
         return TransactionSerializer
 
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
+        queryset = self.filter_queryset(self.get_queryset()).select_related('tag')
         queryset = queryset.order_by(*(queryset.query.order_by + ('-id',)))
-        queryset = self._add_queryset_extra_fields(queryset)
 
         page = self.paginate_queryset(queryset)
-        serializer = self.get_serializer(page, many=True)
+        if self.fast_list_serialization:
+            serializer = TransactionFastListSerializer(
+                page,
+                child=self.get_serializer(),
+                context=self.get_serializer_context(),
+            )
+        else:
+            serializer = self.get_serializer(page, many=True)
         return self.get_paginated_response(serializer.data)
 
+    @action(methods=['post'], detail=False)
+    def bulk(self, request, *args, **kwargs):
+        serializer = TransactionSerializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            context={'request': request},
+        )
+        serializer.is_valid(raise_exception=True)
+
+        transactions = Transaction.objects.create_multiple(
+            get_default_account(),
+            [Transaction(**data) for data in serializer.validated_data],
+            batch_size=self.bulk_batch_size,
+        )
+
+        serializer = TransactionSerializer(transactions, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['get'], detail=False)
+    def export(self, request, *args, **kwargs):
+        export_format = request.query_params.get(self.export_format_query_param, FORMAT_CSV)
+        if export_format not in EXPORTERS:
+            raise ValidationError({
+                self.export_format_query_param: _('Unknown export format.'),
+            })
+
+        fields = FIELDS
+        if request.query_params.get(self.export_balances_query_param) in ('1', 'true'):
+            fields += BALANCE_FIELDS
+
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.order_by(*(queryset.query.order_by + ('-id',)))
+
+        # Fetched by chunks, through a server-side cursor when supported.
+        rows = queryset.values_list(*fields).iterator(chunk_size=self.export_chunk_size)
+
+        response = StreamingHttpResponse(
+            EXPORTERS[export_format](rows, fields),
+            content_type=CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = 'attachment; filename="transactions.{}"'.format(export_format)
+        return response
+
+    @action(methods=['post'], detail=False, url_path='import', url_name='import', parser_classes=(MultiPartParser,))
+    def import_file(self, request, *args, **kwargs):
+        serializer = TransactionImportSerializer(
+            data=request.data,
+            context={'request': request},
+        )
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        # Decoded on the fly, the upload being only read by chunks.
+        stream = io.TextIOWrapper(data['file'].file, encoding=data['encoding'], newline='')
+        result = import_transactions(
+            get_default_account(),
+            stream,
+            data['format'],
+            batch_size=self.bulk_batch_size,
+        )
+
+        return Response(result.as_dict())
+
     @action(methods=['patch'], detail=False, url_path='partial-update-multiple')
     def partial_update_multiple(self, request, *args, **kwargs):
         serializer = TransactionPartialUpdateMutipleSerializer(
@@ -53,13 +155,8 @@ class TransactionViewSet(ModelViewSet):
         )
         serializer.is_valid(raise_exception=True)
 
-        fields = {k: v for k, v in serializer.data.items() if k not in ('ids',)}
-
-        transactions = Transaction.objects.filter(pk__in=serializer.data['ids'])
-        for transaction in transactions:
-            for field, value in fields.items():
-                setattr(transaction, field, value)
-            transaction.save(update_fields=fields.keys())
+        fields = {k: v for k, v in serializer.validated_data.items() if k not in ('ids',)}
+        Transaction.objects.update_multiple(serializer.validated_data['ids'], **fields)
 
         return Response()
 
@@ -71,69 +168,6 @@ class TransactionViewSet(ModelViewSet):
         )
         serializer.is_valid(raise_exception=True)
 
-        transactions = Transaction.objects.filter(pk__in=serializer.data['ids'])
-        for transaction in transactions:
-            transaction.delete()
+        Transaction.objects.delete_multiple(serializer.validated_data['ids'])
 
         return Response(status=status.HTTP_204_NO_CONTENT)
-
-    def _add_queryset_extra_fields(self, qs):
-        """
-        Add extra fields to the queryset.
-        By using SQL and not Python, we could alter order_by and sort without
-        altering the new balances fields.
-
-        Extra fields are:
-        - total_balance
-        - reconciled_balance
-        """
-        account = get_default_account()
-
-        # Unfortunetly, we cannot get it by doing the opposite (i.e :
-        # total balance - SUM(futur bt) because with postgreSQL at least,
-        # the last dated bank transaction would give None :
-        # total balance - SUM(NULL).
-        # It could be usefull because most of the time, we are seing the
-        # latest bank transactions, not the first.
-        total_balance_subquery = """
-            SELECT SUM(bt_sub.amount)
-            FROM {table} AS bt_sub
-            WHERE
-                bt_sub.account_id = %s
-                AND (
-                    bt_sub.date < {table}.date
-                    OR (
-                        bt_sub.date = {table}.date
-                        AND
-                        bt_sub.id <= {table}.id
-                    )
-                )
-            """.format(
-            table=Transaction._meta.db_table,
-        )
-
-        reconciled_balance_subquery = """
-            SELECT SUM(bt_sub_r.amount)
-            FROM {table} AS bt_sub_r
-            WHERE
-                bt_sub_r.account_id = %s
-                AND
-                bt_sub_r.reconciled is True
-                AND (
-                    bt_sub_r.date < {table}.date
-                    OR (
-                        bt_sub_r.date = {table}.date
-                        AND
-                        bt_sub_r.id <= {table}.id
-                    )
-                )""".format(
-            table=Transaction._meta.db_table,
-        )
-
-        return qs.extra(
-            select=OrderedDict([
-                ('balance_total', total_balance_subquery),
-                ('balance_reconciled', reconciled_balance_subquery),
-            ]),
-            select_params=(account.pk, account.pk)
-        )
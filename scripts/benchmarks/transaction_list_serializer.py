@@ -0,0 +1,75 @@
+"""
+Benchmark of the serialization of a page of bank transactions: rendering
+with TransactionListSerializer(many=True) against
+TransactionFastListSerializer, amounts being localized with their currency
+by column, on a throw-away test database.
+
+How to use :
+DJANGO_SETTINGS_MODULE=mymoney.settings.test python scripts/benchmarks/transaction_list_serializer.py
+"""
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import django  # NOQA: E402 isort:skip
+django.setup()
+
+from django.db import connection  # NOQA: E402 isort:skip
+from django.test.utils import setup_test_environment, teardown_test_environment  # NOQA: E402 isort:skip
+from django.utils import translation  # NOQA: E402 isort:skip
+
+ROWS = 500
+TAGS = 5
+REPEAT = 5
+
+
+def main():
+    from rest_framework.renderers import JSONRenderer
+
+    from mymoney.accounts.factories import AccountFactory
+    from mymoney.tags.factories import TagFactory
+    from mymoney.transactions.factories import TransactionFactory
+    from mymoney.transactions.models import Transaction
+    from mymoney.transactions.serializers import (
+        TransactionFastListSerializer, TransactionListSerializer,
+    )
+
+    account = AccountFactory(currency='EUR', balance=0)
+    tags = TagFactory.create_batch(TAGS)
+    for i in range(ROWS):
+        TransactionFactory(
+            account=account,
+            amount=Decimal(i % 97 - 48) + Decimal('0.25'),
+            reconciled=i % 3 == 0,
+            tag=tags[i % TAGS],
+        )
+    transactions = list(Transaction.objects.select_related('tag').order_by('-date', '-id'))
+
+    def render_default():
+        return JSONRenderer().render(TransactionListSerializer(transactions, many=True).data)
+
+    def render_fast():
+        serializer = TransactionFastListSerializer(transactions, child=TransactionListSerializer())
+        return JSONRenderer().render(serializer.data)
+
+    for language in ('en-us', 'fr-fr'):
+        with translation.override(language):
+            assert render_default() == render_fast()
+            for name, func in (('default', render_default), ('fast', render_fast)):
+                best = min(timeit.repeat(func, number=1, repeat=REPEAT))
+                print('{language} {name}: {ms:.0f}ms for {rows} rows (best of {repeat})'.format(
+                    language=language, name=name, ms=best * 1000, rows=ROWS, repeat=REPEAT,
+                ))
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        main()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
@@ -0,0 +1,61 @@
+"""
+Benchmark of Transaction.save(): number of queries of an amount and a label
+update of a loaded bank transaction, then time of many amount updates, on a
+throw-away test database.
+
+How to use : run it on two commits to compare them, i.e:
+DJANGO_SETTINGS_MODULE=mymoney.settings.test python scripts/benchmarks/transaction_save.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import django  # NOQA: E402 isort:skip
+django.setup()
+
+from django.db import connection  # NOQA: E402 isort:skip
+from django.test.utils import (  # NOQA: E402 isort:skip
+    CaptureQueriesContext, setup_test_environment, teardown_test_environment,
+)
+
+ROWS = 200
+UPDATES = 500
+
+
+def count_queries(func):
+    with CaptureQueriesContext(connection) as context:
+        func()
+    return len(context.captured_queries)
+
+
+def main():
+    from mymoney.accounts.factories import AccountFactory
+    from mymoney.transactions.factories import TransactionFactory
+    from mymoney.transactions.models import Transaction
+
+    account = AccountFactory(balance=0)
+    TransactionFactory.create_batch(ROWS, account=account, amount=10)
+    transaction = Transaction.objects.select_related('account').order_by('date', 'id')[ROWS // 2]
+
+    transaction.amount += 1
+    print('Amount update: {} queries'.format(count_queries(transaction.save)))
+    transaction.label = 'foo'
+    print('Label update: {} queries'.format(count_queries(transaction.save)))
+
+    start = time.perf_counter()
+    for i in range(UPDATES):
+        transaction.amount += 1
+        transaction.save()
+    print('{} amount updates: {:.2f}s'.format(UPDATES, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        main()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
@@ -15,7 +15,7 @@ source "$V_ENV_PATH"/bin/activate
 
 cd "$(dirname "$0")/.."
 
-python manage.py clonescheduled --settings=mymoney.settings.prod
+python manage.py clonescheduled --catch-up --settings=mymoney.settings.prod
 
 deactivate
 